@@ -0,0 +1,183 @@
+import asyncio
+import heapq
+import logging
+import math
+import os
+import time
+from datetime import datetime
+from rate_limiter import TokenBucket
+from job_queue import ACTIVE_STATUSES
+from refresh_queue import RefreshQueue, refresh_queue
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+ProfileLoader = Callable[[], Awaitable[List[Dict[str, Any]]]]
+
+# Weight of the latest observation in a summoner's games-per-hour estimate
+RATE_SMOOTHING = 0.5
+
+
+class AutoRefreshScheduler:
+    """Queues background refreshes of tracked summoners, most active first.
+
+    Each summoner has an estimated play rate in games per hour, seeded from
+    how long ago their last game was and updated from how many new matches
+    each refresh finds. Its priority is the number of matches it is expected
+    to have played since ``last_updated``; it becomes due at one, never
+    sooner than ``min_interval`` and never later than ``max_interval``.
+
+    Due summoners are enqueued on the refresh queue while the Riot budget of
+    ``requests_per_minute`` allows, highest play rate first: quota goes to
+    players likely to have new matches, and those only due because of the
+    ``max_interval`` guarantee (rate at the floor) go last. A refresh is charged
+    its expected cost up front (one ID page plus the expected matches), then
+    corrected to the real cost once its job finishes.
+    """
+
+    def __init__(self, queue: RefreshQueue, requests_per_minute: int = 30, min_interval: float = 900,
+                 max_interval: float = 86400, tick_interval: float = 15, rescan_interval: float = 300,
+                 max_queued: int = 10):
+        self.queue = queue
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.tick_interval = tick_interval
+        self.rescan_interval = rescan_interval
+        self.max_queued = max_queued
+        self.min_rate = 3600 / max_interval
+        self._budget = TokenBucket(requests_per_minute, 60) if requests_per_minute > 0 else None
+        self._profiles: Dict[str, Dict[str, Any]] = {}
+        # job ID -> (puuid, requests charged for it)
+        self._pending: Dict[str, Tuple[str, float]] = {}
+        self._load_profiles: Optional[ProfileLoader] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _timestamp(value: Optional[str]) -> Optional[float]:
+        return datetime.fromisoformat(value).timestamp() if value else None
+
+    def _initial_rate(self, last_match_start: Optional[float], now: float) -> float:
+        # Until a refresh has been observed, assume about one game per gap since the last one
+        if last_match_start is None:
+            return self.min_rate
+        hours = max(now - last_match_start, self.min_interval) / 3600
+        return max(1 / hours, self.min_rate)
+
+    def load(self, profiles: List[Dict[str, Any]], now: Optional[float] = None):
+        """Sync the tracked set with summoner_profiles rows, keeping learned rates."""
+        now = now or time.time()
+        tracked = {}
+        for profile in profiles:
+            state = self._profiles.get(profile["puuid"])
+            if state is None:
+                state = {"rate": self._initial_rate(self._timestamp(profile.get("last_match_start")), now),
+                         "last_updated": 0.0}
+            state["region"] = profile["region"]
+            # Manual refreshes move last_updated too
+            state["last_updated"] = max(state["last_updated"], self._timestamp(profile.get("last_updated")) or 0.0)
+            tracked[profile["puuid"]] = state
+        self._profiles = tracked
+
+    def priority(self, puuid: str, now: float) -> float:
+        """Expected matches played since the last refresh; due at 1."""
+        state = self._profiles[puuid]
+        elapsed = now - state["last_updated"]
+        if elapsed < self.min_interval:
+            return 0.0
+        # rate never drops below min_rate, so this reaches 1 by max_interval
+        return state["rate"] * elapsed / 3600
+
+    def observe(self, puuid: str, new_matches: int, now: float):
+        state = self._profiles.get(puuid)
+        if state is None:
+            return
+        hours = max(now - state["last_updated"], self.min_interval) / 3600
+        observed = new_matches / hours
+        state["rate"] = max(self.min_rate, RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * state["rate"])
+        state["last_updated"] = now
+
+    def _collect(self, now: float):
+        for job_id, (puuid, charged) in list(self._pending.items()):
+            job = self.queue.get(job_id)
+            if job is not None and job["status"] in ACTIVE_STATUSES:
+                continue
+            del self._pending[job_id]
+            if job is not None and job["status"] == "done":
+                new_matches = len(job["result"]["updated_matches"])
+                self.observe(puuid, new_matches, now)
+                self._budget.consume(time.monotonic(), 1 + new_matches - charged)
+            elif puuid in self._profiles:
+                # Failed: wait out min_interval before trying again
+                self._profiles[puuid]["last_updated"] = now
+
+    def tick(self, now: Optional[float] = None) -> List[str]:
+        """Enqueue due summoners within budget; returns the puuids enqueued."""
+        now = now or time.time()
+        self._collect(now)
+        if self.queue.queue_depth() >= self.max_queued:
+            # Let the workers catch up before adding more
+            return []
+
+        pending = {puuid for puuid, _ in self._pending.values()}
+        due = []
+        for puuid in self._profiles:
+            if puuid not in pending:
+                expected = self.priority(puuid, now)
+                if expected >= 1:
+                    # Most active first, then longest overdue
+                    due.append((-self._profiles[puuid]["rate"], -expected, puuid))
+        heapq.heapify(due)
+
+        enqueued = []
+        while due and len(enqueued) + self.queue.queue_depth() < self.max_queued:
+            _, expected, puuid = heapq.heappop(due)
+            cost = min(1 + math.ceil(-expected), self._budget.limit)
+            if self._budget.available(time.monotonic()) < cost:
+                break
+            job, created = self.queue.enqueue(puuid, self._profiles[puuid]["region"])
+            if created:
+                self._pending[job["id"]] = (puuid, cost)
+                self._budget.consume(time.monotonic(), cost)
+                enqueued.append(puuid)
+        return enqueued
+
+    async def _run(self):
+        last_scan = None
+        while True:
+            try:
+                if last_scan is None or time.monotonic() - last_scan >= self.rescan_interval:
+                    self.load(await self._load_profiles())
+                    last_scan = time.monotonic()
+                self.tick()
+            except Exception as e:
+                logger.warning(f"Auto-refresh tick failed: {str(e)}")
+            await asyncio.sleep(self.tick_interval)
+
+    async def start(self, load_profiles: ProfileLoader):
+        if self._budget is None:
+            # A budget of 0 requests per minute disables auto-refresh
+            return
+        self._load_profiles = load_profiles
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "enabled": self._budget is not None,
+            "tracked": len(self._profiles),
+            "due": sum(1 for puuid in self._profiles if self.priority(puuid, now) >= 1),
+            "pending_jobs": len(self._pending),
+            "budget_available": round(self._budget.available(time.monotonic()), 1) if self._budget else 0
+        }
+
+
+auto_refresh = AutoRefreshScheduler(refresh_queue,
+                                    requests_per_minute=int(os.getenv("AUTO_REFRESH_RPM", "30")),
+                                    min_interval=float(os.getenv("AUTO_REFRESH_MIN_INTERVAL", "900")),
+                                    max_interval=float(os.getenv("AUTO_REFRESH_MAX_INTERVAL", "86400")))
@@ -0,0 +1,80 @@
+import os
+import time
+from job_queue import SQLiteJobQueue, ACTIVE_STATUSES
+from typing import Optional, Dict, Any, Tuple
+
+
+class BackfillQueue(SQLiteJobQueue):
+    """Resumable per-summoner backfills of the full match-v5 history.
+
+    One job per puuid, kept in a local SQLite database along with its
+    checkpoint: the ``start`` offset of the next page of match IDs to ingest.
+    ``end_time`` is pinned when the job is created so games played during the
+    backfill can't shift the offsets; those are picked up by normal refreshes.
+    A failed job resumes from its checkpoint when enqueued again with the same
+    filters.
+    """
+
+    table = "backfill_jobs"
+    key = "puuid"
+    schema = """
+        create table if not exists backfill_jobs (
+            puuid text primary key,
+            region text not null,
+            status text not null,
+            queue integer,
+            start_time integer,
+            end_time integer not null,
+            next_start integer not null default 0,
+            matches_stored integer not null default 0,
+            matches_per_sec real,
+            error text,
+            created_at text not null,
+            updated_at text not null
+        );
+        create index if not exists backfill_jobs_status_created
+            on backfill_jobs (status, created_at);
+    """
+
+    def _describe(self, job: Dict[str, Any]) -> str:
+        return f"Backfill for {job['puuid']}"
+
+    def get(self, puuid: str) -> Optional[Dict[str, Any]]:
+        return self._get(puuid)
+
+    def enqueue(self, puuid: str, region: str, queue: Optional[int] = None, start_time: Optional[int] = None,
+                end_time: Optional[int] = None) -> Tuple[Dict[str, Any], bool]:
+        """Queue a backfill. Returns (job, created); created is False if one was already active."""
+        existing = self.get(puuid)
+        if existing and existing["status"] in ACTIVE_STATUSES:
+            return existing, False
+
+        now = self._now()
+        if (existing and existing["status"] == "failed" and (existing["queue"], existing["start_time"]) == (queue, start_time)
+                and end_time in (None, existing["end_time"])):
+            # Pick up from the checkpoint
+            self._db.execute("update backfill_jobs set status = 'queued', error = null, updated_at = ? where puuid = ?",
+                             (now, puuid))
+        else:
+            self._db.execute("""
+                insert or replace into backfill_jobs
+                    (puuid, region, status, queue, start_time, end_time, next_start, matches_stored, created_at, updated_at)
+                values (?, ?, 'queued', ?, ?, ?, 0, 0, ?, ?)
+            """, (puuid, region, queue, start_time, end_time or int(time.time()), now, now))
+        self._wake()
+        return self.get(puuid), True
+
+    def checkpoint(self, puuid: str, next_start: int, matches_stored: int, matches_per_sec: float):
+        self._db.execute("""
+            update backfill_jobs set next_start = ?, matches_stored = ?, matches_per_sec = ?, updated_at = ?
+            where puuid = ?
+        """, (next_start, matches_stored, round(matches_per_sec, 2), self._now(), puuid))
+
+    async def _run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        # A job interrupted by shutdown carries on from its checkpoint after restart
+        await self._handler(job, self)
+        return {}
+
+
+backfill_queue = BackfillQueue(os.getenv("BACKFILL_DB", "data/backfill.sqlite3"),
+                               workers=int(os.getenv("BACKFILL_WORKERS", "1")))
@@ -0,0 +1,234 @@
+"""Load test of the app's hot paths against local Riot and Supabase stand-ins.
+
+Starts the Riot stub and the SQLite-backed Supabase stand-in, runs the app
+under uvicorn pointed at both, seeds it by submitting every stub summoner,
+then drives each scenario with ``--concurrency`` concurrent clients and
+reports requests per second and p50/p95/p99 latency.
+
+Run from the repo root:
+    python -m benchmarks.bench_endpoints --concurrency 16 --requests 200 --riot-latency 0.05
+    python -m benchmarks.bench_endpoints --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List, Tuple, Callable, Optional
+
+import httpx
+
+from benchmarks import stub_riot, stub_supabase
+
+# Any well-formed key will do; the stand-in doesn't check it
+STUB_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.stub"
+PLATFORM = "EUW1"
+REGION = "europe"
+
+Player = Tuple[str, str, str]
+# (method, url, request kwargs, expected status)
+RequestSpec = Tuple[str, str, Dict[str, Any], int]
+
+
+def _submit_summoner(player: Player) -> RequestSpec:
+    name, tag, _ = player
+    return "POST", "/submit-summoner", {"data": {"summoner_name": name, "tagline": tag, "region": PLATFORM}}, 303
+
+
+def _refresh_summoner_data(player: Player) -> RequestSpec:
+    name, tag, _ = player
+    return "GET", f"/refresh-summoner/{name}/{tag}/{PLATFORM}", {}, 303
+
+
+def _update_matches(player: Player) -> RequestSpec:
+    return "POST", "/summoners/update-matches", {"json": {"puuid": player[2], "region": REGION}}, 200
+
+
+def _stats(player: Player) -> RequestSpec:
+    return "GET", f"/summoners/stats/{player[2]}", {}, 200
+
+
+def _api_matches(player: Player) -> RequestSpec:
+    name, tag, _ = player
+    return "GET", f"/api/matches/{name}/{tag}/{PLATFORM}", {"params": {"limit": 10}}, 200
+
+
+SCENARIOS: Dict[str, Callable[[Player], RequestSpec]] = {
+    "submit_summoner": _submit_summoner,
+    "refresh_summoner_data": _refresh_summoner_data,
+    "update_matches": _update_matches,
+    "stats": _stats,
+    "api_matches": _api_matches,
+}
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    # Nearest-rank, so p99 of a short run is an observed latency
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(p / 100 * len(sorted_values)) - 1))]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, build: Callable[[Player], RequestSpec], players: List[Player],
+                       requests: int, concurrency: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            method, url, kwargs, expected = build(players[index % len(players)])
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                ok = response.status_code == expected
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += 0 if ok else 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(port: int, env: Dict[str, str]) -> subprocess.Popen:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                             "--log-level", "warning", "--no-access-log"],
+                            cwd=root, env={**os.environ, **env})
+
+
+async def wait_until_ready(client: httpx.AsyncClient, app: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if app.poll() is not None:
+            raise RuntimeError(f"App exited with code {app.returncode}")
+        try:
+            if (await client.get("/summoners/rate-limits")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("App did not start in time")
+
+
+def print_report(results: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]] = None):
+    print(f"{'scenario':<24}{'requests':>9}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, result in results.items():
+        print(f"{name:<24}{result['requests']:>9}{result['errors']:>8}{result['rps']:>9}"
+              f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}")
+        before = (baseline or {}).get(name)
+        if before:
+            # Relative change against the baseline run; negative latency is better
+            changes = [f"{key} {(result[key] - before[key]) / before[key] * 100:+.1f}%"
+                       for key in ("rps", "p50_ms", "p95_ms", "p99_ms") if before[key]]
+            print(f"{'':<24}vs baseline: {', '.join(changes)}")
+
+
+async def run(args):
+    riot = stub_riot.start_stub_server(latency=args.riot_latency, fixtures_dir=args.fixtures,
+                                       rate_limit_every=args.rate_limit_every, retry_after=args.retry_after,
+                                       max_history=args.history)
+    supabase = stub_supabase.start_stub_server(latency=args.supabase_latency)
+    players = stub_riot.riot_ids(riot.RequestHandlerClass.fixtures)[:args.summoners]
+    workdir = tempfile.mkdtemp(prefix="bench-endpoints-")
+    port = _free_port()
+    app = start_app(port, {
+        "SUPABASE_URL": f"http://127.0.0.1:{supabase.server_port}",
+        "SUPABASE_KEY": STUB_SUPABASE_KEY,
+        "RIOT_API_KEY": "stub-key",
+        "RIOT_API_BASE_URL": f"http://127.0.0.1:{riot.server_port}",
+        # Keep background work to what the scenarios themselves cause
+        "AUTO_REFRESH_RPM": "0",
+        "BACKFILL_ON_CREATE": "true" if args.backfill else "false",
+        "REFRESH_QUEUE_DB": os.path.join(workdir, "refresh_queue.sqlite3"),
+        "BACKFILL_DB": os.path.join(workdir, "backfill.sqlite3"),
+        "MATCH_STORE_DIR": os.path.join(workdir, "matches"),
+        "RESPONSE_CACHE_BACKEND": "memory",
+    })
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await wait_until_ready(client, app)
+            # Every scenario after this one expects the summoners to be tracked
+            await run_scenario(client, _submit_summoner, players, len(players), args.concurrency)
+
+            results = {}
+            for name in args.scenarios:
+                for _ in range(args.warmup):
+                    await run_scenario(client, SCENARIOS[name], players, len(players), args.concurrency)
+                results[name] = await run_scenario(client, SCENARIOS[name], players, args.requests, args.concurrency)
+    finally:
+        app.terminate()
+        app.wait(timeout=10)
+        riot.shutdown()
+        supabase.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+    riot_counters = riot.RequestHandlerClass.counters
+    print(f"\nRiot stub: {riot_counters['requests']} requests, {riot_counters['rate_limited']} answered 429")
+    supabase_counters = supabase.RequestHandlerClass.counters
+    print(f"Supabase stand-in: {sum(supabase_counters.values())} requests, "
+          f"{supabase_counters.get('414', 0)} rejected for an oversized URL")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+                       "results": results}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients per scenario")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured rounds over the summoners first")
+    parser.add_argument("--summoners", type=int, default=10, help="distinct summoners to spread requests over")
+    parser.add_argument("--riot-latency", type=float, default=0.05, help="Riot stub latency per request, seconds")
+    parser.add_argument("--supabase-latency", type=float, default=0.005, help="Supabase stand-in latency per request, seconds")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth Riot request with a 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with injected 429s, seconds")
+    parser.add_argument("--history", type=int, default=100, help="matches per synthetic summoner")
+    parser.add_argument("--fixtures", help="directory of recorded match-v5 JSON payloads to serve instead of synthetic ones")
+    parser.add_argument("--backfill", action="store_true", help="let new profiles queue full-history backfills")
+    parser.add_argument("--output", help="write results as JSON, e.g. to compare a later run against")
+    parser.add_argument("--compare", help="JSON results of a baseline run to report changes against")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Sequential vs concurrent match-v5 detail fetches against the local stub.
+
+Goes through summoner_service.get_matchdata_many, as refreshes do, with an
+empty match store in a temporary directory each round so every match is
+fetched from the stub (and then written to the store).
+
+Run from the repo root:
+    python -m benchmarks.bench_match_fetch --matches 10 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("RIOT_API_KEY", "stub-key")
+# summoner_service builds its Supabase client at import; nothing here reaches it
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.stub")
+
+import summoner_service
+from match_store import MatchStore
+from riot_client import RiotClient
+from benchmarks.stub_riot import start_stub_server, match_ids
+
+
+async def fetch_sequential(ids):
+    return [await summoner_service.get_matchdata("europe", match_id) for match_id in ids]
+
+
+async def fetch_concurrent(ids):
+    return await summoner_service.get_matchdata_many("europe", ids)
+
+
+async def timed_round(fetch, ids) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        summoner_service.match_store = MatchStore(directory)
+        start = time.perf_counter()
+        results = await fetch(ids)
+        elapsed = time.perf_counter() - start
+    assert [r["metadata"]["matchId"] for r in results] == ids
+    return elapsed
+
+
+async def run(matches: int, latency: float, concurrency: int, rounds: int):
+    server = start_stub_server(latency=latency)
+    client = RiotClient("stub-key", base_url=f"http://127.0.0.1:{server.server_port}",
+                        max_concurrency=concurrency)
+    summoner_service.riot_client = client
+    ids = match_ids(matches)
+    try:
+        # Warm up the connection pool so both modes start from the same state
+        await timed_round(fetch_concurrent, ids)
+        for name, fetch in (("sequential", fetch_sequential), ("concurrent", fetch_concurrent)):
+            timings = [await timed_round(fetch, ids) for _ in range(rounds)]
+            best = min(timings)
+            print(f"{name:>10}: {best * 1000:8.1f} ms best of {rounds} "
+                  f"({best / latency:.1f} round-trips)")
+    finally:
+        await client.close()
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub latency per request, seconds")
+    parser.add_argument("--concurrency", type=int, default=10, help="per-region concurrency cap")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.matches, args.latency, args.concurrency, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
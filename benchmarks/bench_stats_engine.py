@@ -0,0 +1,75 @@
+"""Microbenchmark for stats_engine.MatchArrays against plain dict loops.
+
+Run from the repo root:
+    python -m benchmarks.bench_stats_engine --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import time
+
+from stats_engine import MatchArrays
+
+CHAMPIONS = ["Ahri", "LeeSin", "Garen", "Jinx", "Thresh", "Yasuo", "Lux", "Darius", "Ezreal", "Leona"] * 17
+
+
+def make_rows(n: int):
+    rng = random.Random(0)
+    return [{
+        "win": rng.random() < 0.5,
+        "kills": rng.randint(0, 20),
+        "deaths": rng.randint(0, 15),
+        "assists": rng.randint(0, 25),
+        "damage_per_minute": rng.uniform(200, 1500),
+        "champion_name": rng.choice(CHAMPIONS) + str(rng.randint(0, 16)),
+    } for _ in range(n)]
+
+
+def dict_loop_stats(rows):
+    # What the per-request helpers did before: repeated passes of .get calls
+    wins = sum(1 for row in rows if row["win"])
+    kills = sum(row["kills"] for row in rows if row.get("kills") is not None)
+    deaths = sum(row["deaths"] for row in rows if row.get("deaths") is not None)
+    assists = sum(row["assists"] for row in rows if row.get("assists") is not None)
+    champions = {}
+    for row in rows:
+        stats = champions.setdefault(row.get("champion_name"), {"games": 0, "wins": 0})
+        stats["games"] += 1
+        stats["wins"] += 1 if row["win"] else 0
+    dpm = sorted(row["damage_per_minute"] for row in rows)
+    percentiles = [dpm[int(len(dpm) * p / 100)] for p in (25, 50, 75, 90)]
+    window = [sum(1 for row in rows[i:i + 10] if row["win"]) for i in range(len(rows) - 9)]
+    return wins, kills, deaths, assists, champions, percentiles, window
+
+
+def vectorized_stats(arrays: MatchArrays):
+    return (arrays.win_rate(), arrays.avg_kda(), arrays.most_played_champions(),
+            arrays.damage_per_minute_percentiles(), arrays.rolling_win_rate(10))
+
+
+def best_of(fn, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'dict loops':>12} {'from_rows':>12} {'vectorized':>12}")
+    for n in args.sizes:
+        rows = make_rows(n)
+        arrays = MatchArrays.from_rows(rows)
+        loops = best_of(lambda: dict_loop_stats(rows), args.rounds)
+        convert = best_of(lambda: MatchArrays.from_rows(rows), args.rounds)
+        vectorized = best_of(lambda: vectorized_stats(arrays), args.rounds)
+        print(f"{n:>10} {loops:>10.1f}ms {convert:>10.1f}ms {vectorized:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
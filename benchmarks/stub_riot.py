@@ -0,0 +1,212 @@
+"""Minimal local stand-in for the Riot API used by the benchmarks.
+
+Serves account-v1 and match-v5 routes with a fixed per-request latency, so
+client-side changes can be timed without a real key. Match payloads are
+synthetic unless a directory of recorded match-v5 responses is given, in
+which case those are served and their participants' Riot IDs resolve.
+Every ``rate_limit_every``-th request can be answered with a 429.
+"""
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Tuple, Optional
+from urllib.parse import parse_qsl, unquote
+
+TRACKED_PUUID = "stub-puuid-0"
+SYNTHETIC_PLAYERS = 10
+# Synthetic game STUB_i started i hours before this
+LATEST_GAME_START = 1700000000000
+
+
+def make_match(match_id: str, start_ts: int = LATEST_GAME_START) -> Dict[str, Any]:
+    puuids = [f"stub-puuid-{i}" for i in range(SYNTHETIC_PLAYERS)]
+    participants = []
+    for i, puuid in enumerate(puuids):
+        team_id = 100 if i < 5 else 200
+        participants.append({
+            "puuid": puuid,
+            "participantId": i + 1,
+            "teamId": team_id,
+            "win": team_id == 100,
+            "role": "SOLO",
+            "teamPosition": ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"][i % 5],
+            "kills": i,
+            "deaths": 10 - i,
+            "assists": 5,
+            "riotIdGameName": f"Stub{i}",
+            "riotIdTagline": "STUB",
+            "summonerLevel": 100 + i,
+            "championName": ["Ahri", "LeeSin", "Garen", "Jinx", "Thresh"][i % 5],
+            "totalDamageDealtToChampions": 15000 + i * 1000,
+            "enemyMissingPings": 0,
+            "goldEarned": 9000 + i * 250,
+            "challenges": {"damagePerMinute": 600.0 + i * 10, "skillshotsDodged": 3, "skillshotsHit": 7},
+            "damageDealtToTurrets": 1000,
+            "longestTimeSpentLiving": 400,
+            "gameEndedInSurrender": False,
+            "teamEarlySurrendered": False,
+        })
+    return {
+        "metadata": {"matchId": match_id, "participants": puuids},
+        "info": {
+            "gameStartTimestamp": start_ts,
+            "gameDuration": 1800,
+            "participants": participants,
+            "teams": [{"teamId": 100, "win": True}, {"teamId": 200, "win": False}],
+        },
+    }
+
+
+def match_ids(count: int, start: int = 0) -> List[str]:
+    return [f"STUB_{i}" for i in range(start, start + count)]
+
+
+def synthetic_start(match_id: str) -> int:
+    m = re.fullmatch(r"STUB_(\d+)", match_id)
+    return LATEST_GAME_START - int(m.group(1)) * 3600 * 1000 if m else LATEST_GAME_START
+
+
+def load_fixtures(directory: str) -> Dict[str, Dict[str, Any]]:
+    """Recorded match-v5 payloads (one JSON file per match), keyed by match ID."""
+    fixtures = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name)) as f:
+                match = json.load(f)
+            fixtures[match["metadata"]["matchId"]] = match
+    return fixtures
+
+
+def riot_ids(fixtures: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Tuple[str, str, str]]:
+    """(game name, tagline, puuid) of every player the stub knows, most games first."""
+    if not fixtures:
+        return [(f"Stub{i}", "STUB", f"stub-puuid-{i}") for i in range(SYNTHETIC_PLAYERS)]
+    players, games = {}, {}
+    for match in fixtures.values():
+        for player in match["info"]["participants"]:
+            if player.get("riotIdGameName") and player.get("riotIdTagline"):
+                players[player["puuid"]] = (player["riotIdGameName"], player["riotIdTagline"], player["puuid"])
+                games[player["puuid"]] = games.get(player["puuid"], 0) + 1
+    return sorted(players.values(), key=lambda player: -games[player[2]])
+
+
+class StubRiotHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this keep-alive
+    # requests stall on delayed ACKs
+    disable_nagle_algorithm = True
+    latency = 0.05
+    # Answer every Nth request with a 429 (0 disables)
+    rate_limit_every = 0
+    retry_after = 1.0
+    max_history = 100
+    fixtures: Dict[str, Dict[str, Any]] = {}
+    # Derived from fixtures in start_stub_server
+    accounts: Dict[str, str] = {}
+    history: Dict[str, List[str]] = {}
+    # Shared per server: requests served and 429s sent
+    counters: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        # Advertise limits generous enough that the client never throttles
+        self.send_header("X-App-Rate-Limit", "10000:1")
+        self.send_header("X-Method-Rate-Limit", "10000:1")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _throttled(self) -> bool:
+        with self.lock:
+            self.counters["requests"] += 1
+            throttled = self.rate_limit_every > 0 and self.counters["requests"] % self.rate_limit_every == 0
+            if throttled:
+                self.counters["rate_limited"] += 1
+        return throttled
+
+    def _puuid_for(self, game_name: str, tagline: str) -> Optional[str]:
+        if self.fixtures:
+            return self.accounts.get(f"{game_name}#{tagline}".lower())
+        m = re.fullmatch(r"stub(\d+)", game_name.lower())
+        return f"stub-puuid-{m.group(1)}" if m and int(m.group(1)) < SYNTHETIC_PLAYERS else TRACKED_PUUID
+
+    def _match_ids(self, puuid: str, params: Dict[str, str]) -> List[str]:
+        start, count = int(params.get("start", 0)), int(params.get("count", 20))
+        if not self.fixtures:
+            return match_ids(max(0, min(count, self.max_history - start)), start)
+        ids = self.history.get(puuid, [])
+        if "startTime" in params or "endTime" in params:
+            start_ms = int(params.get("startTime", 0)) * 1000
+            end_ms = int(params.get("endTime", 2 ** 40)) * 1000
+            ids = [match_id for match_id in ids
+                   if start_ms <= self.fixtures[match_id]["info"]["gameStartTimestamp"] <= end_ms]
+        return ids[start:start + count]
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if self._throttled():
+            # Same shape as Riot's: the client should back off for Retry-After
+            return self._send_json(429, {"status": {"status_code": 429, "message": "Rate limit exceeded"}},
+                                   {"Retry-After": str(self.retry_after), "X-Rate-Limit-Type": "method"})
+        path, _, query = self.path.partition("?")
+        params = dict(parse_qsl(query))
+
+        m = re.fullmatch(r"/riot/account/v1/accounts/by-riot-id/([^/]+)/([^/]+)", path)
+        if m:
+            puuid = self._puuid_for(unquote(m.group(1)), unquote(m.group(2)))
+            if puuid is None:
+                return self._send_json(404, {"status": {"status_code": 404, "message": "Data not found"}})
+            return self._send_json(200, {"puuid": puuid, "gameName": unquote(m.group(1)), "tagLine": unquote(m.group(2))})
+        m = re.fullmatch(r"/lol/match/v5/matches/by-puuid/([^/]+)/ids", path)
+        if m:
+            return self._send_json(200, self._match_ids(m.group(1), params))
+        m = re.fullmatch(r"/lol/match/v5/matches/([^/]+)", path)
+        if m:
+            if self.fixtures:
+                match = self.fixtures.get(m.group(1))
+                if match is None:
+                    return self._send_json(404, {"status": {"status_code": 404, "message": "Data not found"}})
+                return self._send_json(200, match)
+            return self._send_json(200, make_match(m.group(1), synthetic_start(m.group(1))))
+        self._send_json(404, {"status": {"status_code": 404, "message": "Not found"}})
+
+
+def start_stub_server(latency: float = 0.05, port: int = 0, fixtures_dir: Optional[str] = None,
+                      rate_limit_every: int = 0, retry_after: float = 1.0,
+                      max_history: int = 100) -> ThreadingHTTPServer:
+    """Start the stub in a daemon thread; ``server.server_port`` gives the bound port.
+
+    ``server.RequestHandlerClass.counters`` counts requests and 429s sent.
+    Synthetic summoners have ``max_history`` matches each.
+    """
+    fixtures = load_fixtures(fixtures_dir) if fixtures_dir else {}
+    history = {}
+    for match_id, match in sorted(fixtures.items(), key=lambda item: -item[1]["info"]["gameStartTimestamp"]):
+        for puuid in match["metadata"]["participants"]:
+            history.setdefault(puuid, []).append(match_id)
+    handler = type("Handler", (StubRiotHandler,), {
+        "latency": latency,
+        "rate_limit_every": rate_limit_every,
+        "retry_after": retry_after,
+        "max_history": max_history,
+        "fixtures": fixtures,
+        "accounts": {f"{name}#{tag}".lower(): puuid for name, tag, puuid in riot_ids(fixtures)} if fixtures else {},
+        "history": history,
+        "counters": {"requests": 0, "rate_limited": 0},
+        "lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,535 @@
+"""SQLite-backed local stand-in for the Supabase REST API used by the benchmarks.
+
+Implements the subset of PostgREST that the app's queries produce: column
+selection with one-to-many embeds, eq/neq/gt/gte/lt/lte/in/is/like filters
+(optionally negated, and nested in or/and), multi-column order, limit and
+offset, insert/upsert with RETURNING, update, delete, and the summoner_stats
+and rebuild_summoner_rollups RPCs. The schema mirrors migrations/, including
+the rollup triggers, so the handlers take the same paths as in production.
+
+Queries run on a single SQLite connection behind a lock; ``latency`` adds a
+fixed delay per request to stand in for the network round trip. Request URLs
+longer than ``max_url_length`` get a 414, as the gateway in front of
+PostgREST would answer, so unchunked in_() filters fail here too.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Tuple, Optional
+from urllib.parse import parse_qsl
+
+# Nginx's default large_client_header_buffers size, which Supabase's gateway shares
+MAX_URL_LENGTH = 8192
+
+SCHEMA = """
+create table if not exists summoner_profiles (
+  id integer primary key autoincrement,
+  puuid text not null unique,
+  summoner_name text,
+  tagline text,
+  region text,
+  level integer,
+  icon_id integer,
+  last_updated text,
+  last_match_id text,
+  last_match_start text
+);
+
+create table if not exists matches (
+  match_id text primary key,
+  game_start text not null,
+  game_duration integer,
+  queue_id integer,
+  participant_count integer,
+  winning_team integer,
+  ended_in_surrender boolean not null default 0,
+  ended_in_early_surrender boolean not null default 0,
+  blue_kills integer not null default 0,
+  blue_gold integer not null default 0,
+  blue_damage integer not null default 0,
+  red_kills integer not null default 0,
+  red_gold integer not null default 0,
+  red_damage integer not null default 0
+);
+
+create table if not exists player_matches (
+  id integer primary key autoincrement,
+  match_id text not null references matches (match_id),
+  puuid text not null,
+  win boolean,
+  role text,
+  kills integer,
+  deaths integer,
+  assists integer,
+  team_id integer,
+  team_position text,
+  position_order integer,
+  game_start text,
+  summoner_profile_id integer,
+  riotid_gamename text,
+  riotid_tagline text,
+  summoner_level integer,
+  champion_name text,
+  total_damagedealttochampions integer,
+  enemy_missing_pings integer,
+  gold_earned integer,
+  damage_per_minute real,
+  skillshot_dodged integer,
+  skillshot_hit integer,
+  damage_dealt_to_turrets integer,
+  longest_time_living integer,
+  game_ended_in_surrender boolean,
+  team_early_surrendered boolean,
+  unique (puuid, match_id)
+);
+create index if not exists player_matches_keyset_idx on player_matches (puuid, game_start desc, match_id desc);
+create index if not exists player_matches_match_idx on player_matches (match_id, team_id, position_order);
+
+create table if not exists riot_id_mappings (
+  riot_id text primary key,
+  puuid text not null unique,
+  game_name text not null,
+  tagline text not null,
+  updated_at text not null default current_timestamp
+);
+
+create table if not exists summoner_stats_rollup (
+  puuid text primary key,
+  games integer not null default 0,
+  wins integer not null default 0,
+  kills integer not null default 0,
+  deaths integer not null default 0,
+  assists integer not null default 0,
+  damage integer not null default 0,
+  gold integer not null default 0,
+  updated_at text not null default current_timestamp
+);
+
+create table if not exists summoner_champion_rollup (
+  puuid text not null references summoner_stats_rollup (puuid) on delete cascade,
+  champion_name text not null,
+  games integer not null default 0,
+  wins integer not null default 0,
+  kills integer not null default 0,
+  deaths integer not null default 0,
+  assists integer not null default 0,
+  damage integer not null default 0,
+  gold integer not null default 0,
+  primary key (puuid, champion_name)
+);
+"""
+
+# Row-level versions of the statement-level triggers in 004_summoner_rollups.sql
+ROLLUP_TRIGGER = """
+create trigger if not exists player_matches_rollup_{event} after {event} on player_matches
+begin
+  insert or ignore into summoner_stats_rollup (puuid) values ({row}.puuid);
+  update summoner_stats_rollup set
+    games = games + {sign},
+    wins = wins + {sign} * coalesce({row}.win, 0),
+    kills = kills + {sign} * coalesce({row}.kills, 0),
+    deaths = deaths + {sign} * coalesce({row}.deaths, 0),
+    assists = assists + {sign} * coalesce({row}.assists, 0),
+    damage = damage + {sign} * coalesce({row}.total_damagedealttochampions, 0),
+    gold = gold + {sign} * coalesce({row}.gold_earned, 0),
+    updated_at = current_timestamp
+  where puuid = {row}.puuid;
+  insert or ignore into summoner_champion_rollup (puuid, champion_name)
+    select {row}.puuid, {row}.champion_name where {row}.champion_name is not null;
+  update summoner_champion_rollup set
+    games = games + {sign},
+    wins = wins + {sign} * coalesce({row}.win, 0),
+    kills = kills + {sign} * coalesce({row}.kills, 0),
+    deaths = deaths + {sign} * coalesce({row}.deaths, 0),
+    assists = assists + {sign} * coalesce({row}.assists, 0),
+    damage = damage + {sign} * coalesce({row}.total_damagedealttochampions, 0),
+    gold = gold + {sign} * coalesce({row}.gold_earned, 0)
+  where puuid = {row}.puuid and champion_name = {row}.champion_name;
+end;
+"""
+
+# (parent table, embedded table) -> (parent column, embedded column)
+RELATIONSHIPS = {
+    ("summoner_stats_rollup", "summoner_champion_rollup"): ("puuid", "puuid"),
+    ("matches", "player_matches"): ("match_id", "match_id"),
+}
+
+OPERATORS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "like": "like", "ilike": "like"}
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+class PostgrestError(Exception):
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def split_top_level(text: str) -> List[str]:
+    """Split on commas outside parentheses and double quotes."""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    if current:
+        parts.append(current)
+    return [part.strip() for part in parts]
+
+
+def unquote_value(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+
+class Database:
+    def __init__(self, path: str = ":memory:"):
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        self.db.executescript(SCHEMA)
+        self.db.executescript(ROLLUP_TRIGGER.format(event="insert", row="new", sign=1)
+                              + ROLLUP_TRIGGER.format(event="delete", row="old", sign=-1))
+        self.columns: Dict[str, List[str]] = {}
+        self.booleans: Dict[str, set] = {}
+        self.primary_keys: Dict[str, List[str]] = {}
+        for (table,) in self.db.execute("select name from sqlite_master where type = 'table' and name not like 'sqlite_%'"):
+            info = self.db.execute(f"pragma table_info({table})").fetchall()
+            self.columns[table] = [col["name"] for col in info]
+            self.booleans[table] = {col["name"] for col in info if col["type"].lower() == "boolean"}
+            self.primary_keys[table] = [col["name"] for col in sorted(info, key=lambda c: c["pk"]) if col["pk"]]
+
+    # -- query building
+
+    def _table(self, table: str) -> str:
+        if table not in self.columns:
+            raise PostgrestError(404, "42P01", f'relation "public.{table}" does not exist')
+        return table
+
+    def _column(self, table: str, column: str) -> str:
+        if column not in self.columns[table]:
+            raise PostgrestError(400, "42703", f"column {table}.{column} does not exist")
+        return f'"{column}"'
+
+    def _value(self, table: str, column: str, value: str) -> Any:
+        if column in self.booleans[table] and value in ("true", "false"):
+            return 1 if value == "true" else 0
+        return value
+
+    def _condition(self, table: str, column: str, expression: str) -> Tuple[str, List[Any]]:
+        negate = expression.startswith("not.")
+        if negate:
+            expression = expression[4:]
+        op, _, raw = expression.partition(".")
+        col = self._column(table, column)
+        if op == "in":
+            values = [self._value(table, column, unquote_value(v)) for v in split_top_level(raw.strip("()"))]
+            sql, params = f"{col} in ({', '.join('?' * len(values))})", values
+        elif op == "is":
+            if raw not in ("null", "true", "false"):
+                raise PostgrestError(400, "PGRST100", f"unsupported is value {raw}")
+            sql, params = f"{col} is {raw}", []
+        elif op in OPERATORS:
+            sql, params = f"{col} {OPERATORS[op]} ?", [self._value(table, column, unquote_value(raw))]
+            if op == "like" or op == "ilike":
+                params = [params[0].replace("*", "%")]
+        else:
+            raise PostgrestError(400, "PGRST100", f"unsupported operator {op}")
+        return (f"not ({sql})" if negate else sql), params
+
+    def _logic(self, table: str, operator: str, body: str) -> Tuple[str, List[Any]]:
+        # or=(a.eq.1,and(b.gt.2,c.lt.3))
+        clauses, params = [], []
+        for item in split_top_level(body[1:-1]):
+            m = re.fullmatch(r"(not\.)?(and|or)(\(.*\))", item)
+            if m:
+                sql, item_params = self._logic(table, m.group(2), m.group(3))
+                sql = f"not ({sql})" if m.group(1) else sql
+            else:
+                column, _, expression = item.partition(".")
+                sql, item_params = self._condition(table, column, expression)
+            clauses.append(sql)
+            params.extend(item_params)
+        return "(" + f" {operator} ".join(clauses) + ")", params
+
+    def _where(self, table: str, filters: List[Tuple[str, str]]) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for key, value in filters:
+            if key in ("or", "and"):
+                sql, item_params = self._logic(table, key, value)
+            else:
+                sql, item_params = self._condition(table, key, value)
+            clauses.append(sql)
+            params.extend(item_params)
+        return (" where " + " and ".join(clauses)) if clauses else "", params
+
+    def _order(self, table: str, order: Optional[str]) -> str:
+        if not order:
+            return ""
+        terms = []
+        for term in order.split(","):
+            column, *modifiers = term.split(".")
+            direction = "desc" if "desc" in modifiers else "asc"
+            # Postgres defaults: nulls last ascending, first descending
+            nulls = "first" if "nullsfirst" in modifiers else "last" if "nullslast" in modifiers else (
+                "first" if direction == "desc" else "last")
+            terms.append(f"{self._column(table, column)} {direction} nulls {nulls}")
+        return " order by " + ", ".join(terms)
+
+    def _output(self, table: str, row: sqlite3.Row, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        out = {}
+        for column in columns or row.keys():
+            value = row[column]
+            out[column] = bool(value) if column in self.booleans[table] and value is not None else value
+        return out
+
+    # -- operations
+
+    def select(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        table = self._table(table)
+        options = {key: value for key, value in params if key in RESERVED_PARAMS}
+        columns, embeds = [], {}
+        for item in split_top_level(options.get("select", "*")):
+            m = re.fullmatch(r"(?:(\w+):)?(\w+)\((.*)\)", item, re.S)
+            if m:
+                alias, child = m.group(1) or m.group(2), m.group(2)
+                if (table, child) not in RELATIONSHIPS:
+                    raise PostgrestError(400, "PGRST200", f"no relationship between {table} and {child}")
+                embeds[alias] = {"table": self._table(child), "select": m.group(3), "filters": [], "order": None, "limit": None}
+            elif item == "*":
+                columns.extend(self.columns[table])
+            else:
+                self._column(table, item)
+                columns.append(item)
+
+        filters = []
+        for key, value in params:
+            alias, _, rest = key.partition(".")
+            if rest and alias in embeds:
+                if rest in ("order", "limit"):
+                    embeds[alias][rest] = value
+                else:
+                    embeds[alias]["filters"].append((rest, value))
+            elif key not in RESERVED_PARAMS:
+                filters.append((key, value))
+
+        where, args = self._where(table, filters)
+        sql = f'select * from "{table}"{where}{self._order(table, options.get("order"))}'
+        if "limit" in options:
+            sql += " limit ?"
+            args.append(int(options["limit"]))
+        if "offset" in options:
+            sql += ("" if "limit" in options else " limit -1") + " offset ?"
+            args.append(int(options["offset"]))
+        rows = self.db.execute(sql, args).fetchall()
+        result = [self._output(table, row, columns) for row in rows]
+
+        for alias, embed in embeds.items():
+            parent_key, child_key = RELATIONSHIPS[(table, embed["table"])]
+            wanted = None if embed["select"] == "*" else split_top_level(embed["select"])
+            select = embed["select"] if wanted is None or child_key in wanted else f"{embed['select']},{child_key}"
+            keys = list({row[parent_key] for row in rows})
+            children = []
+            if keys:
+                child_params = [("select", select)] + embed["filters"]
+                child_params.append((child_key, "in.(" + ",".join(json.dumps(str(k)) for k in keys) + ")"))
+                if embed["order"]:
+                    child_params.append(("order", embed["order"]))
+                children = self.select(embed["table"], child_params)
+            grouped: Dict[Any, List[Dict[str, Any]]] = {}
+            for child in children:
+                grouped.setdefault(child[child_key], []).append(child)
+            limit = int(embed["limit"]) if embed["limit"] else None
+            for row, out in zip(rows, result):
+                matched = grouped.get(row[parent_key], [])[:limit]
+                out[alias] = [{k: child[k] for k in wanted} if wanted else child for child in matched]
+        return result
+
+    def insert(self, table: str, params: List[Tuple[str, str]], body: Any, resolution: Optional[str]) -> List[Dict[str, Any]]:
+        table = self._table(table)
+        options = dict(params)
+        rows = body if isinstance(body, list) else [body]
+        conflict = options.get("on_conflict", ",".join(self.primary_keys[table])).split(",")
+        inserted = []
+        self.db.execute("begin")
+        try:
+            for row in rows:
+                columns = list(row)
+                names = ", ".join(self._column(table, column) for column in columns)
+                sql = f'insert into "{table}" ({names}) values ({", ".join("?" * len(columns))})'
+                if resolution:
+                    updates = [c for c in columns if c not in conflict]
+                    target = ", ".join(self._column(table, c) for c in conflict)
+                    if resolution == "merge-duplicates" and updates:
+                        sql += f" on conflict ({target}) do update set " + ", ".join(
+                            f"{self._column(table, c)} = excluded.{self._column(table, c)}" for c in updates)
+                    else:
+                        sql += f" on conflict ({target}) do nothing"
+                cursor = self.db.execute(sql + " returning *", [row[c] for c in columns])
+                inserted.extend(self._output(table, r) for r in cursor.fetchall())
+            self.db.execute("commit")
+        except Exception:
+            self.db.execute("rollback")
+            raise
+        return inserted
+
+    def update(self, table: str, params: List[Tuple[str, str]], body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        table = self._table(table)
+        where, args = self._where(table, [(k, v) for k, v in params if k not in RESERVED_PARAMS])
+        assignments = ", ".join(f"{self._column(table, column)} = ?" for column in body)
+        rows = self.db.execute(f'update "{table}" set {assignments}{where} returning *', list(body.values()) + args).fetchall()
+        return [self._output(table, row) for row in rows]
+
+    def delete(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        table = self._table(table)
+        where, args = self._where(table, [(k, v) for k, v in params if k not in RESERVED_PARAMS])
+        rows = self.db.execute(f'delete from "{table}"{where} returning *', args).fetchall()
+        return [self._output(table, row) for row in rows]
+
+    def rpc(self, name: str, args: Dict[str, Any]) -> Any:
+        if name == "summoner_stats":
+            return self.summoner_stats(args["p_puuid"])
+        if name == "rebuild_summoner_rollups":
+            return self.rebuild_rollups(args.get("p_puuid"))
+        raise PostgrestError(404, "PGRST202", f"Could not find the function public.{name}")
+
+    def summoner_stats(self, puuid: str) -> Dict[str, Any]:
+        totals = ("count(*) as games, coalesce(sum(win), 0) as wins, coalesce(sum(kills), 0) as kills, "
+                  "coalesce(sum(deaths), 0) as deaths, coalesce(sum(assists), 0) as assists")
+        overall = self.db.execute(f"select {totals} from player_matches where puuid = ?", (puuid,)).fetchone()
+        champions = self.db.execute(f"""
+            select champion_name, {totals} from player_matches
+            where puuid = ? and champion_name is not null
+            group by champion_name order by games desc
+        """, (puuid,)).fetchall()
+        return {"overall": dict(overall), "champions": [dict(row) for row in champions]}
+
+    def rebuild_rollups(self, puuid: Optional[str]) -> int:
+        scope, args = ("where puuid = ?", (puuid,)) if puuid else ("", ())
+        self.db.execute("begin")
+        try:
+            rebuilt = self._rebuild_rollups(scope, args)
+            self.db.execute("commit")
+        except Exception:
+            self.db.execute("rollback")
+            raise
+        return rebuilt
+
+    def _rebuild_rollups(self, scope: str, args: Tuple[Any, ...]) -> int:
+        self.db.execute(f"delete from summoner_champion_rollup {scope}", args)
+        self.db.execute(f"delete from summoner_stats_rollup {scope}", args)
+        sums = ("count(*), coalesce(sum(win), 0), coalesce(sum(kills), 0), coalesce(sum(deaths), 0), "
+                "coalesce(sum(assists), 0), coalesce(sum(total_damagedealttochampions), 0), coalesce(sum(gold_earned), 0)")
+        self.db.execute(f"""
+            insert into summoner_stats_rollup (puuid, games, wins, kills, deaths, assists, damage, gold)
+            select puuid, {sums} from player_matches {scope} group by puuid
+        """, args)
+        self.db.execute(f"""
+            insert into summoner_champion_rollup (puuid, champion_name, games, wins, kills, deaths, assists, damage, gold)
+            select puuid, champion_name, {sums} from player_matches
+            {scope + ' and' if scope else 'where'} champion_name is not null group by puuid, champion_name
+        """, args)
+        return self.db.execute(f"select count(*) from summoner_stats_rollup {scope}", args).fetchone()[0]
+
+
+class StubSupabaseHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # As in stub_riot: keep-alive responses would otherwise wait on delayed ACKs
+    disable_nagle_algorithm = True
+    latency = 0.0
+    max_url_length = MAX_URL_LENGTH
+    database: Database = None
+    # Shared per server: requests served, by "METHOD table"
+    counters: Dict[str, int] = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Any):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self):
+        time.sleep(self.latency)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        if len(self.path) > self.max_url_length:
+            with self.database.lock:
+                self.counters["414"] = self.counters.get("414", 0) + 1
+            return self._send_json(414, {"message": "Request-URI Too Large"})
+        path, _, query = self.path.partition("?")
+        params = parse_qsl(query, keep_blank_values=True)
+        body = json.loads(raw_body) if raw_body else None
+        prefer = {part.strip() for part in (self.headers.get("Prefer") or "").split(",")}
+        resolution = next((p.split("=", 1)[1] for p in prefer if p.startswith("resolution=")), None)
+
+        m = re.fullmatch(r"/rest/v1/(rpc/)?(\w+)", path)
+        if not m:
+            return self._send_json(404, {"code": "PGRST125", "message": f"Invalid path {path}"})
+        name = m.group(2)
+        database = self.database
+        with database.lock:
+            key = f"{self.command} {'rpc/' if m.group(1) else ''}{name}"
+            self.counters[key] = self.counters.get(key, 0) + 1
+            try:
+                if m.group(1):
+                    status, result = 200, database.rpc(name, body or {})
+                elif self.command == "GET":
+                    status, result = 200, database.select(name, params)
+                elif self.command == "POST":
+                    status, result = 201, database.insert(name, params, body, resolution)
+                elif self.command == "PATCH":
+                    status, result = 200, database.update(name, params, body)
+                else:
+                    status, result = 200, database.delete(name, params)
+            except PostgrestError as e:
+                return self._send_json(e.status, {"code": e.code, "message": str(e), "details": None, "hint": None})
+            except sqlite3.IntegrityError as e:
+                return self._send_json(409, {"code": "23505", "message": str(e), "details": None, "hint": None})
+            except (sqlite3.Error, ValueError, KeyError) as e:
+                return self._send_json(400, {"code": "PGRST100", "message": str(e), "details": None, "hint": None})
+
+        if "return=minimal" in prefer:
+            self.send_response(204 if status == 200 else status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send_json(status, result)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+
+def start_stub_server(latency: float = 0.0, port: int = 0, db_path: str = ":memory:",
+                      max_url_length: int = MAX_URL_LENGTH) -> ThreadingHTTPServer:
+    """Start the stand-in in a daemon thread; point SUPABASE_URL at ``server.server_port``.
+
+    ``server.RequestHandlerClass.database`` is the Database behind it and
+    ``.counters`` counts requests per method and table, and rejected
+    oversized URLs under "414".
+    """
+    handler = type("Handler", (StubSupabaseHandler,), {
+        "latency": latency,
+        "max_url_length": max_url_length,
+        "database": Database(db_path),
+        "counters": {},
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -1,22 +1,19 @@
 from fastapi import Depends, HTTPException, Header
 from typing import Optional
-from supabase_client import supabase
+from token_verifier import token_verifier, AuthenticatedUser
 
-async def get_current_user(authorization: Optional[str] = Header(None, convert_underscores=True)):
+async def get_current_user(authorization: Optional[str] = Header(None, convert_underscores=True)) -> AuthenticatedUser:
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing authorization header")
-    
+
     try:
         if not authorization.lower().startswith("bearer "):
             raise HTTPException(status_code=401, detail="Invalid authentication scheme")
-        
-        token = authorization[7:]  # Strip "Bearer "
-        user = supabase.auth.get_user(token)
-        print("User:", user)
 
-        if not user.user:
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
-        
-        return user.user
+        token = authorization[7:]  # Strip "Bearer "
+        # Verified locally against the JWT secret / JWKS, cached until the token expires
+        return await token_verifier.verify(token)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Authentication error: {str(e)}")
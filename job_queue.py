@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class SQLiteJobQueue(ABC):
+    """Jobs in a local SQLite table, claimed oldest first by async workers.
+
+    Subclasses give the table's ``schema``, its name and ``key`` column, and
+    ``_run`` to hand a claimed job to the handler. The table needs ``status``,
+    ``error``, ``created_at`` and ``updated_at`` columns. Jobs left running
+    by a previous process are queued again on start, and a job interrupted
+    by shutdown goes back to queued.
+    """
+
+    table = ""
+    key = ""
+    schema = ""
+
+    def __init__(self, db_path: str, workers: int = 1, poll_interval: float = 5.0):
+        self.db_path = db_path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._handler: Optional[Callable[..., Awaitable[Any]]] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(self.schema)
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    def _to_dict(self, row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        return dict(row) if row else None
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._to_dict(self._db.execute(f"select * from {self.table} where {self.key} = ?", (key,)).fetchone())
+
+    def _describe(self, job: Dict[str, Any]) -> str:
+        # How log messages refer to the job
+        return f"Job {job[self.key]}"
+
+    def _wake(self):
+        if self._wakeup:
+            self._wakeup.set()
+
+    def queue_depth(self) -> int:
+        return self._db.execute(f"select count(*) from {self.table} where status = 'queued'").fetchone()[0]
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        row = self._db.execute(f"""
+            update {self.table} set status = 'running', updated_at = ?
+            where {self.key} = (select {self.key} from {self.table} where status = 'queued' order by created_at limit 1)
+            returning *
+        """, (self._now(),)).fetchone()
+        return self._to_dict(row)
+
+    def _finish(self, key: str, status: str, error: Optional[str] = None, **columns: Any):
+        assignments = "".join(f", {column} = ?" for column in columns)
+        self._db.execute(f"update {self.table} set status = ?, error = ?, updated_at = ?{assignments} where {self.key} = ?",
+                         (status, error, self._now(), *columns.values(), key))
+
+    @abstractmethod
+    async def _run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the handler on a claimed job; returns extra columns to store when it's done."""
+
+    async def _worker(self):
+        while True:
+            job = self._claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                columns = await self._run(job)
+                self._finish(job[self.key], "done", **columns)
+            except asyncio.CancelledError:
+                # Shutting down mid-job: put it back so it runs after restart
+                self._db.execute(f"update {self.table} set status = 'queued' where {self.key} = ?", (job[self.key],))
+                raise
+            except Exception as e:
+                logger.warning(f"{self._describe(job)} failed: {getattr(e, 'detail', str(e))}")
+                self._finish(job[self.key], "failed", error=str(getattr(e, "detail", e)))
+
+    async def start(self, handler: Callable[..., Awaitable[Any]]):
+        self._handler = handler
+        self._wakeup = asyncio.Event()
+        # Jobs left running by a previous process never finished; run them again
+        self._db.execute(f"update {self.table} set status = 'queued' where status = 'running'")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
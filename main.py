@@ -1,14 +1,49 @@
-from supabase_client import supabase
+from riot_client import riot_client
+from refresh_queue import refresh_queue
+from auto_refresh import auto_refresh
+from backfill import backfill_queue
+from rollups import summarize_for_profile
+from repository import repository
+from stats_engine import MatchArrays
+from response_cache import response_cache, DEFAULT_TTL
+from riot_id_resolver import riot_id_resolver
+from match_store import match_store
 from fastapi import FastAPI, HTTPException, Depends, Header, Request, Form
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, List, Dict, Any
 from routers import auth, summoners
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-import httpx
+from contextlib import asynccontextmanager
+from request_timing import start_request, timed, measure, server_timing_header
+import asyncio
+import logging
+import os
+import metrics
+import summoner_service
 
-app = FastAPI()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+# httpx logs every request at INFO; /metrics already counts them
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the Riot and Supabase connection pools open for the lifetime of the app
+    await repository.start()
+    await riot_client.start()
+    await refresh_queue.start(summoner_service.run_refresh_job)
+    await backfill_queue.start(summoner_service.backfill_matches)
+    await auto_refresh.start(repository.tracked_profiles)
+    yield
+    await auto_refresh.stop()
+    await backfill_queue.stop()
+    await refresh_queue.stop()
+    await riot_client.close()
+    await repository.close()
+    await response_cache.close()
+
+app = FastAPI(lifespan=lifespan)
 templates = Jinja2Templates(directory="templates")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -20,6 +55,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next):
+    # Per-request breakdown of where the time went, readable in browser devtools
+    # and aggregated per route on /metrics
+    spans = start_request()
+    status = 500
+    with metrics.request_span(request.method, request.url.path) as span:
+        try:
+            with timed("total"):
+                response = await call_next(request)
+            status = response.status_code
+        finally:
+            # Label by route template so path parameters don't explode the series
+            route = request.scope.get("route")
+            route_path = route.path if route else "unmatched"
+            metrics.observe_request(request.method, route_path, status, spans)
+            if span is not None:
+                span.update_name(f"{request.method} {route_path}")
+    response.headers["Server-Timing"] = server_timing_header(spans)
+    return response
+
+metrics.registry.register_cache("response_cache", response_cache.stats)
+metrics.registry.register_cache("match_store", match_store.stats)
+metrics.registry.register_cache("riot_id_resolver", riot_id_resolver.stats)
+metrics.registry.callback("riot_rate_limit_queue_depth", "Riot calls waiting on a rate limit", "gauge",
+                          ("region", "endpoint"),
+                          lambda: {tuple(key.split(":", 1)): depth for key, depth in riot_client.limiter.queue_depths().items()})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 # Valid regions for dropdown selection
 REGIONS = {
     "EUW1": "europe",
@@ -60,32 +127,17 @@ async def submit_summoner(request: Request,
             "regions": REGIONS
         })
     
-    payload = {
-        "summoner_name": summoner_name,
-        "tagline": tagline,
-        "region": region_code
-    }
-
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post("http://localhost:8000/summoners/create-profile", json=payload)
+        await summoner_service.create_profile(summoner_name, tagline, region_code)
+        # Redirect to the summoner profile page after successful creation
+        return RedirectResponse(url=f"/summoner/{summoner_name}/{tagline}/{region}", status_code=303)
 
-            if response.status_code == 200:
-                # Redirect to the summoner profile page after successful creation
-                return RedirectResponse(url=f"/summoner/{summoner_name}/{tagline}/{region}", status_code=303)
-            elif response.status_code == 400:
-                return templates.TemplateResponse("index.html", {
-                    "request": request,
-                    "error": response.json().get("detail", "Summoner already exists"),
-                    "regions": REGIONS
-                })
-            else:
-                return templates.TemplateResponse("index.html", {
-                    "request": request,
-                    "error": f"Unexpected error: {response.text}",
-                    "regions": REGIONS
-                })
-            
+    except HTTPException as e:
+        return templates.TemplateResponse("index.html", {
+            "request": request,
+            "error": e.detail,
+            "regions": REGIONS
+        })
     except Exception as e:
         return templates.TemplateResponse("index.html", {
             "request": request,
@@ -94,28 +146,27 @@ async def submit_summoner(request: Request,
         })
 
 @app.get("/api/matches/{summoner_name}/{tagline}/{region}")
-async def get_more_matches(summoner_name: str, tagline: str, region: str, offset: int = 0, limit: int = 10):
+async def get_more_matches(summoner_name: str, tagline: str, region: str, cursor: Optional[str] = None, limit: int = 10):
     try:
-        # First get the summoner profile data to get the puuid
-        response = supabase.table("summoner_profiles").select("puuid").eq("summoner_name", summoner_name).eq("tagline", tagline).execute()
+        # First resolve the puuid (cached across pages)
+        puuid = await riot_id_resolver.resolve_tracked(summoner_name, tagline)
 
-        if not response.data:
+        if not puuid:
             raise HTTPException(status_code=404, detail="Summoner not found")
-        
-        puuid = response.data[0]["puuid"]
 
-        # Get additional matches with pagination
-        match_response = supabase.table("player_matches").select("*").eq("puuid", puuid).order("game_start", desc=True).range(offset, offset + limit - 1).execute()
+        # Get the next page of matches after the cursor
+        page = await repository.matches_by_puuid(puuid, limit, cursor)
         
-        return {"matches": match_response.data}
+        return {"matches": page.matches, "next_cursor": page.next_cursor}
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/refresh-summoner/{summoner_name}/{tagline}/{region}", response_class=HTMLResponse)
 async def refresh_summoner_data(request: Request, summoner_name: str, tagline: str, region: str):
     try:
-        # Call the Riot API to refresh data
         region_code = REGIONS.get(region)
         if not region_code:
             return templates.TemplateResponse("index.html", {
@@ -124,42 +175,21 @@ async def refresh_summoner_data(request: Request, summoner_name: str, tagline: s
                 "regions": REGIONS
             })
         
-        payload = {
-            "summoner_name": summoner_name,
-            "tagline": tagline,
-            "region": region_code
-        }
-        
-        async with httpx.AsyncClient() as client:
-            # Get the PUUID first
-            summoner_response = supabase.table("summoner_profiles").select("puuid").eq("summoner_name", summoner_name).eq("tagline", tagline).execute()
-            if not summoner_response.data:
-                return templates.TemplateResponse("index.html", {
-                    "request": request,
-                    "error": "Summoner not found",
-                    "regions": REGIONS
-                })
-            
-            puuid = summoner_response.data[0]["puuid"]
-            
-            # Update the last_updated timestamp
-            supabase.table("summoner_profiles").update({"last_updated": "now()"}).eq("puuid", puuid).execute()
-            
-            # Get new matches from Riot API
-            response = await client.post(f"http://localhost:8000/summoners/update-matches", json={
-                "puuid": puuid,
-                "region": region_code
+        # Get the PUUID first
+        puuid = await riot_id_resolver.resolve_tracked(summoner_name, tagline)
+        if not puuid:
+            return templates.TemplateResponse("index.html", {
+                "request": request,
+                "error": "Summoner not found",
+                "regions": REGIONS
             })
-            
-            if response.status_code != 200:
-                return templates.TemplateResponse("index.html", {
-                    "request": request,
-                    "error": f"Failed to refresh data: {response.text}",
-                    "regions": REGIONS
-                })
-            
-            # Redirect back to the summoner profile
-            return RedirectResponse(url=f"/summoner/{summoner_name}/{tagline}/{region}", status_code=303)
+        
+        # Queue the refresh instead of waiting on Riot; the profile page polls the job
+        job, created = refresh_queue.enqueue(puuid, region_code)
+        refresh_status = "queued" if created else "in-progress"
+        
+        # Redirect back to the summoner profile
+        return RedirectResponse(url=f"/summoner/{summoner_name}/{tagline}/{region}?refresh_job={job['id']}&refresh={refresh_status}", status_code=303)
     
     except Exception as e:
         return templates.TemplateResponse("index.html", {
@@ -169,43 +199,37 @@ async def refresh_summoner_data(request: Request, summoner_name: str, tagline: s
         })
 
 @app.get("/summoner/{summoner_name}/{tagline}/{region}", response_class=HTMLResponse)
-async def get_summoner_profile(request: Request, summoner_name: str, tagline: str, region: str):
+async def get_summoner_profile(request: Request, summoner_name: str, tagline: str, region: str,
+                               refresh_job: Optional[str] = None, refresh: Optional[str] = None):
     try:
-        # First get the summoner profile data
-        response = supabase.table("summoner_profiles").select("*").eq("summoner_name", summoner_name).eq("tagline", tagline).execute()
+        with timed("resolve"):
+            puuid = await riot_id_resolver.resolve_tracked(summoner_name, tagline)
 
-        if not response.data:
-            return templates.TemplateResponse("index.html", {
-                "request": request,
-                "data": None,
-                "error": "Summoner not found",
-                "regions": REGIONS
-            })
-        
-        summoner = response.data[0]
-        puuid = summoner["puuid"]
+        # Served from cache until a refresh or profile update for this summoner
+        with timed("cache"):
+            summoner_data = await response_cache.get(response_cache.profile_key(puuid)) if puuid else None
+        if summoner_data is None:
+            summoner_data = await load_profile_data(puuid) if puuid else None
 
-        # Get match data with more details
-        match_response = supabase.table("player_matches").select("*").eq("puuid", puuid).order("game_start", desc=True).limit(20).execute()
-        
-        matches = match_response.data
+            if not summoner_data:
+                return templates.TemplateResponse("index.html", {
+                    "request": request,
+                    "data": None,
+                    "error": "Summoner not found",
+                    "regions": REGIONS
+                })
 
-        summoner_data = {
-            "summoner": summoner,
-            "matches": matches,
-            # Calculate some stats
-            "total_matches": len(matches),
-            "win_rate": calculate_win_rate(matches) if matches else 0,
-            "avg_kda": calculate_avg_kda(matches) if matches else {"kills": 0, "deaths": 0, "assists": 0},
-            "most_played_champions": get_most_played_champions(matches) if matches else []
-        }
+            await response_cache.set(response_cache.profile_key(puuid), summoner_data)
 
-        return templates.TemplateResponse("summoner.html", {
-            "request": request, 
-            "data": summoner_data,
-            "error": None,
-            "regions": REGIONS
-        })
+        with timed("render"):
+            return templates.TemplateResponse("summoner.html", {
+                "request": request, 
+                "data": summoner_data,
+                "error": None,
+                "regions": REGIONS,
+                "refresh_job": refresh_job,
+                "refresh": refresh
+            })
     
     except Exception as e:
         return templates.TemplateResponse("index.html", {
@@ -218,40 +242,36 @@ async def get_summoner_profile(request: Request, summoner_name: str, tagline: st
 @app.get("/match/{match_id}", response_class=HTMLResponse)
 async def get_match_details(request: Request, match_id: str):
     try:
-        # Get all players from this match
-        match_response = supabase.table("player_matches").select("*").eq("match_id", match_id).execute()
-        
-        if not match_response.data:
-            return templates.TemplateResponse("index.html", {
-                "request": request,
-                "data": None,
-                "error": "Match not found",
-                "regions": REGIONS
-            })
-        
-        # Organize players by team
-        teams = {
-            "blue": [],
-            "red": []
-        }
-        
-        for player in match_response.data:
-            team = "blue" if player["team_id"] == 100 else "red"
-            teams[team].append(player)
-        
-        # Get general match info from first player
-        match_info = {
-            "id": match_id,
-            "game_start": match_response.data[0]["game_start"],
-            "teams": teams,
-            "winner": "blue" if teams["blue"] and teams["blue"][0]["win"] else "red"
-        }
+        match_info = await response_cache.get(response_cache.match_key(match_id))
+        if match_info is None:
+            # The match record with its participants, in one query
+            record = await repository.match_view(match_id)
+            
+            if not record:
+                return templates.TemplateResponse("index.html", {
+                    "request": request,
+                    "data": None,
+                    "error": "Match not found",
+                    "regions": REGIONS
+                })
+            
+            match_info = build_match_view(record)
+            # A match with every participant stored never changes, so its view is
+            # kept until evicted; a partial one expires in case another worker
+            # stores the rest
+            ttl = None if match_info["complete"] else DEFAULT_TTL
+            await response_cache.set(response_cache.match_key(match_id), match_info, ttl=ttl)
         
-        return templates.TemplateResponse("match.html", {
+        response = templates.TemplateResponse("match.html", {
             "request": request,
             "match": match_info,
             "regions": REGIONS
         })
+        if match_info["complete"] and summoner_service.INGEST_ALL_PARTICIPANTS:
+            # Every participant is stored and their rows outlive their profiles,
+            # so the page can't change
+            response.headers["Cache-Control"] = "public, max-age=86400, immutable"
+        return response
     
     except Exception as e:
         return templates.TemplateResponse("index.html", {
@@ -261,58 +281,53 @@ async def get_match_details(request: Request, match_id: str):
             "regions": REGIONS
         })
 
-# Helper functions for stats
-def calculate_win_rate(matches: List[Dict[str, Any]]) -> float:
-    if not matches:
-        return 0
-    wins = sum(1 for match in matches if match["win"])
-    return round((wins / len(matches)) * 100, 1)
-
-def calculate_avg_kda(matches: List[Dict[str, Any]]) -> Dict[str, float]:
-    if not matches:
-        return {"kills": 0, "deaths": 0, "assists": 0, "ratio": 0}
-    
-    total_kills = sum(match["kills"] for match in matches if match.get("kills") is not None)
-    total_deaths = sum(match["deaths"] for match in matches if match.get("deaths") is not None)
-    total_assists = sum(match["assists"] for match in matches if match.get("assists") is not None)
-    
-    count = len(matches)
-    # Use max(1, total_deaths) to avoid division by zero
+# Helper functions for page data
+def build_match_view(record: Dict[str, Any]) -> Dict[str, Any]:
+    participants = record["participants"]
     return {
-        "kills": round(total_kills / count, 1) if count > 0 else 0,
-        "deaths": round(total_deaths / count, 1) if count > 0 else 0,
-        "assists": round(total_assists / count, 1) if count > 0 else 0,
-        "ratio": round((total_kills + total_assists) / max(1, total_deaths), 2) if total_deaths > 0 else round(total_kills + total_assists, 2)
+        "id": record["match_id"],
+        "game_start": record["game_start"],
+        "game_duration": record["game_duration"],
+        # Participants arrive ordered by team, then position
+        "teams": {
+            "blue": [p for p in participants if p["team_id"] == 100],
+            "red": [p for p in participants if p["team_id"] == 200]
+        },
+        "totals": {
+            "blue": {"kills": record["blue_kills"], "gold": record["blue_gold"], "damage": record["blue_damage"]},
+            "red": {"kills": record["red_kills"], "gold": record["red_gold"], "damage": record["red_damage"]}
+        },
+        # None when neither team won, e.g. a remake
+        "winner": {100: "blue", 200: "red"}.get(record["winning_team"]),
+        "surrender": "early" if record["ended_in_early_surrender"] else "normal" if record["ended_in_surrender"] else None,
+        "complete": record["participant_count"] is not None and len(participants) == record["participant_count"]
     }
 
-def get_most_played_champions(matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    if not matches:
-        return []
-    
-    champion_counts = {}
-    for match in matches:
-        champion = match.get("champion_name")
-        if champion:
-            if champion in champion_counts:
-                champion_counts[champion]["count"] += 1
-                if match["win"]:
-                    champion_counts[champion]["wins"] += 1
-            else:
-                champion_counts[champion] = {
-                    "name": champion,
-                    "count": 1,
-                    "wins": 1 if match["win"] else 0
-                }
-    
-    # Convert to list and sort by count
-    champions_list = list(champion_counts.values())
-    champions_list.sort(key=lambda x: x["count"], reverse=True)
+async def load_profile_data(puuid: str) -> Optional[Dict[str, Any]]:
+    # The profile, its latest matches and the lifetime rollup are independent,
+    # so they're fetched concurrently; returns None if there's no profile
+    summoner, page, rollup = await asyncio.gather(
+        measure("profile", repository.profile_by_puuid(puuid)),
+        measure("matches", repository.matches_by_puuid(puuid, 20)),
+        measure("rollup", repository.summoner_rollup(puuid, champion_limit=5))
+    )
+    if not summoner:
+        return None
     
-    # Add win rate
-    for champion in champions_list:
-        champion["win_rate"] = round((champion["wins"] / champion["count"]) * 100, 1)
-    
-    return champions_list[:5]  # Return top 5 most played
+    matches = page.matches
+    recent = MatchArrays.from_rows(matches)
+
+    # Lifetime stats come from the stored rollup; fall back to the
+    # recent matches if it hasn't been built for this summoner yet
+    stats = summarize_for_profile(rollup) if rollup else recent.profile_summary()
+
+    return {
+        "summoner": summoner,
+        "matches": matches,
+        "next_cursor": page.next_cursor,
+        **stats,
+        "recent_form": recent.recent_form(10)
+    }
 
 #Including Routers
 app.include_router(auth.router)
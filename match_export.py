@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Dict, Any, List, AsyncIterator
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+PARQUET_AVAILABLE = pa is not None
+
+# player_matches columns included in exports, with their types for Parquet
+EXPORT_COLUMNS = [
+    ("match_id", "string"),
+    ("puuid", "string"),
+    ("game_start", "timestamp"),
+    ("win", "bool"),
+    ("role", "string"),
+    ("team_id", "int"),
+    ("team_position", "string"),
+    ("champion_name", "string"),
+    ("kills", "int"),
+    ("deaths", "int"),
+    ("assists", "int"),
+    ("summoner_profile_id", "int"),
+    ("riotid_gamename", "string"),
+    ("riotid_tagline", "string"),
+    ("summoner_level", "int"),
+    ("total_damagedealttochampions", "int"),
+    ("damage_per_minute", "float"),
+    ("gold_earned", "int"),
+    ("enemy_missing_pings", "int"),
+    ("skillshot_dodged", "int"),
+    ("skillshot_hit", "int"),
+    ("damage_dealt_to_turrets", "int"),
+    ("longest_time_living", "int"),
+    ("game_ended_in_surrender", "bool"),
+    ("team_early_surrendered", "bool"),
+]
+COLUMN_NAMES = [name for name, _ in EXPORT_COLUMNS]
+
+# Each stream below takes pages of rows (lists of dicts) and yields one chunk
+# of output per page, so memory stays bounded by the page size
+
+
+async def ndjson_stream(pages: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[str]:
+    async for rows in pages:
+        yield "".join(json.dumps(row) + "\n" for row in rows)
+
+
+async def csv_stream(pages: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMN_NAMES, extrasaction="ignore")
+    writer.writeheader()
+    async for rows in pages:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only: no rows were exported
+        yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only file that hands its bytes back after each row group, so the
+    # Parquet file is streamed instead of assembled in memory
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema():
+    types = {"string": pa.string(), "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(),
+             "timestamp": pa.timestamp("us", tz="UTC")}
+    return pa.schema([(name, types[kind]) for name, kind in EXPORT_COLUMNS])
+
+
+async def parquet_stream(pages: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """One Parquet row group per page. Requires pyarrow (check PARQUET_AVAILABLE)."""
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        async for rows in pages:
+            columns = {name: [row.get(name) for row in rows] for name in COLUMN_NAMES}
+            columns["game_start"] = [datetime.fromisoformat(v) if v else None for v in columns["game_start"]]
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
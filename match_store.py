@@ -0,0 +1,184 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Iterator, List
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+class MatchStore:
+    """Disk-backed store of raw match-v5 JSON keyed by match ID.
+
+    Finished matches never change, so payloads are kept compressed on disk
+    (zstd when the zstandard package is installed, gzip otherwise) behind an
+    in-memory LRU. Files are laid out by a hash of the match ID; the least
+    recently used files are evicted once the directory exceeds ``max_bytes``.
+    Async callers use ``aget``/``aput``, which keep file I/O and compression
+    off the event loop.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 ** 3, memory_items: int = 256):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.suffix = ".json.zst" if zstandard else ".json.gz"
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Disk index: path -> size, in least to most recently used order
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._load_index()
+
+    def _load_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(self.suffix):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(files):
+            self._index[path] = size
+            self._disk_bytes += size
+
+    def _path(self, match_id: str) -> str:
+        digest = hashlib.sha1(match_id.encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + self.suffix)
+
+    def _compress(self, data: bytes) -> bytes:
+        if zstandard:
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def _decompress(self, data: bytes) -> bytes:
+        if zstandard:
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def _remember(self, match_id: str, match: Dict[str, Any]):
+        self._memory[match_id] = match
+        self._memory.move_to_end(match_id)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _memory_get(self, match_id: str) -> Optional[Dict[str, Any]]:
+        # Caller holds the lock
+        if match_id not in self._memory:
+            return None
+        self._memory.move_to_end(match_id)
+        self.hits += 1
+        self.memory_hits += 1
+        return self._memory[match_id]
+
+    def get(self, match_id: str) -> Optional[Dict[str, Any]]:
+        # The lock only guards the memory LRU and the disk index; reading and
+        # decoding the file happen outside it so memory hits never wait on them
+        with self._lock:
+            match = self._memory_get(match_id)
+            if match is not None:
+                return match
+            path = self._path(match_id)
+            if path not in self._index:
+                self.misses += 1
+                return None
+
+        try:
+            with open(path, "rb") as f:
+                match = json.loads(self._decompress(f.read()))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cached match {match_id}: {str(e)}")
+            with self._lock:
+                self._disk_bytes -= self._index.pop(path, 0)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if path in self._index:
+                self._index.move_to_end(path)
+            self._remember(match_id, match)
+            self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return match
+
+    def put(self, match_id: str, match: Dict[str, Any]):
+        data = self._compress(json.dumps(match, separators=(",", ":")).encode())
+        path = self._path(match_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Per-thread temp file, as two refreshes may store the same match at once
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._disk_bytes += len(data) - self._index.pop(path, 0)
+            self._index[path] = len(data)
+            self._remember(match_id, match)
+            evicted = self._evict()
+        for evicted_path in evicted:
+            try:
+                os.remove(evicted_path)
+            except OSError:
+                pass
+
+    async def aget(self, match_id: str) -> Optional[Dict[str, Any]]:
+        # Memory hits are answered inline; only disk reads go to a thread
+        with self._lock:
+            match = self._memory_get(match_id)
+        if match is not None:
+            return match
+        return await asyncio.to_thread(self.get, match_id)
+
+    async def aput(self, match_id: str, match: Dict[str, Any]):
+        await asyncio.to_thread(self.put, match_id, match)
+
+    def _evict(self) -> List[str]:
+        # Caller holds the lock; returns the paths to remove once it's released
+        evicted = []
+        while self._disk_bytes > self.max_bytes and len(self._index) > 1:
+            path, size = self._index.popitem(last=False)
+            self._disk_bytes -= size
+            evicted.append(path)
+        return evicted
+
+    def iter_matches(self) -> Iterator[Dict[str, Any]]:
+        """Yield every stored payload, e.g. to rebuild player_matches without calling Riot."""
+        for path in list(self._index):
+            try:
+                with open(path, "rb") as f:
+                    yield json.loads(self._decompress(f.read()))
+            except (OSError, ValueError):
+                continue
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0,
+            "items_on_disk": len(self._index),
+            "bytes_on_disk": self._disk_bytes,
+        }
+
+
+match_store = MatchStore(os.getenv("MATCH_STORE_DIR", "data/matches"),
+                         max_bytes=int(os.getenv("MATCH_STORE_MAX_BYTES", str(2 * 1024 ** 3))),
+                         memory_items=int(os.getenv("MATCH_STORE_MEMORY_ITEMS", "256")))
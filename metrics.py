@@ -0,0 +1,296 @@
+import bisect
+import threading
+import time
+import httpx
+from contextlib import contextmanager
+from request_timing import record, Span
+from typing import Optional, Dict, Any, List, Tuple, Callable, Sequence
+
+try:
+    from opentelemetry import trace
+    # Spans are no-ops unless an OpenTelemetry SDK and exporter are configured
+    tracer = trace.get_tracer("leaguetracker")
+except ImportError:
+    tracer = None
+
+OTEL_AVAILABLE = tracer is not None
+
+# Seconds; covers cache hits through slow Riot retries
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: Any, amount: float = 1):
+        key = tuple(str(value) for value in label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *label_values: Any) -> float:
+        return self._values.get(tuple(str(value) for value in label_values), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: Any):
+        key = tuple(str(v) for v in label_values)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *label_values: Any) -> int:
+        series = self._series.get(tuple(str(v) for v in label_values))
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = 'le="' + _number(bound) + '"'
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """A counter or gauge read at scrape time from ``read()``, which returns {label values: value}.
+
+    For values another component already tracks, like a cache's hit count.
+    """
+
+    def __init__(self, name: str, help: str, type: str, label_names: Sequence[str],
+                 read: Callable[[], Dict[Tuple[Any, ...], float]]):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.label_names = tuple(label_names)
+        self.read = read
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for key, value in sorted(self.read().items()):
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {_number(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text format for /metrics."""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._caches: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def counter(self, name: str, help: str, label_names: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def callback(self, name: str, help: str, type: str, label_names: Sequence[str],
+                 read: Callable[[], Dict[Tuple[Any, ...], float]]) -> CallbackMetric:
+        metric = CallbackMetric(name, help, type, label_names, read)
+        self._metrics.append(metric)
+        return metric
+
+    def _cache_stat(self, stat: str) -> Dict[Tuple[Any, ...], float]:
+        return {(cache,): stats()[stat] for cache, stats in self._caches.items()}
+
+    def register_cache(self, name: str, stats: Callable[[], Dict[str, Any]]):
+        """Expose a cache's hits and misses; ``stats`` is its stats() method."""
+        if not self._caches:
+            self.callback("cache_hits_total", "Cache lookups that hit", "counter", ("cache",),
+                          lambda: self._cache_stat("hits"))
+            self.callback("cache_misses_total", "Cache lookups that missed", "counter", ("cache",),
+                          lambda: self._cache_stat("misses"))
+            self.callback("cache_hit_ratio", "Share of cache lookups that hit since startup", "gauge", ("cache",),
+                          lambda: self._cache_stat("hit_rate"))
+        self._caches[name] = stats
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to the response headers, by route template",
+    ("method", "route", "status"))
+request_stage_duration = registry.histogram(
+    "http_request_stage_duration_seconds",
+    "Wall-clock time per request with a call of each Server-Timing stage (resolve, render, riot, supabase, ...) in flight",
+    ("route", "stage"))
+request_stage_calls = registry.histogram(
+    "http_request_stage_calls", "Calls per request of each Server-Timing stage", ("route", "stage"),
+    buckets=(1, 2, 5, 10, 20, 50, 100))
+riot_request_duration = registry.histogram(
+    "riot_request_duration_seconds", "Riot API calls, one per attempt", ("endpoint", "region", "status"))
+riot_rate_limited = registry.counter(
+    "riot_rate_limited_total", "429 responses from the Riot API", ("endpoint", "region", "limit_type"))
+supabase_request_duration = registry.histogram(
+    "supabase_request_duration_seconds", "Supabase REST calls, including reading the body",
+    ("table", "operation", "status"))
+
+
+def _export_span(name: str, duration: float, attributes: Dict[str, Any]):
+    # Dependency spans are created after the fact so call sites only report a duration
+    if tracer is None:
+        return
+    end = time.time_ns()
+    span = tracer.start_span(name, start_time=end - int(duration * 1e9), attributes=attributes)
+    span.end(end_time=end)
+
+
+@contextmanager
+def request_span(method: str, path: str):
+    # Parent of the dependency spans exported while the request runs
+    if tracer is None:
+        yield None
+        return
+    with tracer.start_as_current_span(f"{method} {path}", kind=trace.SpanKind.SERVER) as span:
+        yield span
+
+
+def _wall_clock(intervals: List[Tuple[float, float]]) -> float:
+    # Length of the union of (start, end) intervals, so overlapping calls count once
+    total, covered_until = 0.0, float("-inf")
+    for start, end in sorted(intervals):
+        if end > covered_until:
+            total += end - max(start, covered_until)
+            covered_until = end
+    return total
+
+
+def observe_request(method: str, route: str, status: int, spans: List[Span]):
+    stages: Dict[str, List[Tuple[float, float]]] = {}
+    for name, duration_ms, end in spans:
+        stages.setdefault(name, []).append((end - duration_ms / 1000, end))
+    request_duration.observe(_wall_clock(stages.pop("total", [])), method, route, status)
+    for stage, intervals in stages.items():
+        request_stage_duration.observe(_wall_clock(intervals), route, stage)
+        request_stage_calls.observe(len(intervals), route, stage)
+
+
+def observe_riot(endpoint: str, region: str, status: Any, duration: float):
+    riot_request_duration.observe(duration, endpoint, region, status)
+    record("riot", duration * 1000)
+    _export_span(f"riot {endpoint}", duration, {"riot.endpoint": endpoint, "riot.region": region,
+                                                "http.status_code": str(status)})
+
+
+def supabase_operation(request: httpx.Request) -> Tuple[str, str]:
+    """(table, operation) for a Supabase request, from its PostgREST path and method."""
+    parts = request.url.path.strip("/").split("/")
+    if parts[:2] == ["rest", "v1"] and len(parts) >= 3:
+        if parts[2] == "rpc" and len(parts) >= 4:
+            return parts[3], "rpc"
+        if request.method == "POST":
+            return parts[2], "upsert" if "resolution=" in request.headers.get("prefer", "") else "insert"
+        return parts[2], {"GET": "select", "HEAD": "select", "PATCH": "update", "DELETE": "delete"}.get(
+            request.method, request.method.lower())
+    # auth, storage, functions: the service name and method
+    return parts[0] if parts else "", request.method.lower()
+
+
+def observe_supabase(request: httpx.Request, status: Any, duration: float):
+    table, operation = supabase_operation(request)
+    supabase_request_duration.observe(duration, table, operation, status)
+    record("supabase", duration * 1000)
+    _export_span(f"supabase {operation} {table}", duration, {"db.sql.table": table, "db.operation": operation,
+                                                             "http.status_code": str(status)})
+
+
+class SupabaseTransport(httpx.BaseTransport):
+    """Times each Supabase call for the sync client; wraps the real transport."""
+
+    def __init__(self, transport: Optional[httpx.BaseTransport] = None):
+        self._transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = self._transport.handle_request(request)
+            response.read()
+        except Exception:
+            observe_supabase(request, "error", time.perf_counter() - start)
+            raise
+        observe_supabase(request, response.status_code, time.perf_counter() - start)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncSupabaseTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of SupabaseTransport, for the repository's client."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+            await response.aread()
+        except Exception:
+            observe_supabase(request, "error", time.perf_counter() - start)
+            raise
+        observe_supabase(request, response.status_code, time.perf_counter() - start)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
@@ -0,0 +1,10 @@
+-- Bulk ingestion upserts player_matches with on_conflict=(puuid, match_id).
+-- Remove any duplicates left by the old check-then-insert path first.
+delete from player_matches a
+using player_matches b
+where a.puuid = b.puuid
+  and a.match_id = b.match_id
+  and a.id > b.id;
+
+alter table player_matches
+  add constraint player_matches_puuid_match_id_key unique (puuid, match_id);
@@ -0,0 +1,5 @@
+-- High-water mark for incremental match sync: the newest match we have
+-- fully synced for each summoner.
+alter table summoner_profiles
+  add column if not exists last_match_id text,
+  add column if not exists last_match_start timestamptz;
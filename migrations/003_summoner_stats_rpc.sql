@@ -0,0 +1,39 @@
+-- Lifetime stats for /summoners/stats/{puuid}, aggregated in Postgres so the
+-- API only receives totals and one row per champion.
+create index if not exists player_matches_puuid_game_start_idx
+  on player_matches (puuid, game_start desc);
+
+create or replace function summoner_stats(p_puuid text)
+returns json
+language sql
+stable
+as $$
+  select json_build_object(
+    'overall', (
+      select json_build_object(
+        'games', count(*),
+        'wins', count(*) filter (where win is true),
+        'kills', coalesce(sum(kills), 0),
+        'deaths', coalesce(sum(deaths), 0),
+        'assists', coalesce(sum(assists), 0)
+      )
+      from player_matches
+      where puuid = p_puuid
+    ),
+    'champions', coalesce((
+      select json_agg(c order by c.games desc)
+      from (
+        select champion_name,
+               count(*) as games,
+               count(*) filter (where win is true) as wins,
+               coalesce(sum(kills), 0) as kills,
+               coalesce(sum(deaths), 0) as deaths,
+               coalesce(sum(assists), 0) as assists
+        from player_matches
+        where puuid = p_puuid
+          and champion_name is not null
+        group by champion_name
+      ) c
+    ), '[]'::json)
+  );
+$$;
@@ -0,0 +1,150 @@
+-- Per-summoner and per-champion lifetime totals, kept up to date with deltas
+-- by statement-level triggers on player_matches. Rebuild from scratch with
+-- `select rebuild_summoner_rollups();` (or `python rollups.py rebuild`).
+create table if not exists summoner_stats_rollup (
+  puuid text primary key,
+  games integer not null default 0,
+  wins integer not null default 0,
+  kills bigint not null default 0,
+  deaths bigint not null default 0,
+  assists bigint not null default 0,
+  damage bigint not null default 0,
+  gold bigint not null default 0,
+  updated_at timestamptz not null default now()
+);
+
+create table if not exists summoner_champion_rollup (
+  puuid text not null references summoner_stats_rollup (puuid) on delete cascade,
+  champion_name text not null,
+  games integer not null default 0,
+  wins integer not null default 0,
+  kills bigint not null default 0,
+  deaths bigint not null default 0,
+  assists bigint not null default 0,
+  damage bigint not null default 0,
+  gold bigint not null default 0,
+  primary key (puuid, champion_name)
+);
+
+create index if not exists summoner_champion_rollup_games_idx
+  on summoner_champion_rollup (puuid, games desc);
+
+-- Add (direction = 1) or subtract (direction = -1) a batch of player_matches rows
+create or replace function apply_summoner_rollup_delta(rows_json json, direction integer)
+returns void
+language sql
+as $$
+  with rows as (
+    select * from json_populate_recordset(null::player_matches, rows_json)
+  ),
+  overall as (
+    insert into summoner_stats_rollup as r (puuid, games, wins, kills, deaths, assists, damage, gold)
+    select puuid,
+           direction * count(*),
+           direction * count(*) filter (where win is true),
+           direction * coalesce(sum(kills), 0),
+           direction * coalesce(sum(deaths), 0),
+           direction * coalesce(sum(assists), 0),
+           direction * coalesce(sum(total_damagedealttochampions), 0),
+           direction * coalesce(sum(gold_earned), 0)
+    from rows
+    group by puuid
+    on conflict (puuid) do update set
+      games = r.games + excluded.games,
+      wins = r.wins + excluded.wins,
+      kills = r.kills + excluded.kills,
+      deaths = r.deaths + excluded.deaths,
+      assists = r.assists + excluded.assists,
+      damage = r.damage + excluded.damage,
+      gold = r.gold + excluded.gold,
+      updated_at = now()
+    returning puuid
+  )
+  insert into summoner_champion_rollup as c (puuid, champion_name, games, wins, kills, deaths, assists, damage, gold)
+  select rows.puuid, champion_name,
+         direction * count(*),
+         direction * count(*) filter (where win is true),
+         direction * coalesce(sum(kills), 0),
+         direction * coalesce(sum(deaths), 0),
+         direction * coalesce(sum(assists), 0),
+         direction * coalesce(sum(total_damagedealttochampions), 0),
+         direction * coalesce(sum(gold_earned), 0)
+  from rows
+  join overall on overall.puuid = rows.puuid
+  where champion_name is not null
+  group by rows.puuid, champion_name
+  on conflict (puuid, champion_name) do update set
+    games = c.games + excluded.games,
+    wins = c.wins + excluded.wins,
+    kills = c.kills + excluded.kills,
+    deaths = c.deaths + excluded.deaths,
+    assists = c.assists + excluded.assists,
+    damage = c.damage + excluded.damage,
+    gold = c.gold + excluded.gold;
+$$;
+
+create or replace function player_matches_rollup_insert()
+returns trigger
+language plpgsql
+as $$
+begin
+  perform apply_summoner_rollup_delta((select json_agg(n) from new_rows n), 1);
+  return null;
+end;
+$$;
+
+create or replace function player_matches_rollup_delete()
+returns trigger
+language plpgsql
+as $$
+begin
+  perform apply_summoner_rollup_delta((select json_agg(o) from old_rows o), -1);
+  return null;
+end;
+$$;
+
+drop trigger if exists player_matches_rollup_insert on player_matches;
+create trigger player_matches_rollup_insert
+  after insert on player_matches
+  referencing new table as new_rows
+  for each statement execute function player_matches_rollup_insert();
+
+drop trigger if exists player_matches_rollup_delete on player_matches;
+create trigger player_matches_rollup_delete
+  after delete on player_matches
+  referencing old table as old_rows
+  for each statement execute function player_matches_rollup_delete();
+
+-- Recompute rollups from player_matches, for one summoner or everyone
+create or replace function rebuild_summoner_rollups(p_puuid text default null)
+returns integer
+language plpgsql
+as $$
+declare
+  rebuilt integer;
+begin
+  delete from summoner_stats_rollup where p_puuid is null or puuid = p_puuid;
+
+  insert into summoner_stats_rollup (puuid, games, wins, kills, deaths, assists, damage, gold)
+  select puuid, count(*), count(*) filter (where win is true),
+         coalesce(sum(kills), 0), coalesce(sum(deaths), 0), coalesce(sum(assists), 0),
+         coalesce(sum(total_damagedealttochampions), 0), coalesce(sum(gold_earned), 0)
+  from player_matches
+  where p_puuid is null or puuid = p_puuid
+  group by puuid;
+  get diagnostics rebuilt = row_count;
+
+  insert into summoner_champion_rollup (puuid, champion_name, games, wins, kills, deaths, assists, damage, gold)
+  select puuid, champion_name, count(*), count(*) filter (where win is true),
+         coalesce(sum(kills), 0), coalesce(sum(deaths), 0), coalesce(sum(assists), 0),
+         coalesce(sum(total_damagedealttochampions), 0), coalesce(sum(gold_earned), 0)
+  from player_matches
+  where (p_puuid is null or puuid = p_puuid)
+    and champion_name is not null
+  group by puuid, champion_name;
+
+  return rebuilt;
+end;
+$$;
+
+select rebuild_summoner_rollups();
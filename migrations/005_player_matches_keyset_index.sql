@@ -0,0 +1,5 @@
+-- Keyset pagination orders match history by (game_start, match_id) per puuid
+create index if not exists player_matches_puuid_game_start_match_id_idx
+  on player_matches (puuid, game_start desc, match_id desc);
+
+drop index if exists player_matches_puuid_game_start_idx;
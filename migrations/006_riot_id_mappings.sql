@@ -0,0 +1,16 @@
+-- Riot ID -> puuid mappings, keyed on the lowercased "gamename#tagline" so
+-- lookups are case-insensitive. One row per puuid; a rename replaces it.
+create table if not exists riot_id_mappings (
+  riot_id text primary key,
+  puuid text not null unique,
+  game_name text not null,
+  tagline text not null,
+  updated_at timestamptz not null default now()
+);
+
+-- Seed from the profiles we already track
+insert into riot_id_mappings (riot_id, puuid, game_name, tagline)
+select distinct on (puuid) lower(summoner_name) || '#' || lower(tagline), puuid, summoner_name, tagline
+from summoner_profiles
+order by puuid, last_updated desc
+on conflict do nothing;
@@ -0,0 +1,76 @@
+-- One row per match with the match-level facts the match page needs, so it
+-- doesn't have to derive them from the participants. Written at ingest,
+-- before the match's player_matches rows.
+create table if not exists matches (
+  match_id text primary key,
+  game_start timestamptz not null,
+  game_duration integer,
+  queue_id integer,
+  participant_count smallint,
+  winning_team smallint,
+  ended_in_surrender boolean not null default false,
+  ended_in_early_surrender boolean not null default false,
+  blue_kills integer not null default 0,
+  blue_gold integer not null default 0,
+  blue_damage integer not null default 0,
+  red_kills integer not null default 0,
+  red_gold integer not null default 0,
+  red_damage integer not null default 0
+);
+
+-- teamPosition and its display order (TOP, JUNGLE, MIDDLE, BOTTOM, UTILITY)
+alter table player_matches
+  add column if not exists team_position text,
+  add column if not exists position_order smallint;
+
+-- Seed from rows already stored; totals only cover the participants we have
+insert into matches (match_id, game_start, winning_team, ended_in_surrender, ended_in_early_surrender,
+                     blue_kills, blue_gold, blue_damage, red_kills, red_gold, red_damage)
+select match_id,
+       min(game_start),
+       case when bool_or(win) filter (where team_id = 100) then 100
+            when bool_or(win) filter (where team_id = 200) then 200 end,
+       coalesce(bool_or(game_ended_in_surrender), false),
+       coalesce(bool_or(team_early_surrendered), false),
+       coalesce(sum(kills) filter (where team_id = 100), 0),
+       coalesce(sum(gold_earned) filter (where team_id = 100), 0),
+       coalesce(sum(total_damagedealttochampions) filter (where team_id = 100), 0),
+       coalesce(sum(kills) filter (where team_id = 200), 0),
+       coalesce(sum(gold_earned) filter (where team_id = 200), 0),
+       coalesce(sum(total_damagedealttochampions) filter (where team_id = 200), 0)
+from player_matches
+group by match_id
+on conflict (match_id) do nothing;
+
+-- Lets PostgREST embed a match's participants in the matches query
+do $$
+begin
+  alter table player_matches
+    add constraint player_matches_match_id_fkey foreign key (match_id) references matches (match_id);
+exception
+  when duplicate_object then null;
+end $$;
+
+-- Rows stored before this migration have no team_position, and nothing in
+-- player_matches says what it was; the raw payloads do. Run
+-- `python summoner_service.py backfill-positions` to read them from the local
+-- match store and pass them here in batches. Rows already filled are skipped.
+create or replace function backfill_team_positions(p_rows jsonb)
+returns integer
+language sql
+as $$
+  with updated as (
+    update player_matches pm
+    set team_position = r.team_position,
+        position_order = r.position_order
+    from jsonb_to_recordset(p_rows) as r(match_id text, puuid text, team_position text, position_order smallint)
+    where pm.match_id = r.match_id
+      and pm.puuid = r.puuid
+      and pm.team_position is null
+    returning 1
+  )
+  select count(*)::integer from updated;
+$$;
+
+create index if not exists player_matches_match_id_team_position_idx
+  on player_matches (match_id, team_id, position_order);
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from typing import Dict, List, Tuple, Optional, Mapping
+
+# Riot's documented development-key application limits, used until the first
+# response tells us the real ones
+DEFAULT_APP_LIMITS = "20:1,100:120"
+
+
+def parse_rate_limits(header: Optional[str]) -> List[Tuple[int, float]]:
+    """Parse a Riot rate-limit header such as "20:1,100:120" into (limit, window_seconds) pairs."""
+    if not header:
+        return []
+    limits = []
+    for part in header.split(","):
+        count, _, window = part.strip().partition(":")
+        if count and window:
+            limits.append((int(count), float(window)))
+    return limits
+
+
+class TokenBucket:
+    """Token bucket holding ``limit`` tokens that refill evenly over ``window`` seconds."""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.tokens = float(limit)
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.window
+
+    def _refill(self, now: float):
+        self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.tokens
+
+    def consume(self, now: float, count: float = 1):
+        self._refill(now)
+        self.tokens -= count
+
+    def sync(self, used: int, now: float):
+        # Riot reports how many requests it has counted in the current window;
+        # never believe we have more tokens than it does
+        self._refill(now)
+        self.tokens = min(self.tokens, float(self.limit - used))
+
+
+class RateLimiter:
+    """Per routing region and per method token buckets for the Riot API.
+
+    Requests wait in a FIFO queue for each (region, method) until every bucket
+    that applies to them has a token, rather than being fired and rejected.
+    Limits are learned from the X-App-Rate-Limit and X-Method-Rate-Limit
+    response headers, and a 429's Retry-After pauses the affected scope.
+    """
+
+    def __init__(self, default_app_limits: str = DEFAULT_APP_LIMITS):
+        self.default_app_limits = parse_rate_limits(default_app_limits)
+        self._app_buckets: Dict[str, List[TokenBucket]] = {}
+        self._method_buckets: Dict[Tuple[str, str], List[TokenBucket]] = {}
+        self._app_blocked_until: Dict[str, float] = {}
+        self._method_blocked_until: Dict[Tuple[str, str], float] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._queue_depths: Dict[Tuple[str, str], int] = {}
+
+    def _app(self, region: str) -> List[TokenBucket]:
+        if region not in self._app_buckets:
+            self._app_buckets[region] = [TokenBucket(limit, window) for limit, window in self.default_app_limits]
+        return self._app_buckets[region]
+
+    def _wait_time(self, region: str, method: str, now: float) -> float:
+        key = (region, method)
+        wait = max(self._app_blocked_until.get(region, 0.0), self._method_blocked_until.get(key, 0.0)) - now
+        for bucket in self._app(region) + self._method_buckets.get(key, []):
+            wait = max(wait, bucket.delay(now))
+        return max(wait, 0.0)
+
+    async def acquire(self, region: str, method: str):
+        """Wait until a request for ``method`` in ``region`` may be sent, then take its tokens."""
+        key = (region, method)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._queue_depths[key] = self._queue_depths.get(key, 0) + 1
+        try:
+            async with lock:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(region, method, now)
+                    if wait <= 0:
+                        # No await between the check and the consume, so the
+                        # shared app buckets can't be overdrawn by another method
+                        for bucket in self._app(region) + self._method_buckets.get(key, []):
+                            bucket.consume(now)
+                        return
+                    await asyncio.sleep(wait)
+        finally:
+            self._queue_depths[key] -= 1
+
+    @staticmethod
+    def _update_buckets(buckets: List[TokenBucket], limits_header: Optional[str],
+                        counts_header: Optional[str], now: float) -> List[TokenBucket]:
+        limits = parse_rate_limits(limits_header)
+        if not limits:
+            return buckets
+        if [(b.limit, b.window) for b in buckets] != limits:
+            buckets = [TokenBucket(limit, window) for limit, window in limits]
+        counts = {window: used for used, window in parse_rate_limits(counts_header)}
+        for bucket in buckets:
+            if bucket.window in counts:
+                bucket.sync(counts[bucket.window], now)
+        return buckets
+
+    def update_from_headers(self, region: str, method: str, headers: Mapping[str, str]):
+        now = time.monotonic()
+        key = (region, method)
+        self._app_buckets[region] = self._update_buckets(
+            self._app(region), headers.get("X-App-Rate-Limit"), headers.get("X-App-Rate-Limit-Count"), now)
+        self._method_buckets[key] = self._update_buckets(
+            self._method_buckets.get(key, []), headers.get("X-Method-Rate-Limit"),
+            headers.get("X-Method-Rate-Limit-Count"), now)
+
+    def backoff(self, region: str, method: str, retry_after: float, limit_type: Optional[str] = None):
+        """Pause the scope named by X-Rate-Limit-Type for ``retry_after`` seconds."""
+        until = time.monotonic() + retry_after
+        if limit_type == "application":
+            self._app_blocked_until[region] = max(self._app_blocked_until.get(region, 0.0), until)
+        else:
+            # Method and service (underlying service) limits only affect this method
+            key = (region, method)
+            self._method_blocked_until[key] = max(self._method_blocked_until.get(key, 0.0), until)
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {f"{region}:{method}": depth for (region, method), depth in self._queue_depths.items()}
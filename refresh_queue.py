@@ -0,0 +1,80 @@
+import json
+import os
+import sqlite3
+import uuid
+from job_queue import SQLiteJobQueue
+from typing import Optional, Dict, Any, Tuple
+
+
+class RefreshQueue(SQLiteJobQueue):
+    """Persistent queue of summoner refresh jobs processed by async workers.
+
+    Jobs live in a local SQLite database so queued work survives a restart.
+    Only one queued or running job may exist per puuid; enqueueing a summoner
+    that already has one returns the existing job instead.
+    """
+
+    table = "refresh_jobs"
+    key = "id"
+    schema = """
+        create table if not exists refresh_jobs (
+            id text primary key,
+            puuid text not null,
+            region text not null,
+            status text not null,
+            result text,
+            error text,
+            created_at text not null,
+            updated_at text not null
+        );
+        create unique index if not exists refresh_jobs_active_puuid
+            on refresh_jobs (puuid) where status in ('queued', 'running');
+        create index if not exists refresh_jobs_status_created
+            on refresh_jobs (status, created_at);
+    """
+
+    def __init__(self, db_path: str, workers: int = 2, poll_interval: float = 5.0):
+        super().__init__(db_path, workers, poll_interval)
+
+    def _to_dict(self, row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _describe(self, job: Dict[str, Any]) -> str:
+        return f"Refresh job {job['id']} for {job['puuid']}"
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._get(job_id)
+
+    def active_job(self, puuid: str) -> Optional[Dict[str, Any]]:
+        return self._to_dict(self._db.execute(
+            "select * from refresh_jobs where puuid = ? and status in ('queued', 'running')", (puuid,)).fetchone())
+
+    def enqueue(self, puuid: str, region: str) -> Tuple[Dict[str, Any], bool]:
+        """Queue a refresh. Returns (job, created); created is False if one was already active."""
+        now = self._now()
+        job_id = uuid.uuid4().hex
+        try:
+            self._db.execute(
+                "insert into refresh_jobs (id, puuid, region, status, created_at, updated_at) values (?, ?, ?, 'queued', ?, ?)",
+                (job_id, puuid, region, now, now))
+        except sqlite3.IntegrityError:
+            existing = self.active_job(puuid)
+            if existing:
+                return existing, False
+            raise
+        self._wake()
+        return self.get(job_id), True
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None, result: Optional[Dict[str, Any]] = None):
+        super()._finish(job_id, status, error=error, result=json.dumps(result) if result is not None else None)
+
+    async def _run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        return {"result": await self._handler(job["puuid"], job["region"])}
+
+
+refresh_queue = RefreshQueue(os.getenv("REFRESH_QUEUE_DB", "data/refresh_queue.sqlite3"),
+                             workers=int(os.getenv("REFRESH_WORKERS", "2")))
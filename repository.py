@@ -0,0 +1,249 @@
+import base64
+import json
+import os
+import re
+import httpx
+import metrics
+from datetime import datetime
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from pydantic import BaseModel
+from supabase import AsyncClient, AsyncClientOptions, acreate_client
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+load_dotenv()
+
+
+# Only what the match page renders for each participant
+MATCH_PARTICIPANT_COLUMNS = ("puuid, team_id, team_position, champion_name, role, riotid_gamename, riotid_tagline, "
+                             "kills, deaths, assists, total_damagedealttochampions, gold_earned, skillshot_hit, skillshot_dodged")
+
+
+# e.g. EUW1_7012345678
+MATCH_ID_PATTERN = re.compile(r"[A-Z0-9]+_\d+", re.ASCII)
+
+
+class MatchPage(BaseModel):
+    matches: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+
+# Match history pagination, keyed on (game_start, match_id) rather than an
+# offset so deep pages cost the same as the first and don't shift when new
+# matches are inserted
+def encode_cursor(row: Dict[str, Any]) -> str:
+    raw = json.dumps([row["game_start"], row["match_id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    # Both values end up inside a PostgREST or_() filter, so anything but a
+    # timestamp and a match ID is rejected rather than escaped
+    try:
+        game_start, match_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        datetime.fromisoformat(game_start)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(match_id, str) or not MATCH_ID_PATTERN.fullmatch(match_id):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return game_start, match_id
+
+
+class Repository:
+    """Async access to the Supabase tables the request handlers and workers use.
+
+    Wraps the async Supabase client over one shared httpx pool, opened in the
+    app lifespan, so queries yield to the event loop instead of blocking it.
+    """
+
+    def __init__(self, url: str, key: str, max_connections: int = 20, timeout: float = 10.0):
+        self.url = url
+        self.key = key
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._http: Optional[httpx.AsyncClient] = None
+        self._client: Optional[AsyncClient] = None
+
+    async def start(self):
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=self.max_connections),
+                                             http2=HTTP2_AVAILABLE)
+        self._http = httpx.AsyncClient(transport=metrics.AsyncSupabaseTransport(transport), timeout=self.timeout)
+        self._client = await acreate_client(self.url, self.key, options=AsyncClientOptions(httpx_client=self._http))
+
+    async def close(self):
+        if self._http:
+            await self._http.aclose()
+        self._http = None
+        self._client = None
+
+    @property
+    def client(self) -> AsyncClient:
+        if self._client is None:
+            raise RuntimeError("Repository used before start()")
+        return self._client
+
+    async def profile_by_puuid(self, puuid: str) -> Optional[Dict[str, Any]]:
+        res = await self.client.table("summoner_profiles").select("*").eq("puuid", puuid).execute()
+        return res.data[0] if res.data else None
+
+    async def profile_by_riot_id(self, summoner_name: str, tagline: str) -> Optional[Dict[str, Any]]:
+        res = await self.client.table("summoner_profiles").select("*").eq("summoner_name", summoner_name).eq("tagline", tagline).execute()
+        return res.data[0] if res.data else None
+
+    async def tracked_profiles(self, page_size: int = 1000) -> List[Dict[str, Any]]:
+        """What the auto-refresh scheduler needs for every tracked summoner."""
+        profiles = []
+        while True:
+            res = await (self.client.table("summoner_profiles")
+                         .select("puuid, region, last_updated, last_match_start")
+                         .order("id").range(len(profiles), len(profiles) + page_size - 1).execute())
+            profiles.extend(res.data)
+            if len(res.data) < page_size:
+                return profiles
+
+    async def puuid_for_riot_id(self, riot_id: str) -> Optional[str]:
+        # riot_id is the normalized "gamename#tagline" key of riot_id_mappings
+        res = await self.client.table("riot_id_mappings").select("puuid").eq("riot_id", riot_id).execute()
+        return res.data[0]["puuid"] if res.data else None
+
+    async def save_riot_id(self, riot_id: str, puuid: str, game_name: str, tagline: str):
+        # Drop the old name (if this is a rename) before claiming the new one
+        await self.client.table("riot_id_mappings").delete().eq("puuid", puuid).neq("riot_id", riot_id).execute()
+        await self.client.table("riot_id_mappings").upsert({
+            "riot_id": riot_id,
+            "puuid": puuid,
+            "game_name": game_name,
+            "tagline": tagline
+        }, on_conflict="riot_id").execute()
+
+    async def delete_riot_ids(self, puuid: str):
+        await self.client.table("riot_id_mappings").delete().eq("puuid", puuid).execute()
+
+    async def rename_profile(self, puuid: str, summoner_name: str, tagline: str):
+        await self.update_profile(puuid, {"summoner_name": summoner_name, "tagline": tagline})
+
+    async def insert_profile(self, profile: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        res = await self.client.table("summoner_profiles").insert(profile).execute()
+        return res.data[0] if res.data else None
+
+    async def update_profile(self, puuid: str, update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        res = await self.client.table("summoner_profiles").update(update).eq("puuid", puuid).execute()
+        return res.data[0] if res.data else None
+
+    async def claim_player_matches(self, puuid: str, summoner_profile_id: int):
+        # Link rows stored while this player was only someone else's teammate
+        await (self.client.table("player_matches").update({"summoner_profile_id": summoner_profile_id})
+               .eq("puuid", puuid).is_("summoner_profile_id", "null").execute())
+
+    async def unlink_player_matches(self, puuid: str):
+        # The rows stay, as participants of the matches they were stored with
+        await (self.client.table("player_matches").update({"summoner_profile_id": None})
+               .eq("puuid", puuid).execute())
+
+    async def delete_player_matches(self, puuid: str) -> List[str]:
+        """Delete the summoner's player_matches rows; returns the match IDs they belonged to."""
+        res = await self.client.table("player_matches").delete().eq("puuid", puuid).execute()
+        return [row["match_id"] for row in res.data]
+
+    async def delete_profile(self, puuid: str) -> bool:
+        # False if there was no profile
+        res = await self.client.table("summoner_profiles").delete().eq("puuid", puuid).execute()
+        return bool(res.data)
+
+    async def profiles_by_puuids(self, puuids: List[str], columns: str = "*") -> List[Dict[str, Any]]:
+        # puuids end up in the query string; callers chunk long lists
+        res = await self.client.table("summoner_profiles").select(columns).in_("puuid", puuids).execute()
+        return res.data
+
+    async def stored_match_starts(self, puuid: str, match_ids: List[str]) -> Dict[str, str]:
+        """game_start of whichever of ``match_ids`` already have a row for the summoner."""
+        res = await (self.client.table("player_matches").select("match_id, game_start")
+                     .eq("puuid", puuid).in_("match_id", match_ids).execute())
+        return {row["match_id"]: row["game_start"] for row in res.data}
+
+    async def upsert_matches(self, records: List[Dict[str, Any]]):
+        # Records built from the full payload replace existing ones, e.g. those
+        # migration 007 seeded from only the participants stored at the time
+        await self.client.table("matches").upsert(records, on_conflict="match_id", ignore_duplicates=False).execute()
+
+    async def insert_player_matches(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert rows, skipping any (puuid, match_id) already stored; returns only the new ones."""
+        res = await (self.client.table("player_matches")
+                     .upsert(rows, on_conflict="puuid,match_id", ignore_duplicates=True).execute())
+        return res.data or []
+
+    async def backfill_team_positions(self, rows: List[Dict[str, Any]]) -> int:
+        # See migration 007; returns how many rows were filled in
+        res = await self.client.rpc("backfill_team_positions", {"p_rows": rows}).execute()
+        return res.data
+
+    async def matches_by_puuid(self, puuid: str, limit: int, cursor: Optional[str] = None,
+                               columns: str = "*") -> MatchPage:
+        """A page of the summoner's matches, newest game_start first.
+
+        ``columns`` must include game_start and match_id, which the cursor is built from.
+        """
+        query = self.client.table("player_matches").select(columns).eq("puuid", puuid)
+        if cursor:
+            game_start, match_id = decode_cursor(cursor)
+            query = query.or_(f'game_start.lt."{game_start}",and(game_start.eq."{game_start}",match_id.lt."{match_id}")')
+        # Fetch one extra row to learn whether another page exists
+        res = await query.order("game_start", desc=True).order("match_id", desc=True).limit(limit + 1).execute()
+
+        matches = res.data[:limit]
+        next_cursor = encode_cursor(matches[-1]) if len(res.data) > limit else None
+        return MatchPage(matches=matches, next_cursor=next_cursor)
+
+    async def iter_matches(self, puuid: str, page_size: int = 1000,
+                           columns: str = "*") -> AsyncIterator[List[Dict[str, Any]]]:
+        """Every match of the summoner, newest first, one keyset page at a time."""
+        cursor = None
+        while True:
+            page = await self.matches_by_puuid(puuid, page_size, cursor, columns=columns)
+            if page.matches:
+                yield page.matches
+            cursor = page.next_cursor
+            if not cursor:
+                return
+
+    async def match_view(self, match_id: str) -> Optional[Dict[str, Any]]:
+        """The matches row with its participants embedded, by team then position."""
+        res = await (self.client.table("matches")
+                     .select(f"*, participants:player_matches({MATCH_PARTICIPANT_COLUMNS})")
+                     .eq("match_id", match_id)
+                     .order("team_id", foreign_table="participants")
+                     .order("position_order", foreign_table="participants", nullsfirst=False)
+                     .execute())
+        return res.data[0] if res.data else None
+
+    async def summoner_stats(self, puuid: str) -> Dict[str, Any]:
+        # Aggregated in Postgres; for summoners whose rollup isn't built yet
+        res = await self.client.rpc("summoner_stats", {"p_puuid": puuid}).execute()
+        return res.data
+
+    async def summoner_rollup(self, puuid: str, champion_limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Summoner totals with their champion rows (most played first), in one query.
+
+        Returns None when no rollup exists yet, e.g. a profile with no matches.
+        The rollups are maintained by triggers (see migrations/004_summoner_rollups.sql).
+        """
+        query = (self.client.table("summoner_stats_rollup")
+                 .select("*, champions:summoner_champion_rollup(*)")
+                 .eq("puuid", puuid)
+                 .gt("champions.games", 0)
+                 .order("games", desc=True, foreign_table="champions"))
+        if champion_limit:
+            query = query.limit(champion_limit, foreign_table="champions")
+        res = await query.execute()
+        if not res.data or not res.data[0]["games"]:
+            return None
+        return res.data[0]
+
+
+repository = Repository(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"),
+                        max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20")))
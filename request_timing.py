@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, List, Tuple, Awaitable, TypeVar
+
+T = TypeVar("T")
+
+# (name, milliseconds, perf_counter() at the end) spans for the current
+# request; tasks started with asyncio.gather inherit the same list, so
+# concurrent loads are recorded too
+Span = Tuple[str, float, float]
+_spans: ContextVar[Optional[List[Span]]] = ContextVar("request_timing_spans", default=None)
+
+
+def start_request() -> List[Span]:
+    spans: List[Span] = []
+    _spans.set(spans)
+    return spans
+
+
+def record(name: str, duration_ms: float):
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((name, duration_ms, time.perf_counter()))
+
+
+@contextmanager
+def timed(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000)
+
+
+async def measure(name: str, awaitable: Awaitable[T]) -> T:
+    with timed(name):
+        return await awaitable
+
+
+def server_timing_header(spans: List[Span]) -> str:
+    return ", ".join(f"{name};dur={duration:.1f}" for name, duration, _ in spans)
@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Any, Tuple
+
+try:
+    from redis import asyncio as redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Passed as ``ttl`` to use the cache's default TTL
+DEFAULT_TTL = object()
+
+
+class LRUBackend:
+    """In-process LRU with per-entry expiry. ``ttl=None`` keeps an entry until evicted.
+
+    Async like the Redis backend, though nothing here ever waits.
+    """
+
+    def __init__(self, max_items: int = 1024):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float]):
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._items[key] = (expires_at, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._items.pop(key, None)
+
+    async def close(self):
+        pass
+
+
+class RedisBackend:
+    """Redis-compatible backend (Redis, Valkey, KeyDB...) shared by every worker, over redis.asyncio."""
+
+    def __init__(self, url: str, prefix: str = "leaguetracker:"):
+        if redis is None:
+            raise ValueError("The redis package is required for the redis response cache backend")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float]):
+        await self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl) if ttl is not None else None)
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class ResponseCache:
+    """Read-through cache for rendered page data and API responses.
+
+    Entries are keyed by puuid or match ID and dropped by the ingestion path
+    when new matches land, so the TTL only bounds staleness across workers
+    that use the in-process backend.
+    """
+
+    def __init__(self, backend, default_ttl: float = 60):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def profile_key(puuid: str) -> str:
+        return f"profile:{puuid}"
+
+    @staticmethod
+    def stats_key(puuid: str) -> str:
+        return f"stats:{puuid}"
+
+    @staticmethod
+    def match_key(match_id: str) -> str:
+        return f"match:{match_id}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            # A broken cache should cost a database round-trip, not the page
+            logger.warning(f"Response cache get failed for {key}: {str(e)}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Any = DEFAULT_TTL):
+        """Store ``value``; ``ttl=None`` keeps it until evicted."""
+        try:
+            await self.backend.set(key, value, self.default_ttl if ttl is DEFAULT_TTL else ttl)
+        except Exception as e:
+            logger.warning(f"Response cache set failed for {key}: {str(e)}")
+
+    async def invalidate_summoners(self, *puuids: str):
+        await self._delete(*(key for puuid in puuids for key in (self.profile_key(puuid), self.stats_key(puuid))))
+
+    async def invalidate_matches(self, *match_ids: str):
+        await self._delete(*(self.match_key(match_id) for match_id in match_ids))
+
+    async def _delete(self, *keys: str):
+        try:
+            await self.backend.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Response cache invalidation failed: {str(e)}")
+
+    async def close(self):
+        await self.backend.close()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 3) if total else 0}
+
+
+def _create_backend():
+    if os.getenv("RESPONSE_CACHE_BACKEND", "memory") == "redis":
+        return RedisBackend(os.getenv("RESPONSE_CACHE_URL", "redis://localhost:6379/0"))
+    return LRUBackend(max_items=int(os.getenv("RESPONSE_CACHE_MAX_ITEMS", "1024")))
+
+
+response_cache = ResponseCache(_create_backend(), default_ttl=float(os.getenv("RESPONSE_CACHE_TTL", "60")))
@@ -0,0 +1,122 @@
+import os
+import asyncio
+import time
+import httpx
+import metrics
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from rate_limiter import RateLimiter
+from typing import Optional, Dict, Any
+
+try:
+    import h2  # noqa: F401  (httpx only negotiates HTTP/2 when h2 is installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+load_dotenv()
+api_key = os.getenv("RIOT_API_KEY")
+if not api_key:
+    raise ValueError("Missing RIOT API KEY")
+
+# Regional routing values used by account-v1 and match-v5
+ROUTING_REGIONS = ("europe", "americas", "asia", "sea")
+
+
+class RiotClient:
+    """Shared async client for the Riot API.
+
+    Keeps one pooled httpx.AsyncClient per regional host so TLS sessions and
+    keep-alive connections are reused across requests for the app's lifetime.
+    """
+
+    def __init__(self, api_key: str,
+                 base_url: str = "https://{region}.api.riotgames.com",
+                 max_connections: int = 20,
+                 max_concurrency: int = 10,
+                 max_retries: int = 3,
+                 timeout: float = 10.0):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.limiter = RateLimiter()
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _client(self, region: str) -> httpx.AsyncClient:
+        region = region.lower()
+        if region not in ROUTING_REGIONS:
+            raise HTTPException(status_code=400, detail=f"Invalid region: {region}")
+
+        client = self._clients.get(region)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=self.base_url.format(region=region),
+                headers={"X-Riot-Token": self.api_key},
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections,
+                                    keepalive_expiry=60.0),
+                timeout=self.timeout,
+            )
+            self._clients[region] = client
+        return client
+
+    async def start(self):
+        # Open a pool for every regional host up front
+        for region in ROUTING_REGIONS:
+            self._client(region)
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def _semaphore(self, region: str) -> asyncio.Semaphore:
+        region = region.lower()
+        semaphore = self._semaphores.get(region)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[region] = semaphore
+        return semaphore
+
+    async def get_json(self, region: str, path: str, detail: str, method: str,
+                       params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET a Riot endpoint, queueing behind its rate limits and retrying 429s.
+
+        ``method`` names the Riot API method (e.g. "match-v5.getMatch") whose
+        method rate limit applies to this path.
+        """
+        client = self._client(region)
+        region = region.lower()
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(region, method)
+            try:
+                # Cap the number of in-flight requests per regional host
+                async with self._semaphore(region):
+                    start = time.perf_counter()
+                    r = await client.get(path, params=params)
+            except httpx.RequestError as e:
+                metrics.observe_riot(method, region, "error", time.perf_counter() - start)
+                raise HTTPException(status_code=503, detail=f"{detail}: {str(e)}")
+            metrics.observe_riot(method, region, r.status_code, time.perf_counter() - start)
+
+            self.limiter.update_from_headers(region, method, r.headers)
+            if r.status_code == 200:
+                return r.json()
+            if r.status_code == 429:
+                metrics.riot_rate_limited.inc(method, region, r.headers.get("X-Rate-Limit-Type", "unknown"))
+            if r.status_code != 429 or attempt == self.max_retries:
+                break
+            self.limiter.backoff(region, method, float(r.headers.get("Retry-After", 1)),
+                                 r.headers.get("X-Rate-Limit-Type"))
+
+        raise HTTPException(status_code=r.status_code, detail=detail)
+
+
+riot_client = RiotClient(api_key,
+                         base_url=os.getenv("RIOT_API_BASE_URL", "https://{region}.api.riotgames.com"),
+                         max_concurrency=int(os.getenv("RIOT_MAX_CONCURRENCY", "10")))
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from fastapi import HTTPException
+from repository import repository
+from riot_client import riot_client
+from typing import Optional, Dict, Any
+
+
+def normalize_riot_id(game_name: str, tagline: str) -> str:
+    # Riot IDs are case-insensitive; matches the lower() used in migration 006
+    return f"{game_name.strip().lower()}#{tagline.strip().lower()}"
+
+
+class RiotIdResolver:
+    """Resolves Riot IDs (game name + tagline) to puuids.
+
+    Lookups go through a bounded in-memory LRU, then the persistent
+    riot_id_mappings table, and only then Riot's account-v1. Names Riot
+    reports as unknown are cached negatively for ``negative_ttl`` seconds so
+    repeated lookups of them don't spend quota, and names we don't track for
+    ``untracked_ttl`` seconds so they don't cost database round-trips. A
+    puuid maps to a single Riot ID; learning a new name for it (a rename)
+    re-keys the mapping.
+    """
+
+    def __init__(self, max_items: int = 10000, negative_ttl: float = 300, untracked_ttl: float = 60):
+        self.max_items = max_items
+        self.negative_ttl = negative_ttl
+        self.untracked_ttl = untracked_ttl
+        self._puuids: "OrderedDict[str, str]" = OrderedDict()
+        self._riot_ids: Dict[str, str] = {}
+        self._unknown: Dict[str, float] = {}
+        self._untracked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache(self, riot_id: str, puuid: str):
+        with self._lock:
+            old_riot_id = self._riot_ids.get(puuid)
+            if old_riot_id and old_riot_id != riot_id:
+                self._puuids.pop(old_riot_id, None)
+            self._puuids[riot_id] = puuid
+            self._puuids.move_to_end(riot_id)
+            self._riot_ids[puuid] = riot_id
+            self._unknown.pop(riot_id, None)
+            self._untracked.pop(riot_id, None)
+            while len(self._puuids) > self.max_items:
+                evicted_id, evicted_puuid = self._puuids.popitem(last=False)
+                if self._riot_ids.get(evicted_puuid) == evicted_id:
+                    del self._riot_ids[evicted_puuid]
+
+    def _cached(self, riot_id: str) -> Optional[str]:
+        with self._lock:
+            puuid = self._puuids.get(riot_id)
+            if puuid is not None:
+                self._puuids.move_to_end(riot_id)
+            return puuid
+
+    def _lookup_cached(self, riot_id: str) -> Optional[str]:
+        # _cached for lookups, counted towards the hit rate
+        puuid = self._cached(riot_id)
+        if puuid is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return puuid
+
+    def _is_negative(self, negatives: Dict[str, float], riot_id: str) -> bool:
+        with self._lock:
+            expires_at = negatives.get(riot_id)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del negatives[riot_id]
+                return False
+            return True
+
+    async def remember(self, puuid: str, game_name: str, tagline: str) -> bool:
+        """Record the current Riot ID for ``puuid``, replacing any previous one.
+
+        Returns False without touching the table if the mapping was already cached.
+        """
+        riot_id = normalize_riot_id(game_name, tagline)
+        if self._cached(riot_id) == puuid:
+            return False
+        self._cache(riot_id, puuid)
+        await repository.save_riot_id(riot_id, puuid, game_name, tagline)
+        return True
+
+    async def forget(self, puuid: str):
+        """Drop every mapping for ``puuid``, e.g. when its profile is deleted."""
+        with self._lock:
+            riot_id = self._riot_ids.pop(puuid, None)
+            if riot_id is not None:
+                self._puuids.pop(riot_id, None)
+        await repository.delete_riot_ids(puuid)
+
+    async def _lookup_stored(self, riot_id: str) -> Optional[str]:
+        puuid = await repository.puuid_for_riot_id(riot_id)
+        if puuid:
+            self._cache(riot_id, puuid)
+        return puuid
+
+    async def resolve_tracked(self, game_name: str, tagline: str) -> Optional[str]:
+        """puuid for a Riot ID we already know, without calling Riot; None if unknown."""
+        riot_id = normalize_riot_id(game_name, tagline)
+        puuid = self._lookup_cached(riot_id)
+        if puuid:
+            return puuid
+        if self._is_negative(self._untracked, riot_id):
+            return None
+        puuid = await self._lookup_stored(riot_id)
+        if puuid:
+            return puuid
+
+        # Profiles created before the mapping table existed
+        profile = await repository.profile_by_riot_id(game_name, tagline)
+        if profile:
+            await self.remember(profile["puuid"], profile["summoner_name"], profile["tagline"])
+            return profile["puuid"]
+        with self._lock:
+            self._untracked[riot_id] = time.monotonic() + self.untracked_ttl
+        return None
+
+    async def resolve(self, game_name: str, tagline: str, region: str) -> str:
+        """puuid for any Riot ID, asking account-v1 only when we don't know it."""
+        riot_id = normalize_riot_id(game_name, tagline)
+        puuid = self._lookup_cached(riot_id)
+        if puuid:
+            return puuid
+        if self._is_negative(self._unknown, riot_id):
+            raise HTTPException(status_code=404, detail="Failed to fetch puuid")
+        puuid = await self._lookup_stored(riot_id)
+        if puuid:
+            return puuid
+
+        try:
+            account = await riot_client.get_json(region, f"/riot/account/v1/accounts/by-riot-id/{game_name}/{tagline}",
+                                                 detail="Failed to fetch puuid", method="account-v1.getByRiotId")
+        except HTTPException as e:
+            if e.status_code == 404:
+                with self._lock:
+                    self._unknown[riot_id] = time.monotonic() + self.negative_ttl
+            raise
+
+        await self.remember(account["puuid"], account.get("gameName", game_name), account.get("tagLine", tagline))
+        return account["puuid"]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 3) if total else 0,
+                "cached": len(self._puuids)}
+
+
+riot_id_resolver = RiotIdResolver(max_items=int(os.getenv("RIOT_ID_CACHE_ITEMS", "10000")),
+                                  negative_ttl=float(os.getenv("RIOT_ID_NEGATIVE_TTL", "300")),
+                                  untracked_ttl=float(os.getenv("RIOT_ID_UNTRACKED_TTL", "60")))
@@ -0,0 +1,47 @@
+import argparse
+from supabase_client import supabase
+from typing import Optional, Dict, Any
+
+# Lifetime totals per summoner and per champion, maintained by triggers on
+# player_matches (see migrations/004_summoner_rollups.sql)
+
+
+def summarize_for_profile(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    # Same shape as MatchArrays.profile_summary() produces for the template
+    games = rollup["games"]
+    kills, deaths, assists = rollup["kills"], rollup["deaths"], rollup["assists"]
+    return {
+        "total_matches": games,
+        "win_rate": round((rollup["wins"] / games) * 100, 1),
+        "avg_kda": {
+            "kills": round(kills / games, 1),
+            "deaths": round(deaths / games, 1),
+            "assists": round(assists / games, 1),
+            "ratio": round((kills + assists) / deaths, 2) if deaths > 0 else round(kills + assists, 2)
+        },
+        "most_played_champions": [
+            {
+                "name": champion["champion_name"],
+                "count": champion["games"],
+                "wins": champion["wins"],
+                "win_rate": round((champion["wins"] / champion["games"]) * 100, 1)
+            }
+            for champion in rollup["champions"]
+        ]
+    }
+
+
+def rebuild(puuid: Optional[str] = None) -> int:
+    """Recompute rollups from player_matches; returns how many summoners were rebuilt."""
+    return supabase.rpc("rebuild_summoner_rollups", {"p_puuid": puuid}).execute().data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the summoner stats rollups")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subcommands.add_parser("rebuild", help="recompute rollups from player_matches")
+    rebuild_parser.add_argument("--puuid", help="only rebuild this summoner")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        print(f"Rebuilt rollups for {rebuild(args.puuid)} summoners")
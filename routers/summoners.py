@@ -1,175 +1,54 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from supabase_client import supabase
+from riot_client import riot_client
+from match_store import match_store
+from refresh_queue import refresh_queue
+from auto_refresh import auto_refresh
+from backfill import backfill_queue
+from response_cache import response_cache
+from repository import repository
+from summoner_service import SummonerProfile, RefreshResult
+import summoner_service
 from pydantic import BaseModel, Field
-import requests, os
-from typing import Optional, Dict, Any, List
-from dotenv import load_dotenv
-from datetime import datetime, timezone
-
-load_dotenv()
-api_key = os.getenv("RIOT_API_KEY")
-if not api_key:
-    raise ValueError("Missing RIOT API KEY")
+from typing import Optional, Dict, Any, List, Literal
+import json, os
+from contextlib import aclosing
+import match_export
 
 router = APIRouter(prefix="/summoners", tags=["summoners"])
 
+# Rows per database read when exporting; PostgREST caps responses at 1000 by default
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
 class SummonerCreate(BaseModel):
     summoner_name: str
     tagline: str = Field(..., description="e.g. 'LEMON' in Simo#LEMON")
     region: str = Field(..., description="e.g. 'europe', 'americas', etc.")
 
-class SummonerProfile(BaseModel):
-    puuid: str
-    summoner_name: str
-    tagline: str
-    region: str
-    level: Optional[int]
-    icon_id: Optional[int]
-    last_updated: datetime
-
 class UpdateMatches(BaseModel):
     puuid: str
     region: str
 
+class MatchExport(BaseModel):
+    puuids: List[str] = Field(..., min_length=1, max_length=1000)
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson"
 
-# Functions to fetch data from riot api
-def get_puuid(summoner_name: str, tagline: str, region: str) -> str:
-    url = f"https://{region}.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{summoner_name}/{tagline}?api_key={api_key}"
-    r = requests.get(url)
-    if r.status_code == 200:
-        return r.json()["puuid"]
-    raise HTTPException(status_code=r.status_code, detail="Failed to fetch puuid")
-
-def get_matchIDs(region: str, puuid: str, count: int, start: int = 0) -> list:
-    url = f"https://{region}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids?start={start}&count={count}&api_key={api_key}"
-    r = requests.get(url)
-    if r.status_code == 200:
-        return r.json()
-    raise HTTPException(status_code=r.status_code, detail="Failed to fetch match IDs")
-
-def get_matchdata(region: str, match_id: str) -> Dict[str,Any]:
-    url = f"https://{region}.api.riotgames.com/lol/match/v5/matches/{match_id}?api_key={api_key}"
-    r = requests.get(url)
-    if r.status_code == 200:
-        return r.json()
-    raise HTTPException(status_code=r.status_code, detail="Failed to fetch match data")
-
-def get_player_matchData(matchData: Dict[str,Any], puuid: str) -> Dict[str,Any]:
-    parts = matchData["metadata"]["participants"]
-    if puuid not in parts:
-        raise HTTPException(status_code=404, detail="PUUID not in match")
-    idx = parts.index(puuid)
-    return matchData["info"]["participants"][idx]
-
-
-def insert_player_matchData(puuid: str, match: Dict[str, Any]):
-    player = get_player_matchData(match, puuid)
-    match_id = match["metadata"]["matchId"]
-    game_start = datetime.fromtimestamp(match["info"]["gameStartTimestamp"] / 1000, tz=timezone.utc)
-
-    # Check if the match already exists for this summoner
-    existing_match = supabase.table("player_matches").select("id").eq("puuid", puuid).eq("match_id", match_id).execute()
-    if existing_match.data:
-        # Match already exists for this summoner, skip insertion
-        return existing_match.data[0]
-    
-    # Now check if the match exists in the database (for any summoner)
-    match_exists = supabase.table("player_matches").select("id").eq("match_id", match_id).execute()
-    
-    summoner_res = supabase.table("summoner_profiles").select("id").eq("puuid", puuid).execute()
-    if not summoner_res.data:
-        raise HTTPException(status_code=404, detail="Summoner profile not found")
-    summoner_profile_id = summoner_res.data[0]["id"]
-
-    payload = {
-        "match_id": match_id,
-        "puuid": puuid,
-        "win": player.get("win"),
-        "role": player.get("role"),
-        "kills": player.get("kills"),
-        "deaths": player.get("deaths"),
-        "assists": player.get("assists"),
-        "team_id": player.get("teamId"),
-        "game_start": game_start.isoformat(),
-        "summoner_profile_id": summoner_profile_id,
-        "riotid_gamename": player.get("riotIdGameName"),
-        "riotid_tagline": player.get("riotIdTagline"),
-        "summoner_level": player.get("summonerLevel"),
-        "champion_name": player.get("championName"),
-        "total_damagedealttochampions": player.get("totalDamageDealtToChampions"),
-        "enemy_missing_pings": player.get("enemyMissingPings"),
-        "gold_earned": player.get("goldEarned"),
-        "damage_per_minute": player.get("challenges", {}).get("damagePerMinute"),
-        "skillshot_dodged": player.get("challenges", {}).get("skillshotsDodged"),
-        "skillshot_hit": player.get("challenges", {}).get("skillshotsHit"),
-        "damage_dealt_to_turrets": player.get("damageDealtToTurrets"),
-        "longest_time_living": player.get("longestTimeSpentLiving"),
-        "game_ended_in_surrender": player.get("gameEndedInSurrender"),
-        "team_early_surrendered": player.get("teamEarlySurrendered")
-    }
-
-    try:
-        insert_res = supabase.table("player_matches").insert(payload).execute()
-
-        if not insert_res.data:
-            raise HTTPException(status_code=500, detail=f"Failed to insert player match data. Response: {insert_res.__dict__}")
-        return insert_res.data[0]
-    except Exception as e:
-        print(f"Error processing match {match_id}: {str(e)}")
-        # Return existing match data if possible
-        if match_exists and match_exists.data:
-            return match_exists.data[0]
-        return {"match_id": match_id, "error": str(e)}
+class BackfillRequest(BaseModel):
+    puuid: str
+    region: str
+    queue: Optional[int] = Field(None, description="Riot queue ID, e.g. 420 for ranked solo")
+    start_time: Optional[int] = Field(None, description="Epoch seconds")
+    end_time: Optional[int] = Field(None, description="Epoch seconds; defaults to now")
 
+class BatchRefresh(BaseModel):
+    puuids: List[str] = Field(..., min_length=1, max_length=1000)
+    region: Optional[str] = Field(None, description="Overrides each profile's stored region")
 
 
 @router.post("/create-profile", response_model=SummonerProfile)
-def create_summoner_profile(summoner: SummonerCreate):
-    try:
-        puuid = get_puuid(summoner.summoner_name, summoner.tagline, summoner.region)
-    except HTTPException as e:
-        raise HTTPException(status_code=e.status_code, detail=f"Failed to find summoner: {e.detail}")
-
-    # Check if profile already exists
-    existing_profile = supabase.table("summoner_profiles").select("*").eq("puuid", puuid).execute()
-    
-    if existing_profile.data:
-        # Profile exists, just return it without fetching matches
-        # Update existing profile with current timestamp
-        update_data = {
-            "last_updated": datetime.now(timezone.utc).isoformat()
-        }
-        update_res = supabase.table("summoner_profiles").update(update_data).eq("puuid", puuid).execute()
-        profile = update_res.data[0]
-    else:
-        # Create new profile
-        profile_data = {
-            "puuid": puuid,
-            "summoner_name": summoner.summoner_name,
-            "tagline": summoner.tagline,
-            "region": summoner.region,
-            "last_updated": datetime.now(timezone.utc).isoformat()
-        }
-        insert_res = supabase.table("summoner_profiles").insert(profile_data).execute()
-        if not insert_res.data:
-            raise HTTPException(status_code=500, detail="Failed to create summoner profile")
-        profile = insert_res.data[0]
-
-        # Only fetch matches for new profiles
-        try:
-            match_ids = get_matchIDs(summoner.region.lower(), puuid, 5)
-            # Process recent matches
-            for match_id in match_ids:
-                try:
-                    match_data = get_matchdata(summoner.region.lower(), match_id)
-                    insert_player_matchData(puuid, match_data)
-                except Exception as e:
-                    # Log but continue with other matches
-                    print(f"Error processing match {match_id}: {str(e)}")
-        except Exception as e:
-            print(f"Error fetching matches, but continuing: {str(e)}")
-    
-    return SummonerProfile(**profile)
+async def create_summoner_profile(summoner: SummonerCreate):
+    return await summoner_service.create_profile(summoner.summoner_name, summoner.tagline, summoner.region)
 
 
 @router.get("/profile/{puuid}", response_model=SummonerProfile)
@@ -192,148 +71,200 @@ def get_all_summoner_profiles():
     return [SummonerProfile(**profile) for profile in result.data]
 
 
-@router.post("/update-matches")
-def update_summoner_matches(update: UpdateMatches):
-    # Verify summoner exists
-    profile_res = supabase.table("summoner_profiles").select("*").eq("puuid", update.puuid).execute()
-    
+@router.post("/update-matches", response_model=RefreshResult)
+async def update_summoner_matches(update: UpdateMatches):
+    return await summoner_service.refresh_matches(update.puuid, update.region)
+
+
+@router.post("/refresh-batch")
+async def refresh_summoner_batch(batch: BatchRefresh):
+    # One JSON line per summoner, sent as each refresh finishes
+    async def results():
+        # Closed explicitly so a disconnect cancels the refreshes still running
+        async with aclosing(summoner_service.refresh_many(batch.puuids, batch.region)) as refreshes:
+            async for result in refreshes:
+                yield json.dumps(result) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.post("/refresh", status_code=202)
+def queue_summoner_refresh(update: UpdateMatches):
+    profile_res = supabase.table("summoner_profiles").select("id").eq("puuid", update.puuid).execute()
+    if not profile_res.data:
+        raise HTTPException(status_code=404, detail="Summoner profile not found")
+
+    job, created = refresh_queue.enqueue(update.puuid, update.region.lower())
+    if not created:
+        return {"message": "Refresh already in progress", "job": job}
+    return {"message": "Refresh queued", "job": job}
+
+
+@router.post("/backfill", status_code=202)
+def queue_summoner_backfill(backfill: BackfillRequest):
+    profile_res = supabase.table("summoner_profiles").select("id").eq("puuid", backfill.puuid).execute()
     if not profile_res.data:
         raise HTTPException(status_code=404, detail="Summoner profile not found")
-    
-    # Get latest 10 matches instead of 20 to reduce load
-    try:
-        match_ids = get_matchIDs(update.region.lower(), update.puuid, 10)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch match IDs: {str(e)}")
-    
-    updated_matches = []
-    for match_id in match_ids:
-        try:
-            # First check if we already have this match for this summoner
-            existing = supabase.table("player_matches").select("id").eq("puuid", update.puuid).eq("match_id", match_id).execute()
-            if existing.data:
-                continue  # Skip if already exists
-                
-            match_data = get_matchdata(update.region.lower(), match_id)
-            match_result = insert_player_matchData(update.puuid, match_data)
-            updated_matches.append(match_id)
-        except Exception as e:
-            # Log but continue with other matches
-            print(f"Error processing match {match_id}: {str(e)}")
-    
-    # Update last_updated timestamp
-    update_data = {
-        "last_updated": datetime.now(timezone.utc).isoformat()
-    }
-    supabase.table("summoner_profiles").update(update_data).eq("puuid", update.puuid).execute()
-    
-    return {"message": f"Updated {len(updated_matches)} matches", "updated_matches": updated_matches}
+
+    job, created = backfill_queue.enqueue(backfill.puuid, backfill.region.lower(), queue=backfill.queue,
+                                          start_time=backfill.start_time, end_time=backfill.end_time)
+    if not created:
+        return {"message": "Backfill already in progress", "job": job}
+    return {"message": "Backfill queued", "job": job}
+
+
+@router.get("/backfill/{puuid}")
+def get_summoner_backfill(puuid: str):
+    # Includes the checkpoint and the matches/sec of the current or last run
+    job = backfill_queue.get(puuid)
+    if not job:
+        raise HTTPException(status_code=404, detail="No backfill for this summoner")
+    return job
+
+
+@router.get("/refresh-jobs/{job_id}")
+def get_refresh_job(job_id: str):
+    job = refresh_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Refresh job not found")
+    return job
 
 
 @router.get("/matches/{puuid}")
-def get_summoner_matches(puuid: str, limit: int = Query(20, ge=1, le=100)):
+async def get_summoner_matches(response: Response, puuid: str, limit: int = Query(20, ge=1, le=100),
+                               cursor: Optional[str] = None):
     # Verify summoner exists
-    profile_res = supabase.table("summoner_profiles").select("id").eq("puuid", puuid).execute()
-    
-    if not profile_res.data:
+    if not await repository.profile_by_puuid(puuid):
         raise HTTPException(status_code=404, detail="Summoner profile not found")
     
-    # Get matches
-    matches_res = supabase.table("player_matches").select("*").eq("puuid", puuid).order("game_start", desc=True).limit(limit).execute()
-    
-    if not matches_res.data:
-        return []
+    # Get matches; the cursor for the next page goes in a header so the body stays a list
+    page = await repository.matches_by_puuid(puuid, limit, cursor)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
     
-    return matches_res.data
+    return page.matches
+
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+@router.post("/export")
+async def export_matches(export: MatchExport):
+    # Streams every player_matches row of each puuid, read in keyset-paged chunks
+    if export.format == "parquet" and not match_export.PARQUET_AVAILABLE:
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
+
+    async def pages():
+        for puuid in dict.fromkeys(export.puuids):
+            async for rows in repository.iter_matches(puuid, page_size=EXPORT_PAGE_SIZE,
+                                                      columns=",".join(match_export.COLUMN_NAMES)):
+                yield rows
+
+    streams = {"ndjson": match_export.ndjson_stream, "csv": match_export.csv_stream, "parquet": match_export.parquet_stream}
+    return StreamingResponse(streams[export.format](pages()), media_type=EXPORT_MEDIA_TYPES[export.format],
+                             headers={"Content-Disposition": f'attachment; filename="matches.{export.format}"'})
 
 
 @router.delete("/profile/{puuid}")
-def delete_summoner_profile(puuid: str):
-    # First delete all matches
-    matches_res = supabase.table("player_matches").delete().eq("puuid", puuid).execute()
-    
-    # Then delete the profile
-    profile_res = supabase.table("summoner_profiles").delete().eq("puuid", puuid).execute()
-    
-    if not profile_res.data:
-        raise HTTPException(status_code=404, detail="Summoner profile not found")
-    
+async def delete_summoner_profile(puuid: str):
+    await summoner_service.delete_profile(puuid)
     return {"message": "Summoner profile and all matches deleted"}
 
 
-@router.get("/stats/{puuid}")
-def get_summoner_stats(puuid: str):
-    # Verify summoner exists
-    profile_res = supabase.table("summoner_profiles").select("*").eq("puuid", puuid).execute()
-    
-    if not profile_res.data:
-        raise HTTPException(status_code=404, detail="Summoner profile not found")
-    
-    # Get matches
-    matches_res = supabase.table("player_matches").select("*").eq("puuid", puuid).execute()
-    
-    if not matches_res.data:
-        return {"matches_count": 0, "message": "No matches found"}
-    
-    matches = matches_res.data
-    total_matches = len(matches)
-    wins = sum(1 for match in matches if match.get("win") is True)
-    losses = total_matches - wins
-    
-    # Calculate KDA
-    total_kills = sum(match.get("kills", 0) for match in matches)
-    total_deaths = sum(match.get("deaths", 0) for match in matches)
-    total_assists = sum(match.get("assists", 0) for match in matches)
-    
-    avg_kills = total_kills / total_matches if total_matches > 0 else 0
-    avg_deaths = total_deaths / total_matches if total_matches > 0 else 0
-    avg_assists = total_assists / total_matches if total_matches > 0 else 0
-    
-    kda = (total_kills + total_assists) / total_deaths if total_deaths > 0 else (total_kills + total_assists)
-    
-    # Calculate champion statistics
+@router.get("/rate-limits")
+def get_rate_limit_queues():
+    # How many Riot requests are currently waiting per region and method
+    return {"queue_depths": riot_client.limiter.queue_depths()}
+
+
+@router.get("/auto-refresh")
+def get_auto_refresh_stats():
+    return auto_refresh.stats()
+
+
+@router.get("/match-store")
+def get_match_store_stats():
+    return match_store.stats()
+
+
+@router.get("/response-cache")
+def get_response_cache_stats():
+    return response_cache.stats()
+
+
+def _kda(kills: int, deaths: int, assists: int) -> float:
+    return (kills + assists) / deaths if deaths > 0 else (kills + assists)
+
+
+def build_stats_response(summoner: Dict[str, Any], overall: Dict[str, int],
+                         champions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Shape aggregated totals into the /stats response.
+
+    ``overall`` and each entry of ``champions`` hold games, wins, kills,
+    deaths and assists totals; champions also carry champion_name.
+    """
+    total_matches = overall["games"]
+    wins = overall["wins"]
+
     champion_stats = {}
-    for match in matches:
-        champion = match.get("champion_name")
-        if not champion:
-            continue
-            
-        if champion not in champion_stats:
-            champion_stats[champion] = {
-                "games": 0,
-                "wins": 0,
-                "kills": 0,
-                "deaths": 0, 
-                "assists": 0
-            }
-            
-        stats = champion_stats[champion]
-        stats["games"] += 1
-        if match.get("win"):
-            stats["wins"] += 1
-        stats["kills"] += match.get("kills", 0)
-        stats["deaths"] += match.get("deaths", 0)
-        stats["assists"] += match.get("assists", 0)
-    
-    # Calculate win rates and KDAs for champions
-    for champion, stats in champion_stats.items():
-        stats["win_rate"] = (stats["wins"] / stats["games"]) * 100 if stats["games"] > 0 else 0
-        stats["kda"] = (stats["kills"] + stats["assists"]) / stats["deaths"] if stats["deaths"] > 0 else (stats["kills"] + stats["assists"])
-        stats["avg_kills"] = stats["kills"] / stats["games"] if stats["games"] > 0 else 0
-        stats["avg_deaths"] = stats["deaths"] / stats["games"] if stats["games"] > 0 else 0
-        stats["avg_assists"] = stats["assists"] / stats["games"] if stats["games"] > 0 else 0
-    
+    for champion in champions:
+        games = champion["games"]
+        champion_stats[champion["champion_name"]] = {
+            "games": games,
+            "wins": champion["wins"],
+            "kills": champion["kills"],
+            "deaths": champion["deaths"],
+            "assists": champion["assists"],
+            "win_rate": (champion["wins"] / games) * 100 if games > 0 else 0,
+            "kda": _kda(champion["kills"], champion["deaths"], champion["assists"]),
+            "avg_kills": champion["kills"] / games if games > 0 else 0,
+            "avg_deaths": champion["deaths"] / games if games > 0 else 0,
+            "avg_assists": champion["assists"] / games if games > 0 else 0
+        }
+
     return {
-        "summoner": profile_res.data[0],
+        "summoner": summoner,
         "overall_stats": {
             "matches_played": total_matches,
             "wins": wins,
-            "losses": losses,
+            "losses": total_matches - wins,
             "win_rate": (wins / total_matches) * 100 if total_matches > 0 else 0,
-            "kda": kda,
-            "avg_kills": avg_kills,
-            "avg_deaths": avg_deaths,
-            "avg_assists": avg_assists
+            "kda": _kda(overall["kills"], overall["deaths"], overall["assists"]),
+            "avg_kills": overall["kills"] / total_matches if total_matches > 0 else 0,
+            "avg_deaths": overall["deaths"] / total_matches if total_matches > 0 else 0,
+            "avg_assists": overall["assists"] / total_matches if total_matches > 0 else 0
         },
         "champion_stats": champion_stats
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/stats/{puuid}")
+async def get_summoner_stats(puuid: str):
+    # Only cached for existing profiles, and dropped when one is deleted
+    cached = await response_cache.get(response_cache.stats_key(puuid))
+    if cached is not None:
+        return cached
+
+    # Verify summoner exists
+    profile = await repository.profile_by_puuid(puuid)
+    
+    if not profile:
+        raise HTTPException(status_code=404, detail="Summoner profile not found")
+
+    # Read the stored rollup; aggregate in Postgres if it hasn't been built yet
+    rollup = await repository.summoner_rollup(puuid)
+    if rollup:
+        response = build_stats_response(profile, rollup, rollup["champions"])
+    else:
+        stats = await repository.summoner_stats(puuid)
+        
+        if not stats["overall"]["games"]:
+            return {"matches_count": 0, "message": "No matches found"}
+        
+        response = build_stats_response(profile, stats["overall"], stats["champions"])
+
+    await response_cache.set(response_cache.stats_key(puuid), response)
+    return response
@@ -33,6 +33,12 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Follow a queued refresh, if we were redirected here from one
+    const refreshStatus = document.querySelector('.refresh-status');
+    if (refreshStatus) {
+        pollRefreshJob(refreshStatus.dataset.jobId, refreshStatus);
+    }
+
     // Add error/success message auto-hide
     const messages = document.querySelectorAll('.error-message, .success-message');
     if (messages.length > 0) {
@@ -48,6 +54,42 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
+// Poll a queued refresh job and reload the profile once it has finished
+function pollRefreshJob(jobId, statusElement) {
+    fetch(`/summoners/refresh-jobs/${jobId}`)
+        .then(response => {
+            if (!response.ok) {
+                // e.g. a 404 for an unknown job ID; polling again won't change that
+                return response.json().catch(() => ({})).then(body => {
+                    throw new Error(body.detail || `HTTP ${response.status}`);
+                });
+            }
+            return response.json();
+        })
+        .then(job => {
+            if (job.status === 'done') {
+                // Drop the refresh query params so a reload doesn't poll again
+                window.location.replace(window.location.pathname);
+            } else if (job.status === 'failed') {
+                showRefreshError(statusElement, `Refresh failed: ${job.error}`);
+            } else {
+                setTimeout(() => pollRefreshJob(jobId, statusElement), 2000);
+            }
+        })
+        .catch(error => {
+            console.error('Error checking refresh status:', error);
+            showRefreshError(statusElement, `Could not check refresh status: ${error.message}`);
+        });
+}
+
+function showRefreshError(statusElement, text) {
+    statusElement.className = 'error-message';
+    // The error text comes from Riot and Supabase responses, so never parse it as HTML
+    const message = document.createElement('p');
+    message.textContent = text;
+    statusElement.replaceChildren(message);
+}
+
 // Function to copy match ID to clipboard
 function copyMatchId(matchId) {
     navigator.clipboard.writeText(matchId).then(() => {
@@ -58,29 +100,29 @@ function copyMatchId(matchId) {
 }
 
 // Function to load more matches
-function loadMoreMatches(summonerName, tagline, region, offset) {
-    fetch(`/api/matches/${summonerName}/${tagline}/${region}?offset=${offset}`)
+function loadMoreMatches(summonerName, tagline, region, cursor) {
+    fetch(`/api/matches/${summonerName}/${tagline}/${region}?cursor=${encodeURIComponent(cursor)}`)
         .then(response => response.json())
         .then(data => {
             const matchesList = document.querySelector('.matches-list');
+            const loadMoreBtn = document.getElementById('load-more-btn');
             
             if (data.matches && data.matches.length > 0) {
                 data.matches.forEach(match => {
                     const matchElement = createMatchElement(match);
                     matchesList.appendChild(matchElement);
                 });
-                
-                // Update the load more button's offset
-                const loadMoreBtn = document.getElementById('load-more-btn');
-                if (loadMoreBtn) {
-                    loadMoreBtn.setAttribute('data-offset', offset + data.matches.length);
-                }
+            }
+            
+            if (!loadMoreBtn) {
+                return;
+            }
+            if (data.next_cursor) {
+                // Continue from the last match we just rendered
+                loadMoreBtn.setAttribute('data-cursor', data.next_cursor);
             } else {
-                const loadMoreBtn = document.getElementById('load-more-btn');
-                if (loadMoreBtn) {
-                    loadMoreBtn.textContent = 'No more matches';
-                    loadMoreBtn.disabled = true;
-                }
+                loadMoreBtn.textContent = 'No more matches';
+                loadMoreBtn.disabled = true;
             }
         })
         .catch(error => {
@@ -0,0 +1,135 @@
+import numpy as np
+from typing import List, Dict, Any, Iterable, Sequence
+
+# Percentiles reported for damage per minute
+DPM_PERCENTILES = (25, 50, 75, 90)
+
+
+class MatchArrays:
+    """Columnar view of player_matches rows for vectorized stats.
+
+    Rows are expected newest first, the order every match query in the app
+    uses. Champion names are stored as integer codes into ``champions``;
+    code -1 marks a row without a champion.
+    """
+
+    def __init__(self, win: np.ndarray, kills: np.ndarray, deaths: np.ndarray, assists: np.ndarray,
+                 damage_per_minute: np.ndarray, champion_codes: np.ndarray, champions: Sequence[str]):
+        self.win = win
+        self.kills = kills
+        self.deaths = deaths
+        self.assists = assists
+        self.damage_per_minute = damage_per_minute
+        self.champion_codes = champion_codes
+        self.champions = list(champions)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "MatchArrays":
+        n = len(rows)
+
+        def column(name: str, dtype, missing) -> np.ndarray:
+            values = (row.get(name) for row in rows)
+            return np.fromiter((missing if v is None else v for v in values), dtype=dtype, count=n)
+
+        codes_by_name: Dict[str, int] = {}
+        champion_codes = np.fromiter(
+            (codes_by_name.setdefault(row["champion_name"], len(codes_by_name)) if row.get("champion_name") else -1
+             for row in rows), dtype=np.int32, count=n)
+
+        return cls(
+            win=column("win", np.bool_, False),
+            kills=column("kills", np.int64, 0),
+            deaths=column("deaths", np.int64, 0),
+            assists=column("assists", np.int64, 0),
+            damage_per_minute=column("damage_per_minute", np.float64, np.nan),
+            champion_codes=champion_codes,
+            champions=list(codes_by_name),
+        )
+
+    def __len__(self) -> int:
+        return len(self.win)
+
+    def win_rate(self) -> float:
+        if not len(self):
+            return 0
+        return round(float(self.win.mean()) * 100, 1)
+
+    def avg_kda(self) -> Dict[str, float]:
+        count = len(self)
+        if not count:
+            return {"kills": 0, "deaths": 0, "assists": 0, "ratio": 0}
+        kills, deaths, assists = int(self.kills.sum()), int(self.deaths.sum()), int(self.assists.sum())
+        return {
+            "kills": round(kills / count, 1),
+            "deaths": round(deaths / count, 1),
+            "assists": round(assists / count, 1),
+            "ratio": round((kills + assists) / deaths, 2) if deaths > 0 else round(kills + assists, 2)
+        }
+
+    def champion_totals(self) -> Dict[str, np.ndarray]:
+        """Per-champion games, wins, kills, deaths and assists, indexed by champion code."""
+        has_champion = self.champion_codes >= 0
+        codes = self.champion_codes[has_champion]
+        size = len(self.champions)
+        return {
+            "games": np.bincount(codes, minlength=size),
+            "wins": np.bincount(codes, weights=self.win[has_champion], minlength=size).astype(np.int64),
+            "kills": np.bincount(codes, weights=self.kills[has_champion], minlength=size).astype(np.int64),
+            "deaths": np.bincount(codes, weights=self.deaths[has_champion], minlength=size).astype(np.int64),
+            "assists": np.bincount(codes, weights=self.assists[has_champion], minlength=size).astype(np.int64),
+        }
+
+    def most_played_champions(self, limit: int = 5) -> List[Dict[str, Any]]:
+        totals = self.champion_totals()
+        games, wins = totals["games"], totals["wins"]
+        # Codes follow first appearance, so sorting on -games with a stable sort
+        # keeps ties in the order the champions were most recently played
+        order = np.argsort(-games, kind="stable")
+        order = order[games[order] > 0][:limit]
+        return [
+            {
+                "name": self.champions[code],
+                "count": int(games[code]),
+                "wins": int(wins[code]),
+                "win_rate": round(wins[code] / games[code] * 100, 1)
+            }
+            for code in order
+        ]
+
+    def damage_per_minute_percentiles(self, percentiles: Iterable[int] = DPM_PERCENTILES) -> Dict[str, float]:
+        dpm = self.damage_per_minute[~np.isnan(self.damage_per_minute)]
+        if not len(dpm):
+            return {}
+        values = np.percentile(dpm, list(percentiles))
+        return {f"p{p}": round(float(v), 1) for p, v in zip(percentiles, values)}
+
+    def rolling_win_rate(self, window: int) -> np.ndarray:
+        """Win rate over each trailing ``window`` games, oldest to newest."""
+        wins = self.win[::-1].astype(np.int64)
+        if len(wins) < window:
+            return np.array([], dtype=np.float64)
+        cumulative = np.concatenate(([0], np.cumsum(wins)))
+        return (cumulative[window:] - cumulative[:-window]) / window * 100
+
+    def recent_form(self, last_n: int = 10) -> Dict[str, Any]:
+        """Win rate and KDA over the last ``last_n`` games, compared with the whole sample."""
+        recent = self.head(last_n)
+        return {
+            "games": len(recent),
+            "win_rate": recent.win_rate(),
+            "kda_ratio": recent.avg_kda()["ratio"],
+            "win_rate_delta": round(recent.win_rate() - self.win_rate(), 1)
+        }
+
+    def head(self, n: int) -> "MatchArrays":
+        return MatchArrays(self.win[:n], self.kills[:n], self.deaths[:n], self.assists[:n],
+                           self.damage_per_minute[:n], self.champion_codes[:n], self.champions)
+
+    def profile_summary(self, champion_limit: int = 5) -> Dict[str, Any]:
+        # The stats block the summoner page template renders
+        return {
+            "total_matches": len(self),
+            "win_rate": self.win_rate(),
+            "avg_kda": self.avg_kda(),
+            "most_played_champions": self.most_played_champions(champion_limit)
+        }
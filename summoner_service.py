@@ -0,0 +1,562 @@
+# Summoner ingestion logic shared in-process by the HTML routes, the /summoners
+# API and the background refresh workers
+from fastapi import HTTPException
+from riot_client import riot_client
+from match_store import match_store
+from response_cache import response_cache
+from riot_id_resolver import riot_id_resolver
+from repository import repository
+from backfill import BackfillQueue, backfill_queue
+from pydantic import BaseModel
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator, Iterator
+from datetime import datetime, timezone
+import asyncio, logging, os, time
+
+logger = logging.getLogger(__name__)
+
+# Store every participant of each fetched match rather than only the tracked
+# player, so the match page is complete and teammates' refreshes can skip it
+INGEST_ALL_PARTICIPANTS = os.getenv("INGEST_ALL_PARTICIPANTS", "true").lower() == "true"
+
+# Match fetches currently in flight, keyed by match ID, so concurrent refreshes
+# of players from the same game share a single Riot call
+_inflight_matches: Dict[str, asyncio.Task] = {}
+
+# How many summoners a batch refresh works on at once, and how many puuids or
+# match IDs go into each .in_() lookup (they end up in the query string)
+BATCH_REFRESH_CONCURRENCY = int(os.getenv("BATCH_REFRESH_CONCURRENCY", "8"))
+PROFILE_LOOKUP_CHUNK = 100
+MATCH_LOOKUP_CHUNK = 200
+
+# New profiles get their full history loaded by a background backfill, read
+# in pages of match IDs (100 is Riot's maximum) listed a few pages ahead
+BACKFILL_ON_CREATE = os.getenv("BACKFILL_ON_CREATE", "true").lower() == "true"
+BACKFILL_PAGE_SIZE = 100
+BACKFILL_PREFETCH_PAGES = 2
+
+# Display order of teamPosition values on the match page
+POSITION_ORDER = {"TOP": 0, "JUNGLE": 1, "MIDDLE": 2, "BOTTOM": 3, "UTILITY": 4}
+
+class SummonerProfile(BaseModel):
+    puuid: str
+    summoner_name: str
+    tagline: str
+    region: str
+    level: Optional[int]
+    icon_id: Optional[int]
+    last_updated: datetime
+
+class RefreshResult(BaseModel):
+    message: str
+    updated_matches: List[str]
+
+
+def chunked(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# Functions to fetch data from riot api
+async def get_puuid(summoner_name: str, tagline: str, region: str) -> str:
+    # Only reaches account-v1 for Riot IDs we haven't resolved before
+    return await riot_id_resolver.resolve(summoner_name, tagline, region)
+
+async def get_matchIDs(region: str, puuid: str, count: int, start: int = 0,
+                       start_time: Optional[int] = None, end_time: Optional[int] = None,
+                       queue: Optional[int] = None) -> list:
+    params = {"start": start, "count": count}
+    # Optional filters; times are epoch seconds
+    if start_time is not None:
+        params["startTime"] = start_time
+    if end_time is not None:
+        params["endTime"] = end_time
+    if queue is not None:
+        params["queue"] = queue
+    return await riot_client.get_json(region, f"/lol/match/v5/matches/by-puuid/{puuid}/ids",
+                                      detail="Failed to fetch match IDs", method="match-v5.getMatchIdsByPUUID",
+                                      params=params)
+
+async def get_new_matchIDs(region: str, puuid: str, last_match_id: Optional[str], last_match_start: Optional[str],
+                           first_sync_count: int = 10, page_size: int = 100,
+                           max_pages: int = 10) -> Tuple[List[str], bool]:
+    """Match IDs played since the summoner's high-water mark, newest first, and whether they were truncated.
+
+    Without a mark this is just the latest ``first_sync_count`` IDs. With one,
+    pages from ``startTime`` (inclusive, so the marked match comes back too)
+    until the marked match or a short page is reached. If ``max_pages`` run
+    out first, the IDs between the last page and the mark are missing and
+    the result is flagged as truncated.
+    """
+    if not last_match_id or not last_match_start:
+        return await get_matchIDs(region, puuid, first_sync_count), False
+
+    start_time = int(datetime.fromisoformat(last_match_start).timestamp())
+    match_ids = []
+    for page in range(max_pages):
+        ids = await get_matchIDs(region, puuid, page_size, start=page * page_size, start_time=start_time)
+        if last_match_id in ids:
+            match_ids.extend(ids[:ids.index(last_match_id)])
+            return match_ids, False
+        match_ids.extend(ids)
+        if len(ids) < page_size:
+            return match_ids, False
+    return match_ids, True
+
+async def fetch_matchdata(region: str, match_id: str) -> Dict[str,Any]:
+    match = await riot_client.get_json(region, f"/lol/match/v5/matches/{match_id}",
+                                       detail="Failed to fetch match data", method="match-v5.getMatch")
+    await match_store.aput(match_id, match)
+    return match
+
+async def get_matchdata(region: str, match_id: str) -> Dict[str,Any]:
+    # Finished matches are immutable, so read through the local raw match store
+    cached = await match_store.aget(match_id)
+    if cached is not None:
+        return cached
+
+    task = _inflight_matches.get(match_id)
+    if task is None:
+        task = asyncio.ensure_future(fetch_matchdata(region, match_id))
+        _inflight_matches[match_id] = task
+        task.add_done_callback(lambda _: _inflight_matches.pop(match_id, None))
+    return await asyncio.shield(task)
+
+async def get_matchdata_many(region: str, match_ids: List[str]) -> List[Any]:
+    # Results line up with match_ids; failed fetches come back as exceptions
+    return await asyncio.gather(*(get_matchdata(region, match_id) for match_id in match_ids),
+                                return_exceptions=True)
+
+def get_player_matchData(matchData: Dict[str,Any], puuid: str) -> Dict[str,Any]:
+    parts = matchData["metadata"]["participants"]
+    if puuid not in parts:
+        raise HTTPException(status_code=404, detail="PUUID not in match")
+    idx = parts.index(puuid)
+    return matchData["info"]["participants"][idx]
+
+
+def build_player_match_row(match: Dict[str, Any], puuid: str, summoner_profile_id: Optional[int]) -> Dict[str, Any]:
+    player = get_player_matchData(match, puuid)
+    game_start = datetime.fromtimestamp(match["info"]["gameStartTimestamp"] / 1000, tz=timezone.utc)
+
+    return {
+        "match_id": match["metadata"]["matchId"],
+        "puuid": puuid,
+        "win": player.get("win"),
+        "role": player.get("role"),
+        "kills": player.get("kills"),
+        "deaths": player.get("deaths"),
+        "assists": player.get("assists"),
+        "team_id": player.get("teamId"),
+        "team_position": player.get("teamPosition") or None,
+        "position_order": POSITION_ORDER.get(player.get("teamPosition")),
+        "game_start": game_start.isoformat(),
+        "summoner_profile_id": summoner_profile_id,
+        "riotid_gamename": player.get("riotIdGameName"),
+        "riotid_tagline": player.get("riotIdTagline"),
+        "summoner_level": player.get("summonerLevel"),
+        "champion_name": player.get("championName"),
+        "total_damagedealttochampions": player.get("totalDamageDealtToChampions"),
+        "enemy_missing_pings": player.get("enemyMissingPings"),
+        "gold_earned": player.get("goldEarned"),
+        "damage_per_minute": player.get("challenges", {}).get("damagePerMinute"),
+        "skillshot_dodged": player.get("challenges", {}).get("skillshotsDodged"),
+        "skillshot_hit": player.get("challenges", {}).get("skillshotsHit"),
+        "damage_dealt_to_turrets": player.get("damageDealtToTurrets"),
+        "longest_time_living": player.get("longestTimeSpentLiving"),
+        "game_ended_in_surrender": player.get("gameEndedInSurrender"),
+        "team_early_surrendered": player.get("teamEarlySurrendered")
+    }
+
+
+def build_match_record(match: Dict[str, Any]) -> Dict[str, Any]:
+    """The matches row: match-level facts and per-team totals from the full payload."""
+    info = match["info"]
+    totals = {100: {"kills": 0, "gold": 0, "damage": 0}, 200: {"kills": 0, "gold": 0, "damage": 0}}
+    for player in info["participants"]:
+        team = totals.get(player.get("teamId"))
+        if team is not None:
+            team["kills"] += player.get("kills") or 0
+            team["gold"] += player.get("goldEarned") or 0
+            team["damage"] += player.get("totalDamageDealtToChampions") or 0
+
+    winners = [team["teamId"] for team in info.get("teams", []) if team.get("win")]
+    return {
+        "match_id": match["metadata"]["matchId"],
+        "game_start": datetime.fromtimestamp(info["gameStartTimestamp"] / 1000, tz=timezone.utc).isoformat(),
+        "game_duration": info.get("gameDuration"),
+        "queue_id": info.get("queueId"),
+        "participant_count": len(match["metadata"]["participants"]),
+        "winning_team": winners[0] if winners else None,
+        "ended_in_surrender": any(p.get("gameEndedInSurrender") for p in info["participants"]),
+        "ended_in_early_surrender": any(p.get("teamEarlySurrendered") for p in info["participants"]),
+        "blue_kills": totals[100]["kills"],
+        "blue_gold": totals[100]["gold"],
+        "blue_damage": totals[100]["damage"],
+        "red_kills": totals[200]["kills"],
+        "red_gold": totals[200]["gold"],
+        "red_damage": totals[200]["damage"]
+    }
+
+
+def build_match_rows(match: Dict[str, Any], puuid: str, profile_ids: Dict[str, int]) -> List[Dict[str, Any]]:
+    if not INGEST_ALL_PARTICIPANTS:
+        return [build_player_match_row(match, puuid, profile_ids.get(puuid))]
+    # Raises if the tracked player isn't in the match, same as the single-row path
+    get_player_matchData(match, puuid)
+    return [build_player_match_row(match, participant, profile_ids.get(participant))
+            for participant in match["metadata"]["participants"]]
+
+
+async def insert_player_matches(puuid: str, summoner_profile_id: int, matches: List[Any]) -> List[Dict[str, Any]]:
+    """Store a refresh's worth of matches: one upsert for their matches rows, one for player_matches.
+
+    With INGEST_ALL_PARTICIPANTS every participant gets a row, linked to
+    their summoner profile when we track them. ``matches`` may contain
+    exceptions from a failed fetch; those are logged and skipped. Rows that
+    already exist for (puuid, match_id) are left untouched, so concurrent
+    refreshes can't double-insert. Returns only the newly inserted rows.
+    """
+    valid_matches = []
+    for match in matches:
+        if isinstance(match, Exception):
+            logger.warning(f"Error processing match: {str(match)}")
+        else:
+            valid_matches.append(match)
+
+    profile_ids = {puuid: summoner_profile_id}
+    if INGEST_ALL_PARTICIPANTS and valid_matches:
+        participants = {p for match in valid_matches for p in match["metadata"]["participants"]} - {puuid}
+        # Ten per match, so a backfill page can name a thousand of them
+        for chunk in chunked(list(participants), PROFILE_LOOKUP_CHUNK):
+            tracked = await repository.profiles_by_puuids(chunk, columns="id, puuid")
+            profile_ids.update({row["puuid"]: row["id"] for row in tracked})
+
+    rows, records = [], []
+    for match in valid_matches:
+        try:
+            # Rows reference their matches row, so a match whose record can't be
+            # built contributes neither
+            record = build_match_record(match)
+            match_rows = build_match_rows(match, puuid, profile_ids)
+        except Exception as e:
+            # Log but continue with other matches
+            logger.warning(f"Error processing match {match['metadata']['matchId']}: {str(e)}")
+            continue
+        records.append(record)
+        rows.extend(match_rows)
+
+    if not rows:
+        return []
+
+    # player_matches rows reference their matches row, so it goes in first
+    await repository.upsert_matches(records)
+    inserted = await repository.insert_player_matches(rows)
+
+    # New rows change these summoners' profiles and stats, and these match pages
+    await response_cache.invalidate_summoners(*{row["puuid"] for row in inserted})
+    await response_cache.invalidate_matches(*{record["match_id"] for record in records})
+    return inserted
+
+
+async def record_riot_id(puuid: str, player: Dict[str, Any]):
+    """Follow a rename seen in match data so the profile is found under its new Riot ID."""
+    game_name, tagline = player.get("riotIdGameName"), player.get("riotIdTagline")
+    if not game_name or not tagline:
+        return
+    if await riot_id_resolver.remember(puuid, game_name, tagline):
+        await repository.rename_profile(puuid, game_name, tagline)
+
+
+async def sync_new_matches(puuid: str, summoner_profile_id: int, region: str, match_ids: List[str],
+                           latest: bool = True) -> Tuple[List[str], Optional[Dict[str, str]]]:
+    """Fetch and store whichever of ``match_ids`` we don't already have a row for.
+
+    A match ingested from a teammate's refresh already has this player's row,
+    so it is never fetched from Riot again. Returns the newly stored match IDs
+    and the new high-water mark (``last_match_id``/``last_match_start``), which
+    is None when nothing was synced or a fetch failed and must be retried.
+    Pass ``latest=False`` for older pages of history, whose first match isn't
+    the player's latest and so doesn't carry their current Riot ID.
+    """
+    if not match_ids:
+        return [], None
+    game_starts = {}
+    for chunk in chunked(match_ids, MATCH_LOOKUP_CHUNK):
+        game_starts.update(await repository.stored_match_starts(puuid, chunk))
+    new_match_ids = [match_id for match_id in match_ids if match_id not in game_starts]
+
+    match_datas = await get_matchdata_many(region, new_match_ids)
+    inserted = await insert_player_matches(puuid, summoner_profile_id, match_datas)
+
+    # The newest match carries the player's current Riot ID
+    if latest and new_match_ids and new_match_ids[0] == match_ids[0] and not isinstance(match_datas[0], Exception):
+        await record_riot_id(puuid, get_player_matchData(match_datas[0], puuid))
+
+    failed = False
+    for match_data in match_datas:
+        if isinstance(match_data, Exception):
+            failed = True
+        else:
+            game_starts[match_data["metadata"]["matchId"]] = datetime.fromtimestamp(
+                match_data["info"]["gameStartTimestamp"] / 1000, tz=timezone.utc).isoformat()
+
+    # Match IDs come newest first; only advance the mark if nothing was lost
+    mark = None
+    if not failed and match_ids[0] in game_starts:
+        mark = {"last_match_id": match_ids[0], "last_match_start": game_starts[match_ids[0]]}
+    return [row["match_id"] for row in inserted if row["puuid"] == puuid], mark
+
+
+async def create_profile(summoner_name: str, tagline: str, region: str) -> SummonerProfile:
+    try:
+        puuid = await get_puuid(summoner_name, tagline, region)
+    except HTTPException as e:
+        raise HTTPException(status_code=e.status_code, detail=f"Failed to find summoner: {e.detail}")
+
+    # Check if profile already exists
+    existing_profile = await repository.profile_by_puuid(puuid)
+    
+    if existing_profile:
+        # Profile exists, just return it without fetching matches
+        # Update existing profile with current timestamp
+        update_data = {
+            "last_updated": datetime.now(timezone.utc).isoformat()
+        }
+        profile = await repository.update_profile(puuid, update_data)
+        await response_cache.invalidate_summoners(puuid)
+    else:
+        # Create new profile
+        profile_data = {
+            "puuid": puuid,
+            "summoner_name": summoner_name,
+            "tagline": tagline,
+            "region": region,
+            "last_updated": datetime.now(timezone.utc).isoformat()
+        }
+        profile = await repository.insert_profile(profile_data)
+        if not profile:
+            raise HTTPException(status_code=500, detail="Failed to create summoner profile")
+
+        # Claim rows stored earlier while this player was someone else's teammate
+        await repository.claim_player_matches(puuid, profile["id"])
+
+        # Only fetch matches for new profiles
+        try:
+            match_ids = await get_matchIDs(region.lower(), puuid, 5)
+            _, mark = await sync_new_matches(puuid, profile["id"], region.lower(), match_ids)
+            if mark:
+                await repository.update_profile(puuid, mark)
+        except Exception as e:
+            logger.warning(f"Error fetching matches, but continuing: {str(e)}")
+
+        # Load the rest of their history in the background
+        if BACKFILL_ON_CREATE:
+            backfill_queue.enqueue(puuid, region.lower())
+    
+    return SummonerProfile(**profile)
+
+
+async def delete_profile(puuid: str):
+    """Stop tracking a summoner.
+
+    With INGEST_ALL_PARTICIPANTS their player_matches rows are also
+    participants on other players' match pages, so they're kept and only
+    unlinked from the profile (creating it again claims them back).
+    Otherwise the rows go too, along with the cached views of their matches.
+    """
+    if not await repository.profile_by_puuid(puuid):
+        raise HTTPException(status_code=404, detail="Summoner profile not found")
+
+    if INGEST_ALL_PARTICIPANTS:
+        await repository.unlink_player_matches(puuid)
+    else:
+        match_ids = await repository.delete_player_matches(puuid)
+        await response_cache.invalidate_matches(*set(match_ids))
+    await repository.delete_profile(puuid)
+
+    await riot_id_resolver.forget(puuid)
+    await response_cache.invalidate_summoners(puuid)
+
+
+async def refresh_matches(puuid: str, region: str) -> RefreshResult:
+    # Verify summoner exists
+    profile = await repository.profile_by_puuid(puuid)
+    
+    if not profile:
+        raise HTTPException(status_code=404, detail="Summoner profile not found")
+    
+    return await refresh_profile(profile, region)
+
+
+async def refresh_profile(profile: Dict[str, Any], region: str) -> RefreshResult:
+    puuid = profile["puuid"]
+
+    # Only ask for matches played since the last synced one
+    try:
+        match_ids, truncated = await get_new_matchIDs(region.lower(), puuid,
+                                                      profile.get("last_match_id"), profile.get("last_match_start"))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch match IDs: {str(e)}")
+    
+    try:
+        updated_matches, mark = await sync_new_matches(puuid, profile["id"], region.lower(), match_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to store matches: {str(e)}")
+
+    # Moving the mark past a gap would lose the games in it for good; keep
+    # it where it is so the next refresh pages towards it again
+    if truncated:
+        logger.warning(f"More than {len(match_ids)} new matches for {puuid}; keeping the high-water mark")
+        mark = None
+    
+    # Update last_updated timestamp, and the high-water mark if it moved
+    update_data = {
+        "last_updated": datetime.now(timezone.utc).isoformat(),
+        **(mark or {})
+    }
+    await repository.update_profile(puuid, update_data)
+    await response_cache.invalidate_summoners(puuid)
+    
+    return RefreshResult(message=f"Updated {len(updated_matches)} matches", updated_matches=updated_matches)
+
+
+async def refresh_many(puuids: List[str], region: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Refresh a list of summoners, yielding each one's result as it finishes.
+
+    Profiles are loaded in a few batched queries and up to
+    BATCH_REFRESH_CONCURRENCY summoners refresh at once. Teammates share match
+    fetches through get_matchdata's in-flight dedupe and the match store, and
+    a match stored for one summoner already has its teammates' rows, so their
+    refreshes skip it. Riot request pacing is left to riot_client's limiter.
+    ``region`` overrides each profile's stored region.
+    """
+    puuids = list(dict.fromkeys(puuids))
+    profiles = {}
+    for chunk in chunked(puuids, PROFILE_LOOKUP_CHUNK):
+        profiles.update({row["puuid"]: row for row in await repository.profiles_by_puuids(chunk)})
+
+    for puuid in puuids:
+        if puuid not in profiles:
+            yield {"puuid": puuid, "status": "failed", "error": "Summoner profile not found"}
+
+    semaphore = asyncio.Semaphore(BATCH_REFRESH_CONCURRENCY)
+
+    async def refresh_one(profile: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await refresh_profile(profile, region or profile["region"])
+                return {"puuid": profile["puuid"], "status": "done", **result.model_dump()}
+            except Exception as e:
+                return {"puuid": profile["puuid"], "status": "failed", "error": str(getattr(e, "detail", e))}
+
+    tasks = [asyncio.create_task(refresh_one(profile)) for profile in profiles.values()]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # The client went away or the caller stopped early; don't keep refreshing for nobody
+        for task in tasks:
+            task.cancel()
+
+
+async def backfill_matches(job: Dict[str, Any], backfills: BackfillQueue):
+    """Backfill worker: ingest a summoner's match history from the job's checkpoint.
+
+    Pages of match IDs are listed ahead of ingestion (up to
+    BACKFILL_PREFETCH_PAGES) while each page's missing matches are fetched
+    concurrently and stored in one upsert. The checkpoint advances only after
+    a page is fully stored, so a failure resumes at that page.
+    """
+    puuid, region = job["puuid"], job["region"]
+    profile = await repository.profile_by_puuid(puuid)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Summoner profile not found")
+    profile_id = profile["id"]
+
+    pages: asyncio.Queue = asyncio.Queue(maxsize=BACKFILL_PREFETCH_PAGES)
+
+    async def list_pages():
+        start = job["next_start"]
+        try:
+            while True:
+                ids = await get_matchIDs(region, puuid, BACKFILL_PAGE_SIZE, start=start, start_time=job["start_time"],
+                                         end_time=job["end_time"], queue=job["queue"])
+                await pages.put((start, ids))
+                if len(ids) < BACKFILL_PAGE_SIZE:
+                    break
+                start += len(ids)
+            await pages.put(None)
+        except Exception as e:
+            await pages.put(e)
+
+    lister = asyncio.create_task(list_pages())
+    stored, began = 0, time.monotonic()
+    try:
+        while True:
+            page = await pages.get()
+            if page is None:
+                break
+            if isinstance(page, Exception):
+                raise page
+            start, ids = page
+            new_ids, mark = await sync_new_matches(puuid, profile_id, region, ids, latest=False)
+            if ids and mark is None:
+                raise HTTPException(status_code=502, detail=f"Some matches in page at {start} failed to fetch")
+
+            stored += len(new_ids)
+            rate = stored / max(time.monotonic() - began, 1e-6)
+            backfills.checkpoint(puuid, start + len(ids), job["matches_stored"] + stored, rate)
+            logger.info(f"Backfill {puuid}: {start + len(ids)} match IDs processed, "
+                        f"{job['matches_stored'] + stored} stored, {rate:.1f} matches/sec")
+    finally:
+        lister.cancel()
+
+
+def position_rows(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # team_position and position_order of each participant with a position
+    return [{"match_id": match["metadata"]["matchId"], "puuid": participant["puuid"],
+             "team_position": participant["teamPosition"], "position_order": POSITION_ORDER.get(participant["teamPosition"])}
+            for participant in match["info"]["participants"] if participant.get("teamPosition")]
+
+
+async def backfill_positions(batch_size: int = 1000) -> int:
+    """Fill team_position/position_order on rows stored before migration 007.
+
+    Reads the raw payloads from the match store rather than Riot, so rows of
+    matches that were never stored there stay empty. Returns how many rows
+    were filled in.
+    """
+    updated, batch = 0, []
+    for match in match_store.iter_matches():
+        batch.extend(position_rows(match))
+        if len(batch) >= batch_size:
+            updated += await repository.backfill_team_positions(batch)
+            batch = []
+    if batch:
+        updated += await repository.backfill_team_positions(batch)
+    return updated
+
+
+async def run_refresh_job(puuid: str, region: str) -> Dict[str, Any]:
+    # Worker entry point for queued refreshes; results are stored as JSON
+    result = await refresh_matches(puuid, region)
+    return result.model_dump()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintenance tasks for stored matches")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("backfill-positions", help="fill team positions from the match store (see migration 007)")
+    args = parser.parse_args()
+
+    async def main():
+        await repository.start()
+        try:
+            if args.command == "backfill-positions":
+                print(f"Filled team positions on {await backfill_positions()} player_matches rows")
+        finally:
+            await repository.close()
+
+    asyncio.run(main())
@@ -1,9 +1,14 @@
 import os
+import httpx
+import metrics
 from dotenv import load_dotenv
-from supabase import create_client
+from supabase import create_client, ClientOptions
+from supabase.lib.client_options import DEFAULT_POSTGREST_CLIENT_TIMEOUT
 
 load_dotenv()
 
 url: str = os.getenv("SUPABASE_URL")
 key: str = os.getenv("SUPABASE_KEY")
-supabase = create_client(url, key)
\ No newline at end of file
+# Calls go through the metrics transport; same timeout the client uses by default
+http_client = httpx.Client(transport=metrics.SupabaseTransport(), timeout=DEFAULT_POSTGREST_CLIENT_TIMEOUT)
+supabase = create_client(url, key, options=ClientOptions(httpx_client=http_client))
\ No newline at end of file
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+
+from auto_refresh import AutoRefreshScheduler
+from refresh_queue import RefreshQueue
+
+NOW = 1_700_000_000.0
+
+
+def iso(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def profile(puuid, updated_ago, played_ago):
+    return {"puuid": puuid, "region": "europe", "last_updated": iso(NOW - updated_ago),
+            "last_match_start": iso(NOW - played_ago) if played_ago is not None else None}
+
+
+def make_scheduler(tmp_path, rpm=30):
+    return AutoRefreshScheduler(RefreshQueue(str(tmp_path / "jobs.sqlite3")), requests_per_minute=rpm,
+                                min_interval=900, max_interval=86400)
+
+
+def test_active_players_are_refreshed_first(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    scheduler.load([
+        profile("idle", updated_ago=6 * 3600, played_ago=30 * 86400),
+        profile("active", updated_ago=3 * 3600, played_ago=2 * 3600),
+        profile("busy", updated_ago=3600, played_ago=1200),
+        profile("regular", updated_ago=10 * 3600, played_ago=4 * 3600),
+        profile("just-refreshed", updated_ago=60, played_ago=600),
+        profile("stale", updated_ago=2 * 86400, played_ago=None),
+    ], now=NOW)
+
+    assert scheduler.priority("just-refreshed", NOW) == 0
+    assert scheduler.priority("idle", NOW) < 1
+    # The stale profile is due only because of max_interval; though it has
+    # more expected matches than "active", it goes after every active player
+    assert scheduler.priority("stale", NOW) > scheduler.priority("active", NOW) > 1
+    assert scheduler.tick(NOW) == ["busy", "active", "regular", "stale"]
+
+
+def test_budget_limits_enqueues_and_results_update_the_rate(tmp_path):
+    scheduler = make_scheduler(tmp_path, rpm=2)
+    scheduler.load([profile("a", 3 * 86400, None), profile("b", 2 * 86400, None)], now=NOW)
+
+    assert scheduler.tick(NOW) == ["a"]
+    job = scheduler.queue._claim()
+    scheduler.queue._finish(job["id"], "done", result={"message": "", "updated_matches": [f"M{i}" for i in range(12)]})
+    rate_before = scheduler._profiles["a"]["rate"]
+
+    scheduler.tick(NOW)
+    assert scheduler._profiles["a"]["last_updated"] == NOW
+    assert scheduler._profiles["a"]["rate"] > rate_before
@@ -0,0 +1,49 @@
+import asyncio
+
+from backfill import BackfillQueue
+
+
+def test_failed_backfill_resumes_from_checkpoint(tmp_path):
+    queue = BackfillQueue(str(tmp_path / "backfill.sqlite3"))
+    job, created = queue.enqueue("puuid-1", "europe", queue=420)
+    assert created and queue.enqueue("puuid-1", "europe")[1] is False
+
+    queue._claim()
+    queue.checkpoint("puuid-1", next_start=200, matches_stored=150, matches_per_sec=12.345)
+    queue._finish("puuid-1", "failed", error="boom")
+
+    resumed, created = queue.enqueue("puuid-1", "europe", queue=420)
+    assert created
+    assert (resumed["status"], resumed["next_start"], resumed["matches_stored"]) == ("queued", 200, 150)
+    assert resumed["end_time"] == job["end_time"] and resumed["matches_per_sec"] == 12.35
+
+    # Different filters start over
+    queue._claim()
+    queue._finish("puuid-1", "failed")
+    fresh, _ = queue.enqueue("puuid-1", "europe", queue=440)
+    assert (fresh["next_start"], fresh["matches_stored"], fresh["queue"]) == (0, 0, 440)
+
+
+def test_worker_passes_itself_for_checkpoints(tmp_path):
+    async def run():
+        queue = BackfillQueue(str(tmp_path / "backfill.sqlite3"), poll_interval=0.05)
+
+        async def handler(job, backfills):
+            for start in (100, 200):
+                backfills.checkpoint(job["puuid"], start, start, 50.0)
+            if job["puuid"] == "bad":
+                raise RuntimeError("riot down")
+
+        await queue.start(handler)
+        queue.enqueue("good", "europe")
+        queue.enqueue("bad", "europe")
+        for _ in range(50):
+            if all(queue.get(p)["status"] in ("done", "failed") for p in ("good", "bad")):
+                break
+            await asyncio.sleep(0.02)
+        await queue.stop()
+        return queue.get("good"), queue.get("bad")
+
+    good, bad = asyncio.run(run())
+    assert (good["status"], good["next_start"]) == ("done", 200)
+    assert (bad["status"], bad["error"], bad["next_start"]) == ("failed", "riot down", 200)
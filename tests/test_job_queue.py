@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from backfill import BackfillQueue
+from refresh_queue import RefreshQueue
+
+
+@pytest.fixture(params=[RefreshQueue, BackfillQueue])
+def make_queue(request, tmp_path):
+    return lambda: request.param(str(tmp_path / "jobs.sqlite3"), poll_interval=0.05)
+
+
+def test_interrupted_jobs_run_again_after_restart(make_queue):
+    async def run():
+        queue = make_queue()
+        started = asyncio.Event()
+
+        async def handler(*args):
+            started.set()
+            await asyncio.Event().wait()
+
+        job, _ = queue.enqueue("puuid-1", "europe")
+        await queue.start(handler)
+        await asyncio.wait_for(started.wait(), timeout=1)
+        assert queue._get(job[queue.key])["status"] == "running"
+        await queue.stop()
+        return queue, job
+
+    queue, job = asyncio.run(run())
+    assert queue._get(job[queue.key])["status"] == "queued"
+    assert queue.queue_depth() == 1
+
+
+def test_jobs_left_running_are_claimed_again_on_start(make_queue):
+    # A process that died mid-job never got to put it back
+    make_queue().enqueue("puuid-1", "europe")
+    make_queue()._claim()
+
+    async def run():
+        queue = make_queue()
+        ran = []
+
+        async def handler(*args):
+            ran.append(args)
+            return {}
+
+        await queue.start(handler)
+        for _ in range(50):
+            if ran:
+                break
+            await asyncio.sleep(0.02)
+        await queue.stop()
+        return ran
+
+    assert len(asyncio.run(run())) == 1
@@ -0,0 +1,40 @@
+import asyncio
+import csv
+import io
+import json
+
+from match_export import ndjson_stream, csv_stream, COLUMN_NAMES
+
+
+async def pages(*chunks):
+    for rows in chunks:
+        yield rows
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+ROWS = [
+    {"match_id": "EUW1_2", "puuid": "p1", "game_start": "2024-01-02T00:00:00+00:00", "win": True, "kills": 5},
+    {"match_id": "EUW1_1", "puuid": "p1", "game_start": "2024-01-01T00:00:00+00:00", "win": False, "kills": 1},
+]
+
+
+def test_ndjson_yields_one_chunk_per_page():
+    chunks = asyncio.run(collect(ndjson_stream(pages(ROWS[:1], ROWS[1:]))))
+    assert len(chunks) == 2
+    assert [json.loads(line) for line in "".join(chunks).splitlines()] == ROWS
+
+
+def test_csv_has_one_header_and_every_row():
+    chunks = asyncio.run(collect(csv_stream(pages(ROWS[:1], ROWS[1:]))))
+    records = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert list(records[0]) == COLUMN_NAMES
+    assert [(r["match_id"], r["win"], r["kills"], r["role"]) for r in records] == [
+        ("EUW1_2", "True", "5", ""), ("EUW1_1", "False", "1", "")]
+
+
+def test_csv_without_rows_is_just_the_header():
+    chunks = asyncio.run(collect(csv_stream(pages())))
+    assert "".join(chunks).strip() == ",".join(COLUMN_NAMES)
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+
+from match_store import MatchStore
+
+
+def make_match(match_id, padding=0):
+    return {"metadata": {"matchId": match_id}, "info": {"padding": "x" * padding}}
+
+
+def test_read_through_counts_hits_and_misses(tmp_path):
+    store = MatchStore(str(tmp_path), memory_items=1)
+    assert store.get("EUW1_1") is None
+
+    store.put("EUW1_1", make_match("EUW1_1"))
+    store.put("EUW1_2", make_match("EUW1_2"))
+    # EUW1_1 has been pushed out of memory, so this one comes from disk
+    assert store.get("EUW1_1") == make_match("EUW1_1")
+    assert store.get("EUW1_1") == make_match("EUW1_1")
+
+    stats = store.stats()
+    assert (stats["hits"], stats["memory_hits"], stats["misses"]) == (2, 1, 1)
+    assert stats["items_on_disk"] == 2
+
+
+def test_survives_restart(tmp_path):
+    MatchStore(str(tmp_path)).put("EUW1_1", make_match("EUW1_1"))
+    assert MatchStore(str(tmp_path)).get("EUW1_1") == make_match("EUW1_1")
+
+
+def test_evicts_least_recently_used_over_size_cap(tmp_path):
+    store = MatchStore(str(tmp_path), memory_items=0)
+    store.put("EUW1_1", make_match("EUW1_1", 10000))
+    one_file = store.stats()["bytes_on_disk"]
+    store.max_bytes = one_file * 2 + 10
+
+    store.put("EUW1_2", make_match("EUW1_2", 10000))
+    store.get("EUW1_1")
+    store.put("EUW1_3", make_match("EUW1_3", 10000))
+
+    assert store.get("EUW1_2") is None
+    assert store.get("EUW1_1") is not None
+    assert store.get("EUW1_3") is not None
+
+
+def test_async_access_matches_sync(tmp_path):
+    async def run():
+        store = MatchStore(str(tmp_path), memory_items=1)
+        await store.aput("EUW1_1", make_match("EUW1_1"))
+        await store.aput("EUW1_2", make_match("EUW1_2"))
+        # One from memory, one from disk
+        return await store.aget("EUW1_2"), await store.aget("EUW1_1"), await store.aget("EUW1_3")
+
+    assert asyncio.run(run()) == (make_match("EUW1_2"), make_match("EUW1_1"), None)
+    assert MatchStore(str(tmp_path)).stats()["items_on_disk"] == 2
+
+
+def test_memory_hits_do_not_wait_for_disk_reads(tmp_path):
+    reading, release = threading.Event(), threading.Event()
+
+    class SlowStore(MatchStore):
+        def _decompress(self, data):
+            reading.set()
+            release.wait(5)
+            return super()._decompress(data)
+
+    store = SlowStore(str(tmp_path), memory_items=1)
+    store.put("EUW1_1", make_match("EUW1_1"))
+    store.put("EUW1_2", make_match("EUW1_2"))
+
+    async def run():
+        disk_read = asyncio.create_task(store.aget("EUW1_1"))
+        await asyncio.to_thread(reading.wait, 5)
+        # The disk read is stuck decompressing; the memory hit shouldn't wait for it
+        began = time.monotonic()
+        memory_hit = await store.aget("EUW1_2")
+        elapsed = time.monotonic() - began
+        release.set()
+        return memory_hit, elapsed, await disk_read
+
+    memory_hit, elapsed, disk_hit = asyncio.run(run())
+    assert elapsed < 1
+    assert (memory_hit, disk_hit) == (make_match("EUW1_2"), make_match("EUW1_1"))
@@ -0,0 +1,74 @@
+import os
+
+# main builds its Supabase and Riot clients at import; nothing here reaches them
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.test")
+os.environ.setdefault("RIOT_API_KEY", "test-key")
+
+from jinja2 import Environment, FileSystemLoader
+
+from main import build_match_view
+from summoner_service import build_match_record, position_rows
+
+POSITIONS = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+TEMPLATES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+
+
+def make_match(blue_win=True, red_win=False, surrender=False):
+    participants = []
+    for team_id, win in ((100, blue_win), (200, red_win)):
+        for i, position in enumerate(POSITIONS):
+            participants.append({"puuid": f"p{team_id}-{i}", "teamId": team_id, "win": win, "teamPosition": position,
+                                 "kills": i, "goldEarned": 1000, "totalDamageDealtToChampions": 100 * i,
+                                 "gameEndedInSurrender": surrender, "teamEarlySurrendered": False})
+    return {"metadata": {"matchId": "EUW1_1", "participants": [p["puuid"] for p in participants]},
+            "info": {"gameStartTimestamp": 1704067200000, "gameDuration": 1800, "queueId": 420,
+                     "participants": participants,
+                     "teams": [{"teamId": 100, "win": blue_win}, {"teamId": 200, "win": red_win}]}}
+
+
+def stored_view(match, stored_participants=None):
+    # What repository.match_view returns: the record plus its stored player_matches rows
+    record = build_match_record(match)
+    rows = [{"puuid": p["puuid"], "team_id": p["teamId"], "team_position": p["teamPosition"]}
+            for p in match["info"]["participants"]][:stored_participants]
+    return build_match_view({**record, "participants": rows})
+
+
+def test_record_totals_teams_and_winner():
+    record = build_match_record(make_match(blue_win=False, red_win=True, surrender=True))
+
+    assert (record["participant_count"], record["winning_team"], record["queue_id"]) == (10, 200, 420)
+    assert (record["blue_kills"], record["blue_gold"], record["blue_damage"]) == (10, 5000, 1000)
+    assert record["red_kills"] == 10 and record["ended_in_surrender"] and not record["ended_in_early_surrender"]
+    assert record["game_start"] == "2024-01-01T00:00:00+00:00"
+
+
+def test_view_splits_teams_and_knows_when_it_is_complete():
+    view = stored_view(make_match())
+    assert view["winner"] == "blue" and view["surrender"] is None and view["complete"]
+    assert [p["team_position"] for p in view["teams"]["red"]] == POSITIONS
+
+    partial = stored_view(make_match(), stored_participants=1)
+    assert not partial["complete"] and len(partial["teams"]["blue"]) == 1 and partial["teams"]["red"] == []
+
+
+def test_remake_has_no_winner_and_renders_no_victory():
+    record = build_match_record(make_match(blue_win=False, red_win=False))
+    assert record["winning_team"] is None
+
+    view = stored_view(make_match(blue_win=False, red_win=False))
+    assert view["winner"] is None
+
+    env = Environment(loader=FileSystemLoader(TEMPLATES))
+    html = env.get_template("match.html").render(match=view, regions={}, url_for=lambda *args, **kwargs: "")
+    assert "No Result" in html and "Victory" not in html and "(Winner)" not in html
+
+
+def test_position_rows_for_the_backfill():
+    match = make_match()
+    match["info"]["participants"][0]["teamPosition"] = ""
+
+    rows = position_rows(match)
+    assert len(rows) == 9
+    assert rows[0] == {"match_id": "EUW1_1", "puuid": "p100-1", "team_position": "JUNGLE", "position_order": 1}
@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+import pytest
+
+from metrics import MetricsRegistry, AsyncSupabaseTransport, observe_request, supabase_operation, \
+    registry, request_stage_duration, supabase_request_duration
+from request_timing import start_request
+
+
+def test_histogram_and_counter_render_in_prometheus_format():
+    registry = MetricsRegistry()
+    latency = registry.histogram("call_seconds", "Calls", ("endpoint",), buckets=(0.1, 1.0))
+    errors = registry.counter("errors_total", "Errors", ("endpoint",))
+    latency.observe(0.05, "match")
+    latency.observe(0.1, "match")
+    latency.observe(3, "match")
+    errors.inc("match")
+    errors.inc("match", amount=2)
+    registry.register_cache("store", lambda: {"hits": 3, "misses": 1, "hit_rate": 0.75})
+
+    lines = registry.render().splitlines()
+    assert "# TYPE call_seconds histogram" in lines
+    # Buckets are cumulative and le is inclusive
+    assert 'call_seconds_bucket{endpoint="match",le="0.1"} 2' in lines
+    assert 'call_seconds_bucket{endpoint="match",le="1"} 2' in lines
+    assert 'call_seconds_bucket{endpoint="match",le="+Inf"} 3' in lines
+    assert 'call_seconds_count{endpoint="match"} 3' in lines
+    assert 'errors_total{endpoint="match"} 3' in lines
+    assert 'cache_hits_total{cache="store"} 3' in lines
+    assert 'cache_hit_ratio{cache="store"} 0.75' in lines
+
+
+def test_supabase_operation_from_postgrest_requests():
+    def request(method, path, prefer=None):
+        return httpx.Request(method, "http://db" + path, headers={"Prefer": prefer} if prefer else {})
+
+    assert supabase_operation(request("GET", "/rest/v1/player_matches")) == ("player_matches", "select")
+    assert supabase_operation(request("POST", "/rest/v1/matches", "return=representation")) == ("matches", "insert")
+    assert supabase_operation(request("POST", "/rest/v1/matches", "return=representation,resolution=ignore-duplicates")) == ("matches", "upsert")
+    assert supabase_operation(request("PATCH", "/rest/v1/summoner_profiles")) == ("summoner_profiles", "update")
+    assert supabase_operation(request("POST", "/rest/v1/rpc/summoner_stats")) == ("summoner_stats", "rpc")
+    assert supabase_operation(request("POST", "/auth/v1/token")) == ("auth", "post")
+
+
+def test_supabase_calls_are_timed_and_attributed_to_the_request():
+    transport = AsyncSupabaseTransport(httpx.MockTransport(lambda request: httpx.Response(200, json=[])))
+
+    async def handler():
+        spans = start_request()
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("http://db/rest/v1/riot_id_mappings")
+        return spans
+
+    before = supabase_request_duration.count("riot_id_mappings", "select", 200)
+    spans = asyncio.run(handler())
+    assert supabase_request_duration.count("riot_id_mappings", "select", 200) == before + 1
+    assert [name for name, _, _ in spans] == ["supabase"]
+
+    observe_request("GET", "/test/{id}", 200, spans + [("total", 5.0, spans[0][2])])
+    assert request_stage_duration.count("/test/{id}", "supabase") == 1
+
+
+def test_concurrent_stage_calls_count_wall_clock_time_once():
+    # Three riot calls: two overlapping over 0.0-0.3s, one alone over 0.5-0.6s
+    spans = [("riot", 200.0, 10.2), ("riot", 200.0, 10.3), ("riot", 100.0, 10.6), ("total", 700.0, 10.7)]
+    observe_request("GET", "/overlap", 200, spans)
+
+    values = dict(line.rsplit(" ", 1) for line in registry.render().splitlines() if not line.startswith("#"))
+    assert float(values['http_request_stage_duration_seconds_sum{route="/overlap",stage="riot"}']) == pytest.approx(0.4)
+    assert values['http_request_stage_calls_sum{route="/overlap",stage="riot"}'] == "3"
+    assert float(values['http_request_duration_seconds_sum{method="GET",route="/overlap",status="200"}']) == pytest.approx(0.7)
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from rate_limiter import RateLimiter, TokenBucket, parse_rate_limits
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("20:1,100:120") == [(20, 1.0), (100, 120.0)]
+    assert parse_rate_limits(None) == []
+
+
+def test_token_bucket_delay_after_burst():
+    bucket = TokenBucket(2, 1)
+    now = time.monotonic()
+    bucket.consume(now)
+    bucket.consume(now)
+    assert bucket.delay(now) > 0.4
+
+
+def test_limiter_queues_instead_of_overdrawing():
+    async def run():
+        limiter = RateLimiter(default_app_limits="5:0.5")
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire("europe", "match-v5.getMatch") for _ in range(8)))
+        return time.monotonic() - start, limiter.queue_depths()
+
+    elapsed, depths = asyncio.run(run())
+    # 5 requests go immediately, the remaining 3 wait for refill at 10/s
+    assert elapsed >= 0.25
+    assert depths == {"europe:match-v5.getMatch": 0}
+
+
+def test_headers_sync_counts_and_method_limits():
+    limiter = RateLimiter()
+    limiter.update_from_headers("europe", "match-v5.getMatch", {
+        "X-App-Rate-Limit": "20:1,100:120",
+        "X-App-Rate-Limit-Count": "20:1,20:120",
+        "X-Method-Rate-Limit": "2000:10",
+        "X-Method-Rate-Limit-Count": "1:10",
+    })
+    now = time.monotonic()
+    assert limiter._wait_time("europe", "match-v5.getMatch", now) > 0
+    assert [(b.limit, b.window) for b in limiter._method_buckets[("europe", "match-v5.getMatch")]] == [(2000, 10.0)]
+
+
+def test_retry_after_blocks_scope():
+    limiter = RateLimiter()
+    limiter.backoff("europe", "match-v5.getMatch", 5, "method")
+    now = time.monotonic()
+    assert limiter._wait_time("europe", "match-v5.getMatch", now) > 4
+    assert limiter._wait_time("europe", "account-v1.getByRiotId", now) == 0
+
+    limiter.backoff("americas", "match-v5.getMatch", 5, "application")
+    assert limiter._wait_time("americas", "account-v1.getByRiotId", now) > 4
@@ -0,0 +1,51 @@
+import asyncio
+
+from refresh_queue import RefreshQueue
+
+
+def test_enqueue_dedupes_active_jobs(tmp_path):
+    queue = RefreshQueue(str(tmp_path / "jobs.sqlite3"))
+    job, created = queue.enqueue("puuid-1", "europe")
+    again, created_again = queue.enqueue("puuid-1", "europe")
+
+    assert created and not created_again
+    assert again["id"] == job["id"]
+    assert queue.queue_depth() == 1
+
+
+def test_jobs_survive_restart(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    job, _ = RefreshQueue(db_path).enqueue("puuid-1", "europe")
+
+    reopened = RefreshQueue(db_path)
+    assert reopened.get(job["id"])["status"] == "queued"
+    assert reopened.enqueue("puuid-1", "europe")[1] is False
+
+
+def test_workers_run_jobs_and_record_results(tmp_path):
+    async def run():
+        queue = RefreshQueue(str(tmp_path / "jobs.sqlite3"), workers=2, poll_interval=0.05)
+        calls = []
+
+        async def handler(puuid, region):
+            calls.append(puuid)
+            if puuid == "bad":
+                raise RuntimeError("boom")
+            return {"updated_matches": ["EUW1_1"]}
+
+        ok_job, _ = queue.enqueue("good", "europe")
+        bad_job, _ = queue.enqueue("bad", "europe")
+        await queue.start(handler)
+        for _ in range(50):
+            if queue.get(ok_job["id"])["status"] == "done" and queue.get(bad_job["id"])["status"] == "failed":
+                break
+            await asyncio.sleep(0.02)
+        await queue.stop()
+        return queue, ok_job, bad_job, calls
+
+    queue, ok_job, bad_job, calls = asyncio.run(run())
+    assert sorted(calls) == ["bad", "good"]
+    assert queue.get(ok_job["id"])["result"] == {"updated_matches": ["EUW1_1"]}
+    assert queue.get(bad_job["id"])["error"] == "boom"
+    # A finished job no longer blocks a new refresh of the same summoner
+    assert queue.enqueue("good", "europe")[1] is True
@@ -0,0 +1,35 @@
+import base64
+import json
+import os
+
+# repository builds its Supabase client at import; nothing here reaches it
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.test")
+
+import pytest
+from fastapi import HTTPException
+
+from repository import encode_cursor, decode_cursor
+
+
+def raw_cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    row = {"game_start": "2024-03-01T18:22:05+00:00", "match_id": "EUW1_7012345678"}
+    assert decode_cursor(encode_cursor(row)) == ("2024-03-01T18:22:05+00:00", "EUW1_7012345678")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    raw_cursor("2024-03-01T18:22:05+00:00"),
+    # Would otherwise break out of the or_() filter
+    raw_cursor('2024-03-01",id.gt.0,game_start.eq."x', "EUW1_1"),
+    raw_cursor("2024-03-01T18:22:05+00:00", 'EUW1_1",puuid.neq."x'),
+    raw_cursor("2024-03-01T18:22:05+00:00", 12345),
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor)
+    assert e.value.status_code == 400
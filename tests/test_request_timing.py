@@ -0,0 +1,28 @@
+import asyncio
+
+from request_timing import start_request, timed, measure, server_timing_header
+
+
+def test_spans_from_concurrent_tasks_land_in_the_request():
+    async def load(delay):
+        await asyncio.sleep(delay)
+        return delay
+
+    async def handler():
+        spans = start_request()
+        with timed("total"):
+            results = await asyncio.gather(measure("a", load(0.02)), measure("b", load(0.01)))
+        return results, spans
+
+    results, spans = asyncio.run(handler())
+    assert results == [0.02, 0.01]
+    assert [name for name, _, _ in spans] == ["b", "a", "total"]
+    # Concurrent loads overlap, so the total is close to the slowest one, not the sum
+    durations = {name: duration for name, duration, _ in spans}
+    assert durations["total"] < durations["a"] + durations["b"]
+
+
+def test_header_format_and_no_request_is_a_noop():
+    with timed("outside"):
+        pass
+    assert server_timing_header([("resolve", 0.42, 1.0), ("render", 3.0, 2.0)]) == "resolve;dur=0.4, render;dur=3.0"
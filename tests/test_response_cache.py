@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+from response_cache import LRUBackend, ResponseCache
+
+
+def test_lru_evicts_least_recently_used():
+    async def run():
+        backend = LRUBackend(max_items=2)
+        await backend.set("a", 1, None)
+        await backend.set("b", 2, None)
+        await backend.get("a")
+        await backend.set("c", 3, None)
+        return await backend.get("a"), await backend.get("b"), await backend.get("c")
+
+    assert asyncio.run(run()) == (1, None, 3)
+
+
+def test_entries_expire_after_ttl():
+    async def run():
+        cache = ResponseCache(LRUBackend(), default_ttl=0.05)
+        await cache.set("profile:p1", {"matches": []})
+        await cache.set("match:EUW1_1", {"id": "EUW1_1"}, ttl=None)
+        assert await cache.get("profile:p1") == {"matches": []}
+        time.sleep(0.06)
+        assert await cache.get("profile:p1") is None
+        assert await cache.get("match:EUW1_1") == {"id": "EUW1_1"}
+        return cache.stats()
+
+    assert asyncio.run(run()) == {"hits": 2, "misses": 1, "hit_rate": 0.667}
+
+
+def test_ingest_invalidation_drops_summoner_and_match_keys():
+    async def run():
+        cache = ResponseCache(LRUBackend())
+        for key in ("profile:p1", "stats:p1", "profile:p2", "match:EUW1_1"):
+            await cache.set(key, {"key": key})
+        await cache.invalidate_summoners("p1")
+        await cache.invalidate_matches("EUW1_1")
+        assert await cache.get("profile:p1") is None and await cache.get("stats:p1") is None
+        assert await cache.get("match:EUW1_1") is None
+        assert await cache.get("profile:p2") == {"key": "profile:p2"}
+
+    asyncio.run(run())
@@ -0,0 +1,61 @@
+import asyncio
+import os
+
+# riot_id_resolver builds the Riot and Supabase clients at import; nothing here reaches them
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.test")
+os.environ.setdefault("RIOT_API_KEY", "test-key")
+
+import riot_id_resolver as resolver_module
+from riot_id_resolver import RiotIdResolver
+
+
+class FakeRepository:
+    def __init__(self, mappings=None, profiles=None):
+        self.mappings = dict(mappings or {})
+        self.profiles = profiles or {}
+        self.calls = []
+
+    async def puuid_for_riot_id(self, riot_id):
+        self.calls.append(("mapping", riot_id))
+        return self.mappings.get(riot_id)
+
+    async def profile_by_riot_id(self, game_name, tagline):
+        self.calls.append(("profile", game_name, tagline))
+        return self.profiles.get((game_name, tagline))
+
+    async def save_riot_id(self, riot_id, puuid, game_name, tagline):
+        self.mappings[riot_id] = puuid
+
+    async def delete_riot_ids(self, puuid):
+        self.mappings = {riot_id: p for riot_id, p in self.mappings.items() if p != puuid}
+
+
+def test_untracked_names_are_cached_until_remembered(monkeypatch):
+    repository = FakeRepository()
+    monkeypatch.setattr(resolver_module, "repository", repository)
+
+    async def run():
+        resolver = RiotIdResolver(untracked_ttl=60)
+        assert await resolver.resolve_tracked("Nobody", "EUW") is None
+        assert await resolver.resolve_tracked("nobody", "euw") is None
+        lookups = len(repository.calls)
+        await resolver.remember("puuid-1", "Nobody", "EUW")
+        return lookups, await resolver.resolve_tracked("Nobody", "EUW")
+
+    lookups, puuid = asyncio.run(run())
+    assert lookups == 2 and puuid == "puuid-1"
+
+
+def test_forget_drops_the_cached_and_stored_mapping(monkeypatch):
+    repository = FakeRepository(mappings={"simo#lemon": "puuid-1"})
+    monkeypatch.setattr(resolver_module, "repository", repository)
+
+    async def run():
+        resolver = RiotIdResolver()
+        assert await resolver.resolve_tracked("Simo", "LEMON") == "puuid-1"
+        await resolver.forget("puuid-1")
+        return await resolver.resolve_tracked("Simo", "LEMON")
+
+    assert asyncio.run(run()) is None
+    assert repository.mappings == {}
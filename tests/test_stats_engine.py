@@ -0,0 +1,39 @@
+import numpy as np
+
+from stats_engine import MatchArrays
+
+# Newest first, as the match queries return them
+ROWS = [
+    {"win": True, "kills": 10, "deaths": 2, "assists": 5, "damage_per_minute": 800.0, "champion_name": "Ahri"},
+    {"win": False, "kills": 1, "deaths": 6, "assists": 3, "damage_per_minute": None, "champion_name": "Garen"},
+    {"win": True, "kills": 4, "deaths": None, "assists": 8, "damage_per_minute": 400.0, "champion_name": "Ahri"},
+    {"win": False, "kills": 2, "deaths": 4, "assists": 0, "damage_per_minute": 600.0, "champion_name": None},
+]
+
+
+def test_profile_summary():
+    summary = MatchArrays.from_rows(ROWS).profile_summary()
+    assert summary["total_matches"] == 4
+    assert summary["win_rate"] == 50.0
+    assert summary["avg_kda"] == {"kills": 4.2, "deaths": 3.0, "assists": 4.0, "ratio": 2.75}
+    assert summary["most_played_champions"] == [
+        {"name": "Ahri", "count": 2, "wins": 2, "win_rate": 100.0},
+        {"name": "Garen", "count": 1, "wins": 0, "win_rate": 0.0},
+    ]
+
+
+def test_empty_rows():
+    summary = MatchArrays.from_rows([]).profile_summary()
+    assert summary == {"total_matches": 0, "win_rate": 0,
+                       "avg_kda": {"kills": 0, "deaths": 0, "assists": 0, "ratio": 0},
+                       "most_played_champions": []}
+
+
+def test_damage_percentiles_skip_missing():
+    assert MatchArrays.from_rows(ROWS).damage_per_minute_percentiles((50,)) == {"p50": 600.0}
+
+
+def test_rolling_win_rate_is_oldest_to_newest():
+    arrays = MatchArrays.from_rows(ROWS)
+    np.testing.assert_allclose(arrays.rolling_win_rate(2), [50.0, 50.0, 50.0])
+    assert arrays.recent_form(2) == {"games": 2, "win_rate": 50.0, "kda_ratio": 2.38, "win_rate_delta": 0.0}
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import os
+
+# summoner_service builds its Supabase and Riot clients at import; nothing here reaches them
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.test")
+os.environ.setdefault("RIOT_API_KEY", "test-key")
+
+import pytest
+from fastapi import HTTPException
+
+import summoner_service
+from summoner_service import RefreshResult
+
+MARK_START = "2024-01-01T00:00:00+00:00"
+
+
+def fake_history(history, calls):
+    # match-v5 ID listing over `history` (newest first), recording each page asked for
+    async def get_matchIDs(region, puuid, count, start=0, start_time=None, end_time=None, queue=None):
+        calls.append((start, count, start_time))
+        return history[start:start + count]
+    return get_matchIDs
+
+
+def test_pages_until_the_mark(monkeypatch):
+    history = [f"EUW1_{i}" for i in range(250, 0, -1)]
+    calls = []
+    monkeypatch.setattr(summoner_service, "get_matchIDs", fake_history(history, calls))
+
+    ids, truncated = asyncio.run(summoner_service.get_new_matchIDs("europe", "p", "EUW1_30", MARK_START,
+                                                                   page_size=100))
+    assert ids == history[:history.index("EUW1_30")] and not truncated
+    assert [start for start, _, _ in calls] == [0, 100, 200]
+    assert all(start_time == 1704067200 for _, _, start_time in calls)
+
+
+def test_short_page_ends_paging_and_no_mark_takes_the_latest(monkeypatch):
+    calls = []
+    monkeypatch.setattr(summoner_service, "get_matchIDs", fake_history(["EUW1_3", "EUW1_2"], calls))
+
+    # Mark not in the listing (e.g. a remake dropped from history): stop at the short page
+    assert asyncio.run(summoner_service.get_new_matchIDs("europe", "p", "EUW1_1", MARK_START)) == (["EUW1_3", "EUW1_2"], False)
+    assert asyncio.run(summoner_service.get_new_matchIDs("europe", "p", None, None, first_sync_count=5)) == (["EUW1_3", "EUW1_2"], False)
+    assert calls[-1] == (0, 5, None)
+
+
+def test_running_out_of_pages_is_truncated(monkeypatch):
+    history = [f"EUW1_{i}" for i in range(50, 0, -1)]
+    monkeypatch.setattr(summoner_service, "get_matchIDs", fake_history(history, []))
+
+    ids, truncated = asyncio.run(summoner_service.get_new_matchIDs("europe", "p", "EUW1_1", MARK_START,
+                                                                   page_size=10, max_pages=2))
+    assert ids == history[:20] and truncated
+
+
+def refresh_with(monkeypatch, truncated, mark):
+    updates = []
+
+    async def get_new_matchIDs(region, puuid, last_match_id, last_match_start):
+        return ["EUW1_9"], truncated
+
+    async def sync_new_matches(puuid, profile_id, region, match_ids):
+        return match_ids, mark
+
+    async def update_profile(puuid, update):
+        updates.append(update)
+
+    monkeypatch.setattr(summoner_service, "get_new_matchIDs", get_new_matchIDs)
+    monkeypatch.setattr(summoner_service, "sync_new_matches", sync_new_matches)
+    monkeypatch.setattr(summoner_service.repository, "update_profile", update_profile)
+    profile = {"id": 1, "puuid": "p", "last_match_id": "EUW1_1", "last_match_start": MARK_START}
+    result = asyncio.run(summoner_service.refresh_profile(profile, "EUROPE"))
+    return result, updates[0]
+
+
+def test_mark_advances_after_a_complete_sync(monkeypatch):
+    mark = {"last_match_id": "EUW1_9", "last_match_start": "2024-02-01T00:00:00+00:00"}
+    result, update = refresh_with(monkeypatch, truncated=False, mark=mark)
+
+    assert result == RefreshResult(message="Updated 1 matches", updated_matches=["EUW1_9"])
+    assert update["last_match_id"] == "EUW1_9" and "last_updated" in update
+
+
+def test_mark_stays_when_listing_was_truncated_or_a_fetch_failed(monkeypatch):
+    mark = {"last_match_id": "EUW1_9", "last_match_start": "2024-02-01T00:00:00+00:00"}
+    _, update = refresh_with(monkeypatch, truncated=True, mark=mark)
+    assert "last_match_id" not in update and "last_updated" in update
+
+    # sync_new_matches returns no mark when a match failed to fetch
+    _, update = refresh_with(monkeypatch, truncated=False, mark=None)
+    assert "last_match_id" not in update
+
+
+def stub_batch(monkeypatch, known, delays):
+    lookups, finished = [], []
+
+    async def profiles_by_puuids(puuids, columns="*"):
+        lookups.append(list(puuids))
+        return [{"id": i, "puuid": p, "region": "europe"} for i, p in enumerate(puuids) if p in known]
+
+    async def refresh_profile(profile, region):
+        await asyncio.sleep(delays[profile["puuid"]])
+        if profile["puuid"] == "broken":
+            raise RuntimeError("riot down")
+        finished.append(profile["puuid"])
+        return RefreshResult(message="Updated 1 matches", updated_matches=[f"{profile['puuid']}_1"])
+
+    monkeypatch.setattr(summoner_service, "PROFILE_LOOKUP_CHUNK", 2)
+    monkeypatch.setattr(summoner_service.repository, "profiles_by_puuids", profiles_by_puuids)
+    monkeypatch.setattr(summoner_service, "refresh_profile", refresh_profile)
+    return lookups, finished
+
+
+def test_refresh_batch_streams_results_as_they_finish(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from routers import summoners
+
+    lookups, _ = stub_batch(monkeypatch, known={"slow", "fast", "broken"},
+                            delays={"slow": 0.05, "fast": 0, "broken": 0.01})
+    app = FastAPI()
+    app.include_router(summoners.router)
+    response = TestClient(app).post("/summoners/refresh-batch",
+                                    json={"puuids": ["slow", "fast", "missing", "broken", "fast"]})
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["puuid"], r["status"]) for r in results] == [
+        ("missing", "failed"), ("fast", "done"), ("broken", "failed"), ("slow", "done")]
+    assert results[1]["updated_matches"] == ["fast_1"] and results[2]["error"] == "riot down"
+    # Deduplicated, then looked up PROFILE_LOOKUP_CHUNK puuids at a time
+    assert lookups == [["slow", "fast"], ["missing", "broken"]]
+
+
+def test_closing_the_batch_cancels_pending_refreshes(monkeypatch):
+    _, finished = stub_batch(monkeypatch, known={"fast", "slow"}, delays={"fast": 0, "slow": 0.2})
+
+    async def run():
+        refreshes = summoner_service.refresh_many(["fast", "slow"])
+        first = await refreshes.__anext__()
+        await refreshes.aclose()
+        await asyncio.sleep(0.3)
+        return first
+
+    assert asyncio.run(run())["puuid"] == "fast"
+    assert finished == ["fast"]
+
+
+def make_match(match_id, puuids):
+    participants = [{"puuid": p, "teamId": 100 if i < 5 else 200, "win": i < 5, "teamPosition": "TOP",
+                     "kills": i, "goldEarned": 1000} for i, p in enumerate(puuids)]
+    return {"metadata": {"matchId": match_id, "participants": puuids},
+            "info": {"gameStartTimestamp": 1704067200000, "gameDuration": 1800, "queueId": 420,
+                     "participants": participants, "teams": [{"teamId": 100, "win": True}]}}
+
+
+def stub_ingest(monkeypatch, tracked):
+    calls = {"lookups": [], "records": [], "rows": []}
+
+    async def profiles_by_puuids(puuids, columns="*"):
+        calls["lookups"].append(sorted(puuids))
+        return [{"id": tracked[p], "puuid": p} for p in puuids if p in tracked]
+
+    async def upsert_matches(records):
+        calls["records"].extend(records)
+
+    async def insert_player_matches(rows):
+        calls["rows"].extend(rows)
+        return rows
+
+    monkeypatch.setattr(summoner_service, "INGEST_ALL_PARTICIPANTS", True)
+    monkeypatch.setattr(summoner_service.repository, "profiles_by_puuids", profiles_by_puuids)
+    monkeypatch.setattr(summoner_service.repository, "upsert_matches", upsert_matches)
+    monkeypatch.setattr(summoner_service.repository, "insert_player_matches", insert_player_matches)
+    return calls
+
+
+def test_all_participants_are_stored_and_linked_to_tracked_profiles(monkeypatch):
+    calls = stub_ingest(monkeypatch, tracked={"mate": 2})
+    players = ["me", "mate"] + [f"x{i}" for i in range(8)]
+    matches = [make_match("EUW1_1", players), RuntimeError("riot down"),
+               make_match("EUW1_2", [f"y{i}" for i in range(10)])]
+
+    inserted = asyncio.run(summoner_service.insert_player_matches("me", 1, matches))
+
+    # The failed fetch and the match the player isn't in are skipped, rows and record alike
+    assert [record["match_id"] for record in calls["records"]] == ["EUW1_1"]
+    assert inserted == calls["rows"] and len(inserted) == 10
+    assert {row["puuid"]: row["summoner_profile_id"] for row in inserted} == {"me": 1, "mate": 2, **{f"x{i}": None for i in range(8)}}
+    assert calls["lookups"] == [sorted(set(players + [f"y{i}" for i in range(10)]) - {"me"})]
+
+
+def test_build_match_rows_only_for_the_player_without_all_participants(monkeypatch):
+    monkeypatch.setattr(summoner_service, "INGEST_ALL_PARTICIPANTS", False)
+    rows = summoner_service.build_match_rows(make_match("EUW1_1", ["me"] + [f"x{i}" for i in range(9)]), "me", {"me": 1})
+    assert [(row["puuid"], row["summoner_profile_id"]) for row in rows] == [("me", 1)]
+
+
+def test_new_profile_claims_rows_stored_as_a_teammate(monkeypatch):
+    calls = []
+
+    async def get_puuid(summoner_name, tagline, region):
+        return "p"
+
+    async def profile_by_puuid(puuid):
+        return None
+
+    async def insert_profile(profile):
+        return {"id": 7, "level": None, "icon_id": None, **profile}
+
+    async def claim_player_matches(puuid, profile_id):
+        calls.append(("claim", puuid, profile_id))
+
+    async def get_matchIDs(region, puuid, count, start=0):
+        calls.append(("list", puuid))
+        return []
+
+    monkeypatch.setattr(summoner_service, "BACKFILL_ON_CREATE", False)
+    monkeypatch.setattr(summoner_service, "get_puuid", get_puuid)
+    monkeypatch.setattr(summoner_service, "get_matchIDs", get_matchIDs)
+    monkeypatch.setattr(summoner_service.repository, "profile_by_puuid", profile_by_puuid)
+    monkeypatch.setattr(summoner_service.repository, "insert_profile", insert_profile)
+    monkeypatch.setattr(summoner_service.repository, "claim_player_matches", claim_player_matches)
+
+    profile = asyncio.run(summoner_service.create_profile("Name", "TAG", "europe"))
+    assert profile.puuid == "p"
+    # Claimed before the first sync, which skips matches already stored for the player
+    assert calls == [("claim", "p", 7), ("list", "p")]
+
+
+def stub_delete(monkeypatch, ingest_all):
+    calls = []
+
+    async def profile_by_puuid(puuid):
+        return {"id": 1, "puuid": puuid} if puuid == "p" else None
+
+    def record(name, result=None):
+        async def method(puuid):
+            calls.append(name)
+            return result
+        return method
+
+    monkeypatch.setattr(summoner_service, "INGEST_ALL_PARTICIPANTS", ingest_all)
+    monkeypatch.setattr(summoner_service.repository, "profile_by_puuid", profile_by_puuid)
+    monkeypatch.setattr(summoner_service.repository, "unlink_player_matches", record("unlink"))
+    monkeypatch.setattr(summoner_service.repository, "delete_player_matches", record("delete rows", ["EUW1_1"]))
+    monkeypatch.setattr(summoner_service.repository, "delete_profile", record("delete profile", True))
+    monkeypatch.setattr(summoner_service.riot_id_resolver, "forget", record("forget"))
+    return calls
+
+
+def test_deleting_a_profile_keeps_rows_other_match_pages_show(monkeypatch):
+    calls = stub_delete(monkeypatch, ingest_all=True)
+    asyncio.run(summoner_service.delete_profile("p"))
+    assert calls == ["unlink", "delete profile", "forget"]
+
+
+def test_deleting_a_profile_without_all_participants_drops_its_match_views(monkeypatch):
+    calls = stub_delete(monkeypatch, ingest_all=False)
+    cache = summoner_service.response_cache
+
+    async def run():
+        await cache.set(cache.match_key("EUW1_1"), {"id": "EUW1_1"}, ttl=None)
+        await summoner_service.delete_profile("p")
+        return await cache.get(cache.match_key("EUW1_1"))
+
+    assert asyncio.run(run()) is None
+    assert calls == ["delete rows", "delete profile", "forget"]
+
+    with pytest.raises(HTTPException) as missing:
+        asyncio.run(summoner_service.delete_profile("unknown"))
+    assert missing.value.status_code == 404
+
+
+def test_cached_stats_skip_the_profile_lookup(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from routers import summoners
+
+    lookups = []
+
+    async def profile_by_puuid(puuid):
+        lookups.append(puuid)
+        return {"puuid": puuid} if puuid == "cached" else None
+
+    async def summoner_rollup(puuid):
+        return {"games": 2, "wins": 1, "kills": 4, "deaths": 2, "assists": 6,
+                "champions": [{"champion_name": "Ahri", "games": 2, "wins": 1, "kills": 4, "deaths": 2, "assists": 6}]}
+
+    monkeypatch.setattr(summoners.repository, "profile_by_puuid", profile_by_puuid)
+    monkeypatch.setattr(summoners.repository, "summoner_rollup", summoner_rollup)
+    app = FastAPI()
+    app.include_router(summoners.router)
+    client = TestClient(app)
+
+    first, second = client.get("/summoners/stats/cached"), client.get("/summoners/stats/cached")
+    assert first.json() == second.json() and first.json()["overall_stats"]["kda"] == 5
+    assert client.get("/summoners/stats/missing").status_code == 404
+    assert lookups == ["cached", "missing"]
@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+import jwt
+import pytest
+
+from token_verifier import TokenVerifier
+
+SECRET = "test-secret-with-enough-bytes-for-hs256"
+
+
+def make_token(exp_in: float = 3600, secret: str = SECRET, **claims) -> str:
+    payload = {"sub": "user-1", "email": "a@example.com", "role": "authenticated",
+               "aud": "authenticated", "exp": int(time.time() + exp_in), **claims}
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+def test_verifies_hs256_and_caches_claims():
+    verifier = TokenVerifier(SECRET, None)
+    token = make_token()
+    user = asyncio.run(verifier.verify(token))
+    assert (user.id, user.email) == ("user-1", "a@example.com")
+
+    # Cached claims are served without decoding again
+    verifier.jwt_secret = "rotated-secret-that-would-fail-to-verify"
+    assert asyncio.run(verifier.verify(token)).id == "user-1"
+
+
+def test_rejects_bad_signature_expiry_and_audience():
+    verifier = TokenVerifier(SECRET, None)
+    for token in (make_token(secret="another-secret-with-enough-bytes-here"), make_token(exp_in=-10),
+                  make_token(aud="anon")):
+        with pytest.raises(jwt.InvalidTokenError):
+            asyncio.run(verifier.verify(token))
+
+
+def test_cache_entry_ends_at_token_expiry():
+    verifier = TokenVerifier(SECRET, None, claims_ttl=300)
+    token = make_token(exp_in=1)
+    asyncio.run(verifier.verify(token))
+    time.sleep(1.1)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        asyncio.run(verifier.verify(token))
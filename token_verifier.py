@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+import jwt
+from pydantic import BaseModel
+
+
+class AuthenticatedUser(BaseModel):
+    id: str
+    email: Optional[str] = None
+    role: Optional[str] = None
+
+
+class TokenVerifier:
+    """Verifies Supabase access tokens locally instead of asking the auth server.
+
+    HS256 tokens are checked against the project's JWT secret; asymmetric
+    tokens against the project's JWKS, which PyJWKClient caches and refetches
+    when it sees an unknown key ID, so key rotation needs no restart. Verified
+    claims are cached by token hash until the token expires or
+    ``claims_ttl`` passes, whichever comes first. Without a secret, HS256
+    tokens fall back to ``supabase.auth.get_user`` on a worker thread.
+    """
+
+    def __init__(self, jwt_secret: Optional[str], jwks_url: Optional[str], audience: str = "authenticated",
+                 claims_ttl: float = 300, max_items: int = 4096, jwks_lifespan: float = 600):
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.claims_ttl = claims_ttl
+        self.max_items = max_items
+        self._jwks = jwt.PyJWKClient(jwks_url, lifespan=jwks_lifespan) if jwks_url else None
+        self._claims: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, token_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._claims.get(token_hash)
+            if item is None:
+                return None
+            expires_at, claims = item
+            if expires_at <= time.time():
+                del self._claims[token_hash]
+                return None
+            self._claims.move_to_end(token_hash)
+            return claims
+
+    def _cache(self, token_hash: str, claims: Dict[str, Any]):
+        expires_at = min(float(claims["exp"]), time.time() + self.claims_ttl)
+        with self._lock:
+            self._claims[token_hash] = (expires_at, claims)
+            self._claims.move_to_end(token_hash)
+            while len(self._claims) > self.max_items:
+                self._claims.popitem(last=False)
+
+    def _decode_hs256(self, token: str) -> Dict[str, Any]:
+        return jwt.decode(token, self.jwt_secret, algorithms=["HS256"], audience=self.audience,
+                          options={"require": ["exp", "sub"]})
+
+    def _decode_jwks(self, token: str, algorithm: str) -> Dict[str, Any]:
+        # May fetch the key set, so this runs off the event loop
+        signing_key = self._jwks.get_signing_key_from_jwt(token)
+        return jwt.decode(token, signing_key.key, algorithms=[algorithm], audience=self.audience,
+                          options={"require": ["exp", "sub"]})
+
+    def _fetch_user_claims(self, token: str) -> Dict[str, Any]:
+        from supabase_client import supabase
+        user = supabase.auth.get_user(token)
+        if not user or not user.user:
+            raise jwt.InvalidTokenError("Invalid or expired token")
+        # get_user checked the signature; exp here only bounds the cache entry
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp", time.time())
+        return {"sub": user.user.id, "email": user.user.email, "role": user.user.role, "exp": exp}
+
+    async def verify(self, token: str) -> AuthenticatedUser:
+        """Claims of a valid token as a user; raises jwt.InvalidTokenError otherwise."""
+        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        claims = self._cached(token_hash)
+        if claims is None:
+            algorithm = jwt.get_unverified_header(token).get("alg")
+            if algorithm == "HS256" and self.jwt_secret:
+                claims = self._decode_hs256(token)
+            elif algorithm == "HS256":
+                claims = await asyncio.to_thread(self._fetch_user_claims, token)
+            elif self._jwks and algorithm in ("RS256", "ES256", "EdDSA"):
+                claims = await asyncio.to_thread(self._decode_jwks, token, algorithm)
+            else:
+                raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm: {algorithm}")
+            self._cache(token_hash, claims)
+        return AuthenticatedUser(id=claims["sub"], email=claims.get("email"), role=claims.get("role"))
+
+
+def _jwks_url() -> Optional[str]:
+    if os.getenv("SUPABASE_JWKS_URL"):
+        return os.getenv("SUPABASE_JWKS_URL")
+    if os.getenv("SUPABASE_URL"):
+        return os.getenv("SUPABASE_URL").rstrip("/") + "/auth/v1/.well-known/jwks.json"
+    return None
+
+
+token_verifier = TokenVerifier(os.getenv("SUPABASE_JWT_SECRET"), _jwks_url(),
+                               audience=os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated"),
+                               claims_ttl=float(os.getenv("AUTH_CLAIMS_TTL", "300")))